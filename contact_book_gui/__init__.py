@@ -1,3 +0,0 @@
-from .src.gui import run
-
-run()
@@ -0,0 +1,8 @@
+import time
+
+# Startup times (CONTACT_BOOK_STARTUP_TIMES) are measured from here
+started_at = time.perf_counter()
+
+from .src.gui import run
+
+run(started_at)
@@ -0,0 +1,175 @@
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TypedDict
+
+from sqlalchemy.exc import OperationalError
+
+from ..src.db_manager import (
+  main as db_main, init_db_session, session_scope, import_contacts, add, search_page, PROFILES,
+)
+from .data import MAX_ROWS, fake_contacts
+
+
+READ_PAGE_SIZE = 50
+READ_QUERIES = [None, None, None, 'sharma']
+
+
+class WorkerResult(TypedDict):
+  role: str
+  ops: int
+  rows: int
+  errors: int
+  p50_ms: float
+  p99_ms: float
+
+
+class ProfileResult(TypedDict):
+  profile: str
+  readers: int
+  reads_per_sec: float
+  read_p99_ms: float
+  writes_per_sec: float
+  commits_per_sec: float
+  write_p99_ms: float
+  errors: int
+
+
+def _summary(role: str, timings: list[float], rows: int, errors: int) -> WorkerResult:
+  cuts = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+  return {
+    'role': role,
+    'ops': len(timings),
+    'rows': rows,
+    'errors': errors,
+    'p50_ms': cuts[49] * 1000 if cuts else 0.0,
+    'p99_ms': cuts[98] * 1000 if cuts else 0.0,
+  }
+
+
+def _reader(path: Path, profile: str, rows: int, duration: float, start, results) -> None:
+  init_db_session(path, profile)
+  rng = random.Random()
+  timings, errors = [], 0
+
+  start.wait()
+  deadline = time.perf_counter() + duration
+  while (now := time.perf_counter()) < deadline:
+    try:
+      with session_scope():
+        page = search_page(rng.choice(READ_QUERIES), rng.randrange(rows), READ_PAGE_SIZE)
+      errors += page is None
+
+    except OperationalError:
+      errors += 1
+
+    timings.append(time.perf_counter() - now)
+
+  results.put(_summary('read', timings, 0, errors))
+
+
+def _writer(path: Path, profile: str, rows: int, batch: int, duration: float, start, results) -> None:
+  init_db_session(path, profile)
+  # Fresh contacts past the ones already in the table
+  contacts = fake_contacts(MAX_ROWS - rows, seed=1, start=rows)
+  timings, written, errors = [], 0, 0
+
+  start.wait()
+  deadline = time.perf_counter() + duration
+  while (now := time.perf_counter()) < deadline:
+    try:
+      with session_scope():
+        for _ in range(batch):
+          add(next(contacts))
+      written += batch
+
+    except OperationalError:
+      errors += 1
+
+    timings.append(time.perf_counter() - now)
+
+  results.put(_summary('write', timings, written, errors))
+
+
+def run_profile(profile: str, rows: int, readers: int, batch: int, duration: float) -> ProfileResult:
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    path = Path(tmp_dir) / 'contacts.db'
+    init_db_session(path, profile)
+    import_contacts(fake_contacts(rows))
+    db_main.DB_SESSION.close()
+    db_main.ENGINE.dispose()
+
+    # Separate processes, like several app instances sharing one file
+    context = multiprocessing.get_context('spawn')
+    start = context.Barrier(readers + 1)
+    results = context.Queue()
+    workers = [
+      context.Process(target=_reader, args=(path, profile, rows, duration, start, results))
+      for _ in range(readers)
+    ]
+    workers.append(
+      context.Process(target=_writer, args=(path, profile, rows, batch, duration, start, results))
+    )
+
+    for worker in workers:
+      worker.start()
+    summaries = [results.get() for _ in workers]
+    for worker in workers:
+      worker.join()
+
+  reads = [summary for summary in summaries if summary['role'] == 'read']
+  write = next(summary for summary in summaries if summary['role'] == 'write')
+  return {
+    'profile': profile,
+    'readers': readers,
+    'reads_per_sec': sum(summary['ops'] for summary in reads) / duration,
+    'read_p99_ms': max(summary['p99_ms'] for summary in reads),
+    'writes_per_sec': write['rows'] / duration,
+    'commits_per_sec': (write['ops'] - write['errors']) / duration,
+    'write_p99_ms': write['p99_ms'],
+    'errors': sum(summary['errors'] for summary in summaries),
+  }
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Compare engine profiles with several reader processes and one writer.'
+  )
+  parser.add_argument('--profiles', nargs='+', choices=list(PROFILES), default=list(PROFILES))
+  parser.add_argument('--rows', type=int, default=50_000)
+  parser.add_argument('--readers', type=int, default=4)
+  parser.add_argument('--batch', type=int, default=10, help='contacts added per write transaction')
+  parser.add_argument('--duration', type=float, default=5.0, help='seconds per profile')
+  parser.add_argument('--json', action='store_true', help='print the results as JSON')
+  args = parser.parse_args()
+
+  results = []
+  for profile in args.profiles:
+    print(f'running {profile}...', file=sys.stderr)
+    results.append(run_profile(profile, args.rows, args.readers, args.batch, args.duration))
+
+  if args.json:
+    print(json.dumps(results, indent=2))
+    return 0
+
+  print(
+    f"{'profile':<10} {'reads/s':>10} {'read p99 ms':>12} {'writes/s':>10} {'commits/s':>10}"
+    f" {'write p99 ms':>13} {'errors':>7}"
+  )
+  for result in results:
+    print(
+      f"{result['profile']:<10} {result['reads_per_sec']:>10.0f} {result['read_p99_ms']:>12.2f}"
+      f" {result['writes_per_sec']:>10.0f} {result['commits_per_sec']:>10.1f}"
+      f" {result['write_p99_ms']:>13.2f} {result['errors']:>7}"
+    )
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
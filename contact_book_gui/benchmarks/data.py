@@ -0,0 +1,105 @@
+import random
+from itertools import accumulate
+from typing import Iterator
+
+from ..src.db_manager import ContactEntry
+
+
+MAX_ROWS = 10_000_000
+
+# (value, weight) pairs, weights roughly follow how common each one is so
+# that searches hit realistically skewed result sizes
+FIRST_NAMES = [
+  ('Priya', 9), ('Amit', 9), ('Rahul', 8), ('Anjali', 7), ('Mohammed', 7), ('John', 6),
+  ('Maria', 6), ('Wei', 5), ('Fatima', 5), ('Carlos', 4), ('Aisha', 4), ('Liam', 3),
+  ('Yuki', 3), ('Olivia', 3), ('Arjun', 3), ('Sofia', 2), ('Kwame', 2), ('Elena', 2),
+  ('Hiroshi', 1), ('Zanele', 1),
+]
+LAST_NAMES = [
+  ('Sharma', 10), ('Patel', 9), ('Singh', 9), ('Kumar', 8), ('Smith', 6), ('Khan', 6),
+  ('Garcia', 5), ('Chen', 5), ('Kapoor', 4), ('Silva', 4), ('Okafor', 3), ('Brown', 3),
+  ('Tanaka', 2), ('Müller', 2), ('Nguyen', 2), ('Rossi', 1), ('Kowalski', 1), ('Dubois', 1),
+]
+EMAIL_DOMAINS = [
+  ('gmail.com', 45), ('yahoo.com', 15), ('outlook.com', 12), ('hotmail.com', 10),
+  ('icloud.com', 6), ('rediffmail.com', 4), ('proton.me', 2), ('example.org', 6),
+]
+STREETS = [
+  ('MG Road', 6), ('Main Street', 5), ('High Street', 4), ('Park Avenue', 3),
+  ('Station Road', 3), ('Church Lane', 2), ('Elm Drive', 2), ('Lake View', 1),
+]
+CITIES = [
+  ('Mumbai', 8), ('Delhi', 7), ('Bengaluru', 6), ('Chennai', 4), ('London', 4),
+  ('New York', 3), ('Hyderabad', 3), ('Pune', 3), ('Dubai', 2), ('Singapore', 1),
+]
+US_AREA_CODES = ['212', '310', '415', '617', '646', '702', '713', '917']
+
+
+def _weighted(pairs: list[tuple[str, int]]) -> tuple[list[str], list[int]]:
+  values, weights = zip(*pairs)
+  return list(values), list(accumulate(weights))
+
+
+# Every number embeds the row index, which keeps phone_no unique up to MAX_ROWS
+def _indian_mobile(rng: random.Random, idx: int) -> str:
+  digits = f'9{idx:09d}'
+  return rng.choice((
+    f'+91 {digits[:5]} {digits[5:]}',
+    f'+91{digits}',
+    f'0{digits}',
+    digits,
+  ))
+
+
+def _uk_mobile(rng: random.Random, idx: int) -> str:
+  digits = f'7{idx:09d}'
+  return rng.choice((f'+44 {digits[:4]} {digits[4:]}', f'0{digits}'))
+
+
+def _us_number(rng: random.Random, idx: int) -> str:
+  line = f'{idx:07d}'
+  return f'+1 {rng.choice(US_AREA_CODES)}-{line[:3]}-{line[3:]}'
+
+
+PHONE_FORMATS = [(_indian_mobile, 70), (_uk_mobile, 15), (_us_number, 15)]
+
+
+def fake_contacts(count: int, seed: int = 0, start: int = 0) -> Iterator[ContactEntry]:
+  if not (0 <= start and 0 <= count and start + count <= MAX_ROWS):
+    raise ValueError(f'Only the first {MAX_ROWS:,} contacts can be generated.')
+
+  # Seeded per (seed, start) so a later batch can be generated on its own
+  rng = random.Random(f'{seed}:{start}')
+  first_names, first_weights = _weighted(FIRST_NAMES)
+  last_names, last_weights = _weighted(LAST_NAMES)
+  domains, domain_weights = _weighted(EMAIL_DOMAINS)
+  streets, street_weights = _weighted(STREETS)
+  cities, city_weights = _weighted(CITIES)
+  phone_formats, phone_weights = _weighted(PHONE_FORMATS)
+
+  for idx in range(start, start + count):
+    first = rng.choices(first_names, cum_weights=first_weights)[0]
+    last = rng.choices(last_names, cum_weights=last_weights)[0]
+
+    # About 1 in 10 contacts has no phone number and 1 in 4 no email, but
+    # never both, validation needs one of them (or an address)
+    has_phone = rng.random() >= 0.1
+    has_email = not has_phone or rng.random() >= 0.25
+
+    phone_no = ''
+    if has_phone:
+      phone_no = rng.choices(phone_formats, cum_weights=phone_weights)[0](rng, idx)
+
+    email = ''
+    if has_email:
+      user = rng.choice((f'{first}.{last}', f'{first}{last}', f'{first[0]}.{last}', first))
+      domain = rng.choices(domains, cum_weights=domain_weights)[0]
+      email = f'{user}{idx}@{domain}'.lower().encode('ascii', 'ignore').decode()
+
+    address = ''
+    if rng.random() >= 0.4:
+      street = rng.choices(streets, cum_weights=street_weights)[0]
+      city = rng.choices(cities, cum_weights=city_weights)[0]
+      address = f'{rng.randint(1, 999)} {street}, {city}'
+
+    yield {'name': f'{first} {last}', 'phone_no': phone_no, 'email': email, 'address': address}
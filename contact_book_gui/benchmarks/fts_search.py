@@ -0,0 +1,62 @@
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from ..src.db_manager import main as db_main, import_contacts
+from .data import fake_contacts
+
+
+QUERIES = {
+  'name': 'Sharma',
+  'name_prefix': 'pri',
+  'email_domain': 'hotmail',
+  'city': 'Bengaluru',
+  'phone_prefix': '90000',
+  'miss': 'zzqx',
+}
+
+
+def time_query(query: str, fts: bool, repeat: int) -> tuple[float, int]:
+  timings = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    rows = db_main.DB_SESSION.scalars(db_main._search(query, fts)).all()
+    timings.append(time.perf_counter() - start)
+    db_main.DB_SESSION.expunge_all()
+
+  return statistics.median(timings), len(rows)
+
+
+def run(sizes: list[int], repeat: int) -> None:
+  print(f"{'rows':>9} {'query':<14} {'matches':>8} {'like ms':>10} {'fts ms':>10} {'speedup':>8}")
+
+  for size in sizes:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      db_main.init_db_session(Path(tmp_dir) / 'contacts.db')
+      import_contacts(fake_contacts(size))
+
+      for label, query in QUERIES.items():
+        like_time, like_rows = time_query(query, False, repeat)
+        fts_time, fts_rows = time_query(query, True, repeat)
+        print(
+          f'{size:>9} {label:<14} {fts_rows:>8} {like_time * 1000:>10.2f} {fts_time * 1000:>10.2f}'
+          f' {like_time / fts_time:>7.1f}x'
+          + ('' if like_rows == fts_rows else f'  (like matched {like_rows})')
+        )
+
+      db_main.DB_SESSION.get_bind().dispose()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description='Compare LIKE and FTS5 search() latency.')
+  parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+  parser.add_argument('--repeat', type=int, default=5)
+  args = parser.parse_args()
+
+  run(args.sizes, args.repeat)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from ..src.db_manager import main as db_main, init_db_session, import_contacts
+from .data import fake_contacts
+
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+# What `python -m contact_book_gui` runs, with the database path swapped
+LAUNCH = (
+  'import time; started_at = time.perf_counter(); '
+  'from contact_book_gui.src.gui import run; run(started_at, {path!r})'
+)
+MARKS = ('imports', 'first_paint', 'db_opened', 'first_rows')
+
+
+def launch(path: Path) -> dict[str, float]:
+  env = os.environ | {'CONTACT_BOOK_STARTUP_TIMES': 'exit'}
+  env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+  process = subprocess.run(
+    [sys.executable, '-c', LAUNCH.format(path=str(path))],
+    cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=300,
+  )
+  # The times are the last JSON line the GUI writes to stderr
+  for line in reversed(process.stderr.splitlines()):
+    if line.startswith('{'):
+      return json.loads(line)
+
+  raise RuntimeError(f'No startup times reported:\n{process.stderr}')
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Time the GUI from launch to imports done, first paint, database open and first rows.'
+  )
+  parser.add_argument('--rows', type=int, default=10_000, help='contacts in the database')
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--json', action='store_true', help='print every run as JSON')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    path = Path(tmp_dir) / 'contacts.db'
+    init_db_session(path)
+    import_contacts(fake_contacts(args.rows))
+    db_main.DB_SESSION.close()
+    db_main.ENGINE.dispose()
+
+    # The first launch also warms the OS file cache, it isn't counted
+    launch(path)
+    runs = [launch(path) for _ in range(args.repeat)]
+
+  if args.json:
+    print(json.dumps(runs, indent=2))
+    return 0
+
+  print(f"{'ms':<12} {'median':>8} {'min':>8} {'max':>8}")
+  for mark in MARKS:
+    times = [run[mark] for run in runs if mark in run]
+    if times:
+      print(f'{mark:<12} {statistics.median(times):>8.1f} {min(times):>8.1f} {max(times):>8.1f}')
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import typing as t
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TypedDict, Callable
+
+import sqlalchemy
+
+from ..src.db_manager import (
+  main as db_main, init_db_session, import_contacts, add, search, fuzzy_search, update, delete,
+  save_changes, validate_contacts, disable_query_cache, instrumentation_snapshot, reset_instrumentation,
+)
+from ..src.db_manager._phone import parse_phone_no
+from .data import MAX_ROWS, fake_contacts
+
+
+HIT_QUERIES = ['Sharma', 'pri', 'gmail', 'Mumbai']
+MISS_QUERIES = ['zzqx', 'qwxy']
+TYPO_QUERIES = ['priya shrama', 'kowalsky', 'olivia.rosi', 'hirosi tanaka']
+
+
+class ScenarioResult(TypedDict):
+  scenario: str
+  rows: int
+  ops: int
+  median_ms: float
+  min_ms: float
+  max_ms: float
+  per_op_us: float
+  extra: dict[str, t.Any]
+
+
+def _result(scenario: str, rows: int, ops: int, timings: list[float], **extra) -> ScenarioResult:
+  median = statistics.median(timings)
+  return {
+    'scenario': scenario,
+    'rows': rows,
+    'ops': ops,
+    'median_ms': median * 1000,
+    'min_ms': min(timings) * 1000,
+    'max_ms': max(timings) * 1000,
+    'per_op_us': median / ops * 1e6 if ops else 0.0,
+    'extra': extra,
+  }
+
+
+def _timed(func: Callable[[], t.Any]) -> tuple[float, t.Any]:
+  start = time.perf_counter()
+  val = func()
+  return time.perf_counter() - start, val
+
+
+def _dispose() -> None:
+  db_main.DB_SESSION.close()
+  db_main.DB_SESSION.get_bind().dispose()
+
+
+def bench_bulk_add(path: Path, rows: int, seed: int) -> ScenarioResult:
+  init_db_session(path)
+  elapsed, report = _timed(lambda: import_contacts(fake_contacts(rows, seed)))
+  return _result(
+    'bulk_add', rows, rows, [elapsed],
+    inserted=report['inserted'], rejected=report['rejected'], rows_per_sec=report['rows_per_sec'],
+  )
+
+
+def bench_validate(rows: int, seed: int, processes: int) -> ScenarioResult:
+  contacts = list(fake_contacts(rows, seed))
+  parse_phone_no.cache_clear()
+  elapsed, results = _timed(lambda: list(validate_contacts(contacts, processes)))
+  return _result(
+    'validate', rows, rows, [elapsed],
+    processes=processes, invalid=sum(bool(result['errors']) for result in results),
+    rows_per_sec=rows / elapsed,
+  )
+
+
+def bench_add(rows: int, ops: int, seed: int) -> ScenarioResult:
+  # Contacts past the ones already in the table, so nothing collides
+  contacts = list(fake_contacts(min(ops, MAX_ROWS - rows), seed, start=rows))
+
+  def run() -> None:
+    for contact in contacts:
+      add(contact)
+    save_changes()
+
+  elapsed, _ = _timed(run)
+  return _result('add', rows, len(contacts), [elapsed])
+
+
+def bench_search(
+  scenario: str,
+  rows: int,
+  queries: list[str],
+  repeat: int,
+  search: Callable[[str], t.Sized] = search,
+) -> ScenarioResult:
+  timings, matches = [], {}
+  for _ in range(repeat):
+    start = time.perf_counter()
+    for query in queries:
+      matches[query] = len(search(query))
+    timings.append(time.perf_counter() - start)
+    db_main.DB_SESSION.expunge_all()
+
+  return _result(scenario, rows, len(queries), timings, matches=matches)
+
+
+def bench_writes(rows: int, ops: int, seed: int) -> list[ScenarioResult]:
+  rng = random.Random(seed)
+  ids = rng.sample(range(1, rows + 1), min(ops, rows))
+  half = len(ids) // 2
+  updated_ids, deleted_ids = ids[:half], ids[half:]
+
+  def run_updates() -> None:
+    for _id in updated_ids:
+      update({'id': _id}, {'address': f'{_id} Benchmark Lane'})
+
+  def run_deletes() -> None:
+    for _id in deleted_ids:
+      delete({'id': _id})
+
+  update_time, _ = _timed(run_updates)
+  save_time, _ = _timed(save_changes)
+  delete_time, _ = _timed(run_deletes)
+  save_changes()
+
+  return [
+    _result('update', rows, len(updated_ids), [update_time]),
+    _result('save_changes', rows, len(updated_ids), [save_time]),
+    _result('delete', rows, len(deleted_ids), [delete_time]),
+  ]
+
+
+def bench_cold_init(path: Path, rows: int, repeat: int) -> ScenarioResult:
+  timings = []
+  for _ in range(repeat):
+    _dispose()
+    elapsed, _ = _timed(lambda: init_db_session(path))
+    timings.append(elapsed)
+
+  return _result('cold_init_db_session', rows, 1, timings)
+
+
+def bench_load_db(path: Path, rows: int, repeat: int) -> ScenarioResult | None:
+  try:
+    from PySide6.QtCore import QEventLoop
+    from PySide6.QtWidgets import QApplication
+
+  except ImportError:
+    return None
+
+  from ..src.gui import ContactBook
+
+  os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+  app = QApplication.instance() or QApplication([])
+
+  def construct() -> ContactBook:
+    # The database is opened in the background once the window exists
+    window = ContactBook(path)
+    loop = QEventLoop()
+    window.db_opened.connect(loop.quit)
+    loop.exec()
+    return window
+
+  construct_time, window = _timed(construct)
+  model = window.contact_model
+
+  def load() -> None:
+    loop = QEventLoop()
+    quit_when_loaded = lambda loading: loading or loop.quit()
+    model.loading_changed.connect(quit_when_loaded)
+    window.load_db()
+    if model.is_loading:
+      loop.exec()
+    model.loading_changed.disconnect(quit_when_loaded)
+
+  # Let the page requested by the constructor land before timing reloads
+  load()
+  timings = [_timed(load)[0] for _ in range(repeat)]
+
+  window.db_runner.stop()
+  window.deleteLater()
+  app.processEvents()
+  return _result(
+    'load_db', rows, 1, timings, first_page_rows=model.rowCount(), construct_ms=construct_time * 1000,
+  )
+
+
+def run_size(rows: int, args: argparse.Namespace) -> list[ScenarioResult]:
+  results = []
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    path = Path(tmp_dir) / 'contacts.db'
+    results.append(bench_validate(rows, args.seed, args.processes))
+    results.append(bench_bulk_add(path, rows, args.seed))
+    results.append(bench_add(rows, args.ops, args.seed))
+    results.append(bench_search('search_hit', rows, HIT_QUERIES, args.repeat))
+    results.append(bench_search('search_miss', rows, MISS_QUERIES, args.repeat))
+    results.append(bench_search('fuzzy_search', rows, TYPO_QUERIES, args.repeat, fuzzy_search))
+    results.extend(bench_writes(rows, args.ops, args.seed))
+    results.append(bench_cold_init(path, rows, args.repeat))
+    _dispose()
+
+    if not args.no_gui and (result := bench_load_db(path, rows, args.repeat)) is not None:
+      results.append(result)
+
+  return results
+
+
+def _environment() -> dict[str, str]:
+  return {
+    'python': platform.python_version(),
+    'sqlalchemy': sqlalchemy.__version__,
+    'sqlite': sqlite3.sqlite_version,
+    'platform': platform.platform(),
+    'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+  }
+
+
+def compare(results: list[ScenarioResult], baseline_path: Path, threshold: float) -> list[str]:
+  baseline = {
+    (result['scenario'], result['rows']): result
+    for result in json.loads(baseline_path.read_text())['results']
+  }
+
+  regressions = []
+  for result in results:
+    old = baseline.get((result['scenario'], result['rows']))
+    if old is None or not old['median_ms']:
+      continue
+
+    ratio = result['median_ms'] / old['median_ms']
+    if ratio > threshold:
+      regressions.append(
+        f"{result['scenario']} @ {result['rows']:,} rows: "
+        f"{old['median_ms']:.2f}ms -> {result['median_ms']:.2f}ms ({ratio:.2f}x)"
+      )
+
+  return regressions
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(description='Time db_manager and GUI operations on synthetic contacts.')
+  parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--ops', type=int, default=1_000, help='rows touched by add/update/delete')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument(
+    '--processes', type=int, default=1, help='worker processes for validate, 0 for one per core'
+  )
+  parser.add_argument('--no-gui', action='store_true', help='skip the ContactBook.load_db scenario')
+  parser.add_argument('-o', '--output', type=Path, help='write the JSON report here instead of stdout')
+  parser.add_argument('--baseline', type=Path, help='fail if a scenario got slower than in this report')
+  parser.add_argument('--threshold', type=float, default=1.25, help='allowed slowdown against --baseline')
+  args = parser.parse_args()
+
+  if any(not 0 < size <= MAX_ROWS for size in args.sizes):
+    parser.error(f'sizes must be between 1 and {MAX_ROWS:,}')
+
+  # The cache would turn repeated searches into dictionary lookups
+  disable_query_cache()
+
+  results, operations = [], {}
+  for size in args.sizes:
+    print(f'benchmarking {size:,} rows...', file=sys.stderr)
+    reset_instrumentation()
+    results.extend(run_size(size, args))
+    # Per call latency histograms of every db_manager operation the run touched
+    operations[size] = instrumentation_snapshot()
+
+  report = json.dumps(
+    {'environment': _environment(), 'results': results, 'operations': operations}, indent=2
+  )
+  if args.output:
+    args.output.write_text(report)
+  else:
+    print(report)
+
+  if args.baseline is None:
+    return 0
+
+  regressions = compare(results, args.baseline, args.threshold)
+  for regression in regressions:
+    print(f'regression: {regression}', file=sys.stderr)
+  return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
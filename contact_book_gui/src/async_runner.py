@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import typing as t
+from concurrent.futures import Future
+
+from PySide6.QtCore import QObject, Signal
+
+
+# Runs coroutines on an event loop in a background thread. Completion
+# callbacks and progress reports are delivered back on the thread that owns
+# the runner (the UI thread) through queued signals.
+class AsyncRunner(QObject):
+  progress = Signal(int, int)
+  failed = Signal(object)
+  _completed = Signal(object, object)
+
+  def __init__(self, parent=None) -> None:
+    super().__init__(parent)
+
+    self._loop = asyncio.new_event_loop()
+    self._thread = threading.Thread(target=self._loop.run_forever, name='db-worker', daemon=True)
+    self._thread.start()
+
+    self._completed.connect(self._dispatch)
+
+  def submit[T](
+    self,
+    coro: t.Coroutine[t.Any, t.Any, T],
+    on_done: t.Callable[[T], None] | None = None,
+    on_error: t.Callable[[Exception], None] | None = None,
+  ) -> Future[T]:
+    future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+    future.add_done_callback(lambda future: self._completed.emit(future, (on_done, on_error)))
+    return future
+
+  def run[T](self, coro: t.Coroutine[t.Any, t.Any, T]) -> T:
+    return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+  def report_progress(self, done: int, total: int) -> None:
+    # Safe to call from the worker thread, the signal is queued to the UI
+    self.progress.emit(done, total)
+
+  def _dispatch(self, future: Future, callbacks: tuple[t.Callable | None, t.Callable | None]) -> None:
+    on_done, on_error = callbacks
+    if future.cancelled():
+      return
+
+    if (error := future.exception()) is not None:
+      if on_error is not None:
+        on_error(error)
+      else:
+        self.failed.emit(error)
+      return
+
+    if on_done is not None:
+      on_done(future.result())
+
+  def stop(self) -> None:
+    self._loop.call_soon_threadsafe(self._loop.stop)
+    self._thread.join()
@@ -1,14 +1,66 @@
 from .main import init_db_session as init_db_session
+from .main import session_scope as session_scope
+from .main import current_session as current_session
+from ._engine import EngineProfile as EngineProfile
+from ._engine import PROFILES as PROFILES
 
 from .main import add as add
 from .main import search as search
+from .main import search_page as search_page
+from .main import SortOrder as SortOrder
+from .main import SORT_COLUMNS as SORT_COLUMNS
+from .main import iter_search as iter_search
+from .main import fuzzy_search as fuzzy_search
+from .main import FuzzyMatch as FuzzyMatch
 from .main import update as update
 from .main import delete as delete
 from .main import save_changes as save_changes
+from .main import find_by_phone as find_by_phone
+from .main import find_duplicates as find_duplicates
+from ._unit_of_work import flush_changes as flush_changes
+from ._unit_of_work import FlushReport as FlushReport
 
 from .main import validator as validator
+from ._validation import validate_contacts as validate_contacts
+from ._validation import ValidationResult as ValidationResult
+from ._validation import ERROR_MESSAGES as ERROR_MESSAGES
+from ._phone import normalize_phone_no as normalize_phone_no
 from .main import ContactEntry as ContactEntry
 from .main import DB_COLUMNS as DB_COLUMNS
 
 
 from ._table_managers import Contact as Contact
+
+from ._cache import configure_query_cache as configure_query_cache
+from ._cache import disable_query_cache as disable_query_cache
+from ._cache import query_cache_stats as query_cache_stats
+from ._cache import ContactSnapshot as ContactSnapshot
+
+from ._instrumentation import instrumentation_snapshot as instrumentation_snapshot
+from ._instrumentation import reset_instrumentation as reset_instrumentation
+from ._instrumentation import dump_instrumentation as dump_instrumentation
+
+from ._bulk import import_contacts as import_contacts
+from ._bulk import export_contacts as export_contacts
+
+from ._batch import run_commands as run_commands
+from ._batch import CommandResult as CommandResult
+
+from ._journal import export_changes as export_changes
+from ._journal import apply_changes as apply_changes
+from ._journal import changes_version as changes_version
+from ._journal import dump_changes as dump_changes
+from ._journal import load_changes as load_changes
+from ._journal import ChangeRecord as ChangeRecord
+from ._journal import ApplyReport as ApplyReport
+
+from ._async import init_async_db_session as init_async_db_session
+from ._async import async_add as async_add
+from ._async import async_search as async_search
+from ._async import async_search_page as async_search_page
+from ._async import async_iter_search as async_iter_search
+from ._async import async_fuzzy_search as async_fuzzy_search
+from ._async import async_update as async_update
+from ._async import async_delete as async_delete
+from ._async import async_save_changes as async_save_changes
+from ._async import async_flush_changes as async_flush_changes
@@ -0,0 +1,172 @@
+import argparse
+import contextlib
+import csv
+import json
+import sys
+import typing as t
+
+from . import (
+  init_db_session, import_contacts, export_contacts, export_changes, apply_changes, dump_changes,
+  load_changes, run_commands, DB_COLUMNS,
+)
+from ._batch import BATCH_SIZE, COMMANDS
+from ._bulk import DEFAULT_CHUNK_SIZE, FORMATS, READERS, guess_format
+from ._formatting import print_info, print_error
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    prog='python -m contact_book_gui.src.db_manager',
+    description='Bulk import and export contacts, sync them between databases and run batches of commands.',
+  )
+  subparsers = parser.add_subparsers(dest='command', required=True)
+
+  import_parser = subparsers.add_parser('import', help='Import contacts from a file.')
+  import_parser.add_argument('path')
+  import_parser.add_argument('--rejects', help='Write rejected rows with the reason to this CSV file.')
+  import_parser.add_argument(
+    '--processes', type=int, default=1,
+    help='Validate rows in this many worker processes, 0 for one per core.',
+  )
+
+  export_parser = subparsers.add_parser('export', help='Export all contacts to a file.')
+  export_parser.add_argument('path')
+
+  for sub_parser in (import_parser, export_parser):
+    sub_parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+    sub_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+  export_changes_parser = subparsers.add_parser(
+    'export-changes', help='Write the changes made after a journal version as NDJSON.'
+  )
+  export_changes_parser.add_argument('path', help="'-' for stdout")
+  export_changes_parser.add_argument(
+    '--since', type=int, default=0, help='Last version the other database has applied.'
+  )
+
+  apply_changes_parser = subparsers.add_parser(
+    'apply-changes', help='Apply changes written by export-changes.'
+  )
+  apply_changes_parser.add_argument('path', help="'-' for stdin")
+  apply_changes_parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+  batch_parser = subparsers.add_parser(
+    'batch',
+    help=f"Run JSON commands, one per line ({', '.join(COMMANDS)}), and write a JSON result for each.",
+  )
+  batch_parser.add_argument('path', nargs='?', default='-', help="Defaults to '-', stdin.")
+  batch_parser.add_argument(
+    '--batch-size', type=int, default=BATCH_SIZE, help='Commands per transaction.'
+  )
+
+  return parser.parse_args(argv)
+
+
+def run_import(args: argparse.Namespace) -> int:
+  fmt = args.format or guess_format(args.path)
+
+  with contextlib.ExitStack() as stack:
+    on_reject = None
+
+    if args.rejects:
+      rejects_writer = csv.writer(
+        stack.enter_context(open(args.rejects, 'w', newline='', encoding='utf-8'))
+      )
+      rejects_writer.writerow(['line', *DB_COLUMNS, 'reason'])
+
+      def on_reject(line_no, entry, reason):
+        rejects_writer.writerow([line_no, *(entry[col] for col in DB_COLUMNS), reason])
+
+    file = stack.enter_context(open(args.path, newline='', encoding='utf-8'))
+    report = import_contacts(READERS[fmt](file), args.chunk_size, on_reject, args.processes)
+
+  if report is None:
+    return 1
+
+  print_info(
+    f"Imported {report['inserted']}/{report['total']} rows, rejected {report['rejected']}"
+    f" in {report['elapsed']:.2f}s ({report['rows_per_sec']:,.0f} rows/sec)"
+  )
+  return 0
+
+
+def run_export(args: argparse.Namespace) -> int:
+  exported = export_contacts(args.path, args.format, args.chunk_size)
+  if exported is None:
+    return 1
+
+  print_info(f'Exported {exported} rows to {args.path}')
+  return 0
+
+
+def _open_stream(path: str, mode: str, stack: contextlib.ExitStack) -> t.TextIO:
+  if path == '-':
+    return sys.stdout if 'w' in mode else sys.stdin
+  return stack.enter_context(open(path, mode, encoding='utf-8'))
+
+
+def run_export_changes(args: argparse.Namespace) -> int:
+  changes = export_changes(args.since)
+  if changes is None:
+    return 1
+
+  with contextlib.ExitStack() as stack:
+    written = dump_changes(changes, _open_stream(args.path, 'w', stack))
+
+  print_info(f'Exported {written} changes since version {args.since}')
+  return 0
+
+
+def run_apply_changes(args: argparse.Namespace) -> int:
+  with contextlib.ExitStack() as stack:
+    report = apply_changes(load_changes(_open_stream(args.path, 'r', stack)), args.chunk_size)
+
+  if report is None:
+    return 1
+
+  for uid, reason in report['conflicts'].items():
+    print_error(f'{uid}: {reason}')
+
+  print_info(
+    f"Upserted {report['upserted']}, deleted {report['deleted']}, {len(report['conflicts'])}"
+    f" conflicts, up to version {report['last_version']}"
+  )
+  return 0
+
+
+def run_batch(args: argparse.Namespace) -> int:
+  failed = 0
+
+  with contextlib.ExitStack() as stack:
+    for result in run_commands(_open_stream(args.path, 'r', stack), args.batch_size):
+      failed += not result['ok']
+      sys.stdout.write(json.dumps(result, ensure_ascii=False, separators=(',', ':'), default=str))
+      sys.stdout.write('\n')
+
+      # Whoever feeds the commands may be waiting for these results
+      if result['op'] == 'commit':
+        sys.stdout.flush()
+
+  sys.stdout.flush()
+  return 1 if failed else 0
+
+
+RUNNERS = {
+  'import': run_import,
+  'export': run_export,
+  'export-changes': run_export_changes,
+  'apply-changes': run_apply_changes,
+  'batch': run_batch,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = parse_args(argv)
+  init_db_session()
+
+  return RUNNERS[args.command](args)
+
+
+# Worker processes started with spawn import this module again
+if __name__ == '__main__':
+  sys.exit(main())
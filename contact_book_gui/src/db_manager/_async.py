@@ -0,0 +1,179 @@
+import asyncio
+import typing as t
+from pathlib import Path
+from types import MappingProxyType
+from typing import AsyncIterator, Iterable
+
+from sqlalchemy import update as sa_update, delete as sa_delete
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from . import main as _main
+from ._table_managers import Contact
+from ._engine import EngineProfile, create_async_db_engine
+from ._phone import with_phone_e164
+from ._formatting import print_err_to_stderr
+from ._instrumentation import instrumented
+from ._unit_of_work import FLUSH_CHUNK_SIZE, FlushReport, ProgressHandler, _apply_changes
+from . import _cache
+from ._cache import ContactSnapshot, bump_generation, async_cached_query, freeze_rows, freeze_entries
+
+
+# Reads get a short lived session each, so they can run (and be cancelled)
+# alongside each other. Writes share one session, like the sync API, and
+# are serialized by a lock because an AsyncSession can't be used by
+# concurrent tasks.
+_WRITE_LOCK = asyncio.Lock()
+
+
+@print_err_to_stderr
+@instrumented
+async def init_async_db_session(
+  path: str | Path = _main.db_path,
+  profile: str | EngineProfile | None = None,
+) -> AsyncSession:
+  global ASYNC_SESSION_MAKER, ASYNC_DB_SESSION
+
+  engine = create_async_db_engine(path, profile)
+  async with engine.begin() as conn:
+    await conn.run_sync(_main._create_schema)
+
+  ASYNC_SESSION_MAKER = async_sessionmaker(engine, expire_on_commit=False)
+  ASYNC_DB_SESSION = ASYNC_SESSION_MAKER()
+  return ASYNC_DB_SESSION
+
+
+@print_err_to_stderr
+@instrumented
+async def async_add(values: _main.ContactEntry) -> int:
+  contact = _main._new_contact(values)
+
+  # Like add(): the row waits in the write session's transaction and is
+  # committed with the rest of the pending changes, by the next
+  # async_flush_changes() or async_save_changes()
+  async with _WRITE_LOCK:
+    async with ASYNC_DB_SESSION.begin_nested():
+      ASYNC_DB_SESSION.add(contact)
+
+  bump_generation()
+  return contact.id
+
+
+@print_err_to_stderr
+@instrumented
+async def async_search(query: str | None = None, fts: bool = True) -> list[ContactSnapshot]:
+  # Same result types as search() and search_page()
+  async def load() -> tuple[ContactSnapshot, ...]:
+    async with ASYNC_SESSION_MAKER() as session:
+      statement = _main._search(query, fts).with_only_columns(*_main.CONTACT_COLUMNS)
+      return freeze_rows(await session.execute(statement))
+
+  if _cache.QUERY_CACHE is None:
+    return list(await load())
+  return list(await async_cached_query(_main._cache_key('search', query, fts), load))
+
+
+@print_err_to_stderr
+@instrumented
+async def async_search_page(
+  query: str | None = None,
+  after_id: int = 0,
+  limit: int = _main.DEFAULT_PAGE_SIZE,
+  fts: bool = True,
+  order: _main.SortOrder = _main.SortOrder(),
+  after_value: t.Any = None,
+) -> list[_main.ContactEntry]:
+  statement = _main._search_page(query, after_id, limit, fts, order, after_value)
+
+  if _cache.QUERY_CACHE is None:
+    async with ASYNC_SESSION_MAKER() as session:
+      result = await session.execute(statement)
+      return [dict(row) for row in result.mappings()]
+
+  async def load() -> tuple[MappingProxyType, ...]:
+    async with ASYNC_SESSION_MAKER() as session:
+      return freeze_entries((await session.execute(statement)).mappings())
+
+  entries = await async_cached_query(
+    _main._cache_key('search_page', query, fts, after_id, limit, order, after_value), load
+  )
+  return [dict(entry) for entry in entries]
+
+
+@print_err_to_stderr
+@instrumented
+async def async_fuzzy_search(
+  query: str,
+  max_distance: int | None = None,
+  limit: int = _main.DEFAULT_FUZZY_LIMIT,
+) -> list[_main.FuzzyMatch]:
+  query = query.strip()
+  if max_distance is None:
+    max_distance = _main.default_max_distance(query)
+
+  statement = _main._fuzzy_search(query, max_distance)
+  if statement is None:
+    return []
+
+  async with ASYNC_SESSION_MAKER() as session:
+    result = await session.execute(statement)
+    return _main._rank_fuzzy(query, result.mappings(), max_distance, limit)
+
+
+async def async_iter_search(
+  query: str | None = None,
+  batch_size: int = _main.DEFAULT_PAGE_SIZE,
+  fts: bool = True,
+) -> AsyncIterator[_main.ContactEntry]:
+  async with ASYNC_SESSION_MAKER() as session:
+    result = await session.stream(
+      _main._search_rows(query, fts).order_by(Contact.id),
+      execution_options={'yield_per': batch_size},
+    )
+    async for row in result.mappings():
+      yield dict(row)
+
+
+@print_err_to_stderr
+@instrumented
+async def async_update(query: _main.ContactEntry, values: _main.ContactEntry) -> None:
+  async with _WRITE_LOCK:
+    await ASYNC_DB_SESSION.execute(
+      sa_update(Contact).filter_by(**query).values(with_phone_e164(values))
+    )
+  bump_generation()
+
+
+@print_err_to_stderr
+@instrumented
+async def async_delete(query: _main.ContactEntry) -> None:
+  async with _WRITE_LOCK:
+    await ASYNC_DB_SESSION.execute(sa_delete(Contact).filter_by(**query))
+  bump_generation()
+
+
+@print_err_to_stderr
+@instrumented
+async def async_save_changes() -> None:
+  async with _WRITE_LOCK:
+    await ASYNC_DB_SESSION.commit()
+  bump_generation()
+
+
+@print_err_to_stderr
+@instrumented
+async def async_flush_changes(
+  changes: t.Mapping[int, dict[str, t.Any]],
+  deletions: Iterable[int] = (),
+  chunk_size: int = FLUSH_CHUNK_SIZE,
+  on_progress: ProgressHandler | None = None,
+) -> FlushReport:
+  async with _WRITE_LOCK:
+    report = await ASYNC_DB_SESSION.run_sync(
+      lambda session: _apply_changes(
+        session.connection(), changes, deletions, chunk_size, on_progress
+      )
+    )
+    await ASYNC_DB_SESSION.commit()
+
+  bump_generation()
+  return report
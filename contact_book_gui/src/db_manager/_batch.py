@@ -0,0 +1,245 @@
+import json
+import typing as t
+from typing import TypedDict, NotRequired, Iterable, Iterator, Callable
+
+from sqlalchemy import Connection, ColumnElement, and_, insert, update, delete
+from sqlalchemy.exc import IntegrityError, StatementError
+
+from . import main as _main
+from ._table_managers import Contact
+from ._phone import with_phone_e164
+from ._validation import ERROR_MESSAGES, validate_contact
+from ._bulk import DEFAULT_CHUNK_SIZE, READERS, _import_contacts, _export_contacts, guess_format
+from ._cache import bump_generation
+
+
+BATCH_SIZE = 1_000
+CONTACTS_TABLE = Contact.__table__
+FILTER_COLUMNS = ('id', *_main.DB_COLUMNS)
+# What a column of 'query' can be compared to
+FILTER_VALUE_TYPES = (str, int, float, type(None))
+
+
+class CommandError(Exception):
+  pass
+
+
+class CommandResult(TypedDict):
+  # 1-based position of the command in the input
+  line: int
+  op: str | None
+  ok: bool
+  # Copied from the command, to match results to commands
+  ref: NotRequired[t.Any]
+  result: NotRequired[t.Any]
+  error: NotRequired[str]
+
+
+type Command = dict[str, t.Any]
+type Handler = Callable[[Connection, Command], t.Any]
+
+
+def _filter(query: t.Any) -> ColumnElement[bool]:
+  if not isinstance(query, dict) or not query:
+    raise CommandError("'query' must be an object with at least one column.")
+
+  if unknown := set(query) - set(FILTER_COLUMNS):
+    raise CommandError(f"Unknown columns in 'query': {', '.join(sorted(unknown))}.")
+
+  if invalid := [col for col, value in query.items() if not isinstance(value, FILTER_VALUE_TYPES)]:
+    raise CommandError(
+      f"Columns in 'query' must be compared to a string, number or null: {', '.join(invalid)}."
+    )
+
+  return and_(*(CONTACTS_TABLE.c[col] == value for col, value in query.items()))
+
+
+def _values(command: Command) -> dict[str, t.Any]:
+  values = command.get('values')
+  if not isinstance(values, dict) or not values:
+    raise CommandError("'values' must be an object with at least one column.")
+
+  if unknown := set(values) - set(_main.DB_COLUMNS):
+    raise CommandError(f"Unknown columns in 'values': {', '.join(sorted(unknown))}.")
+
+  if invalid := [col for col, value in values.items() if not isinstance(value, str | None)]:
+    raise CommandError(f"Columns in 'values' must be strings or null: {', '.join(invalid)}.")
+
+  return values
+
+
+def _search(conn: Connection, command: Command) -> list[dict[str, t.Any]]:
+  statement = _main._search_page(
+    command.get('query') or None,
+    command.get('after_id', 0),
+    command.get('limit', _main.DEFAULT_PAGE_SIZE),
+    command.get('fts', True),
+    _main.SortOrder(command.get('order_by', 'id'), bool(command.get('descending'))),
+    command.get('after_value'),
+  )
+  return [dict(row) for row in conn.execute(statement).mappings()]
+
+
+def _add(conn: Connection, command: Command) -> dict[str, int]:
+  validation = validate_contact(_values(command))
+  if validation['errors']:
+    raise CommandError(ERROR_MESSAGES[validation['errors'][0]])
+
+  result = conn.execute(insert(CONTACTS_TABLE), validation['values'])
+  return {'id': result.inserted_primary_key[0]}
+
+
+def _update(conn: Connection, command: Command) -> dict[str, int]:
+  # Empty strings would collide with each other on the unique columns
+  values = with_phone_e164({col: val or None for col, val in _values(command).items()})
+
+  result = conn.execute(update(CONTACTS_TABLE).where(_filter(command.get('query'))).values(values))
+  return {'updated': result.rowcount}
+
+
+def _delete(conn: Connection, command: Command) -> dict[str, int]:
+  result = conn.execute(delete(CONTACTS_TABLE).where(_filter(command.get('query'))))
+  return {'deleted': result.rowcount}
+
+
+def _path(command: Command) -> str:
+  if not isinstance(path := command.get('path'), str):
+    raise CommandError("'path' must be a file path.")
+  return path
+
+
+def _import(command: Command) -> dict[str, t.Any]:
+  path = _path(command)
+  rejects: list[dict[str, t.Any]] = []
+
+  def on_reject(line_no: int, entry: _main.ContactEntry, reason: str) -> None:
+    rejects.append({'line': line_no, 'reason': reason})
+
+  with open(path, newline='', encoding='utf-8') as file:
+    report = _import_contacts(
+      READERS[command.get('format') or guess_format(path)](file),
+      command.get('chunk_size', DEFAULT_CHUNK_SIZE),
+      on_reject,
+    )
+  return report | {'rejects': rejects}
+
+
+def _export(command: Command) -> dict[str, int]:
+  return {'exported': _export_contacts(_path(command), command.get('format'))}
+
+
+HANDLERS: dict[str, Handler] = {
+  'search': _search,
+  'add': _add,
+  'update': _update,
+  'delete': _delete,
+}
+# These manage their own transactions, the open batch is committed first
+STANDALONE_HANDLERS: dict[str, Callable[[Command], t.Any]] = {
+  'import': _import,
+  'export': _export,
+}
+COMMANDS = (*HANDLERS, *STANDALONE_HANDLERS, 'commit')
+
+
+def _decode(command: str | t.Mapping[str, t.Any]) -> Command:
+  if isinstance(command, str):
+    try:
+      command = json.loads(command)
+    except json.JSONDecodeError as e:
+      raise CommandError(f'Invalid JSON: {e}') from None
+
+  if not isinstance(command, dict):
+    raise CommandError('A command must be a JSON object.')
+
+  if command.get('op') not in COMMANDS:
+    raise CommandError(f"'op' must be one of {', '.join(COMMANDS)}.")
+
+  return command
+
+
+def _result(line: int, command: Command | None, **outcome: t.Any) -> CommandResult:
+  result: CommandResult = {'line': line, 'op': command and command['op'], **outcome}
+  if command is not None and 'ref' in command:
+    result['ref'] = command['ref']
+  return result
+
+
+def _run(handler: Callable[[], t.Any], line: int, command: Command) -> CommandResult:
+  try:
+    return _result(line, command, ok=True, result=handler())
+
+  except CommandError as e:
+    return _result(line, command, ok=False, error=str(e))
+
+  except IntegrityError as e:
+    return _result(line, command, ok=False, error=str(e.orig))
+
+  except StatementError as e:
+    # Parameters the driver can't bind, and the like
+    return _result(line, command, ok=False, error=f'{type(e.orig).__name__}: {e.orig}')
+
+  except (ValueError, TypeError, KeyError, OSError) as e:
+    return _result(line, command, ok=False, error=f'{type(e).__name__}: {e}')
+
+
+def _in_savepoint(conn: Connection, handler: Handler, command: Command) -> t.Any:
+  # A command that fails is undone whole, without touching the rest of its
+  # batch
+  with conn.begin_nested():
+    return handler(conn, command)
+
+
+def run_commands(
+  commands: Iterable[str | t.Mapping[str, t.Any]],
+  batch_size: int = BATCH_SIZE,
+) -> Iterator[CommandResult]:
+  # Commands run in order on one connection, batch_size of them per
+  # transaction. A failing command is reported and the rest of its batch
+  # still commits, each command runs in a savepoint. Results are yielded
+  # once their batch has committed; {"op": "commit"} ends a batch early.
+  pending = enumerate(commands, start=1)
+  engine = _main.ENGINE
+
+  while True:
+    results: list[CommandResult] = []
+    standalone: tuple[int, Command] | None = None
+
+    with engine.begin() as conn:
+      for line, raw in pending:
+        if isinstance(raw, str) and not raw.strip():
+          continue
+
+        try:
+          command = _decode(raw)
+        except CommandError as e:
+          results.append(_result(line, None, ok=False, error=str(e)))
+          continue
+
+        op = command['op']
+        if op in STANDALONE_HANDLERS:
+          standalone = line, command
+          break
+
+        if op == 'commit':
+          results.append(_result(line, command, ok=True))
+          break
+
+        results.append(_run(lambda: _in_savepoint(conn, HANDLERS[op], command), line, command))
+        if len(results) >= batch_size:
+          break
+
+      else:
+        pending = None
+
+    bump_generation()
+    yield from results
+
+    if standalone is not None:
+      line, command = standalone
+      yield _run(lambda: STANDALONE_HANDLERS[command['op']](command), line, command)
+      bump_generation()
+
+    if pending is None:
+      return
+
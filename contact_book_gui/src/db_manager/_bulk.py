@@ -0,0 +1,324 @@
+import csv
+import re
+import time
+import typing as t
+from itertools import batched
+from pathlib import Path
+from typing import TypedDict, Iterable, Iterator, Callable
+
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+
+from . import main as _main
+from ._table_managers import Contact
+from ._validation import ERROR_MESSAGES, ValidationResult, validate_contacts
+from ._formatting import print_err_to_stderr
+from ._instrumentation import instrumented
+from ._cache import bump_generation
+
+
+DEFAULT_CHUNK_SIZE = 5_000
+CONTACTS_TABLE = Contact.__table__
+VCARD_ESCAPE = re.compile(r'\\(.)')
+# One component of a structured value (N, ADR) and the ';' after it. An
+# escaped character, '\;' included, is part of the component.
+VCARD_COMPONENT = re.compile(r'((?:\\.?|[^\\;])*)(;|$)')
+FORMATS = ('csv', 'vcf')
+
+
+class ImportReport(TypedDict):
+  total: int
+  inserted: int
+  rejected: int
+  elapsed: float
+  rows_per_sec: float
+
+
+type RejectHandler = Callable[[int, _main.ContactEntry, str], None]
+
+
+def _accept_chunk(
+  chunk: tuple[tuple[int, ValidationResult], ...],
+  on_reject: RejectHandler,
+) -> list[tuple[int, _main.ContactEntry]]:
+  valid = []
+  seen_phone_nos: set[str] = set()
+  seen_emails: set[str] = set()
+
+  for line_no, result in chunk:
+    entry = result['values']
+
+    if result['errors']:
+      on_reject(line_no, entry, ERROR_MESSAGES[result['errors'][0]])
+      continue
+
+    if entry['phone_no'] in seen_phone_nos:
+      on_reject(line_no, entry, 'Duplicate phone number in input.')
+      continue
+
+    if entry['email'] in seen_emails:
+      on_reject(line_no, entry, 'Duplicate email in input.')
+      continue
+
+    if entry['phone_no']:
+      seen_phone_nos.add(entry['phone_no'])
+    if entry['email']:
+      seen_emails.add(entry['email'])
+
+    valid.append((line_no, entry))
+
+  return valid
+
+
+def _drop_existing(
+  conn,
+  rows: list[tuple[int, _main.ContactEntry]],
+  on_reject: RejectHandler,
+) -> list[tuple[int, _main.ContactEntry]]:
+  phone_nos = [entry['phone_no'] for _, entry in rows if entry['phone_no']]
+  emails = [entry['email'] for _, entry in rows if entry['email']]
+
+  existing_phone_nos = set(conn.scalars(
+    select(CONTACTS_TABLE.c.phone_no).where(CONTACTS_TABLE.c.phone_no.in_(phone_nos))
+  )) if phone_nos else set()
+  existing_emails = set(conn.scalars(
+    select(CONTACTS_TABLE.c.email).where(CONTACTS_TABLE.c.email.in_(emails))
+  )) if emails else set()
+
+  if not (existing_phone_nos or existing_emails):
+    return rows
+
+  fresh = []
+  for line_no, entry in rows:
+    if entry['phone_no'] in existing_phone_nos:
+      on_reject(line_no, entry, 'Phone number already exists.')
+    elif entry['email'] in existing_emails:
+      on_reject(line_no, entry, 'Email already exists.')
+    else:
+      fresh.append((line_no, entry))
+
+  return fresh
+
+
+def _insert_rows(conn, rows: list[tuple[int, _main.ContactEntry]], on_reject: RejectHandler) -> int:
+  try:
+    with conn.begin_nested():
+      conn.execute(insert(CONTACTS_TABLE), [entry for _, entry in rows])
+    return len(rows)
+
+  except IntegrityError:
+    pass
+
+  # Some row slipped past the duplicate checks, so isolate it one row at a time
+  inserted = 0
+  for line_no, entry in rows:
+    try:
+      with conn.begin_nested():
+        conn.execute(insert(CONTACTS_TABLE), entry)
+      inserted += 1
+
+    except IntegrityError as e:
+      on_reject(line_no, entry, str(e.orig))
+
+  return inserted
+
+
+def _import_contacts(
+  contacts: Iterable[_main.ContactEntry],
+  chunk_size: int = DEFAULT_CHUNK_SIZE,
+  on_reject: RejectHandler | None = None,
+  processes: int | None = 1,
+) -> ImportReport:
+  engine = _main.ENGINE
+  total = inserted = rejected = 0
+
+  def reject(line_no: int, entry: _main.ContactEntry, reason: str) -> None:
+    nonlocal rejected
+    rejected += 1
+    if on_reject is not None:
+      on_reject(line_no, entry, reason)
+
+  start = time.perf_counter()
+
+  # With a process pool, the next chunks are validated while this one is
+  # being inserted
+  results = validate_contacts(contacts, processes, chunk_size)
+  for chunk in batched(enumerate(results, start=1), chunk_size):
+    total += len(chunk)
+    rows = _accept_chunk(chunk, reject)
+
+    with engine.begin() as conn:
+      rows = _drop_existing(conn, rows, reject)
+      if rows:
+        inserted += _insert_rows(conn, rows, reject)
+
+    bump_generation()
+
+  elapsed = time.perf_counter() - start
+  return {
+    'total': total,
+    'inserted': inserted,
+    'rejected': rejected,
+    'elapsed': elapsed,
+    'rows_per_sec': total / elapsed if elapsed else 0.0,
+  }
+
+
+def read_csv(file: t.TextIO) -> Iterator[_main.ContactEntry]:
+  yield from csv.DictReader(file)
+
+
+def write_csv(file: t.TextIO) -> Callable[[Iterable[t.Sequence]], None]:
+  writer = csv.writer(file)
+  writer.writerow(_main.DB_COLUMNS)
+  return writer.writerows
+
+
+def _vcard_unescape(value: str) -> str:
+  # One pass, so the '\\' of an escaped backslash can't start another escape
+  return VCARD_ESCAPE.sub(lambda match: '\n' if match[1] in 'nN' else match[1], value)
+
+
+def _vcard_components(value: str) -> list[str]:
+  components = []
+  for match in VCARD_COMPONENT.finditer(value):
+    components.append(_vcard_unescape(match[1]))
+    if not match[2]:
+      break
+  return components
+
+
+def _vcard_escape(value: str) -> str:
+  return (
+    value.replace('\\', '\\\\').replace(',', '\\,')
+    .replace(';', '\\;').replace('\n', '\\n')
+  )
+
+
+def _vcard_lines(file: t.TextIO) -> Iterator[str]:
+  # Undo RFC 6350 line folding: continuation lines start with a space or tab
+  current = None
+  for line in file:
+    line = line.rstrip('\r\n')
+    if line[:1] in (' ', '\t') and current is not None:
+      current += line[1:]
+      continue
+
+    if current is not None:
+      yield current
+    current = line
+
+  if current:
+    yield current
+
+
+def read_vcard(file: t.TextIO) -> Iterator[_main.ContactEntry]:
+  card: dict[str, str] | None = None
+
+  for line in _vcard_lines(file):
+    prop, sep, value = line.partition(':')
+    if not sep:
+      continue
+
+    # Drop grouping ("item1.EMAIL") and parameters ("TEL;TYPE=CELL")
+    name = prop.split(';', 1)[0].rsplit('.', 1)[-1].upper()
+
+    if name == 'BEGIN' and value.upper() == 'VCARD':
+      card = {}
+
+    elif name == 'END' and card is not None:
+      yield {
+        'name': card.get('FN') or card.get('N', ''),
+        'phone_no': card.get('TEL', ''),
+        'email': card.get('EMAIL', ''),
+        'address': card.get('ADR', ''),
+      }
+      card = None
+
+    elif card is not None and name in ('FN', 'N', 'TEL', 'EMAIL', 'ADR') and name not in card:
+      # Structured values are split on the semicolons that aren't escaped
+      if name == 'N':
+        family, given = (_vcard_components(value) + ['', ''])[:2]
+        card[name] = ' '.join(filter(None, (given, family)))
+
+      elif name == 'ADR':
+        card[name] = ', '.join(filter(None, _vcard_components(value)))
+
+      else:
+        card[name] = _vcard_unescape(value)
+
+
+def write_vcard(file: t.TextIO) -> Callable[[Iterable[t.Sequence]], None]:
+  def write_rows(rows: Iterable[t.Sequence]) -> None:
+    for name, phone_no, email, address in rows:
+      lines = ['BEGIN:VCARD', 'VERSION:3.0', f'FN:{_vcard_escape(name)}']
+      if phone_no:
+        lines.append(f'TEL:{_vcard_escape(phone_no)}')
+      if email:
+        lines.append(f'EMAIL:{_vcard_escape(email)}')
+      if address:
+        lines.append(f'ADR:;;{_vcard_escape(address)};;;;')
+      lines.append('END:VCARD')
+      file.write('\r\n'.join(lines) + '\r\n')
+
+  return write_rows
+
+
+READERS = {'csv': read_csv, 'vcf': read_vcard}
+WRITERS = {'csv': write_csv, 'vcf': write_vcard}
+
+
+def guess_format(path: str | Path) -> str:
+  fmt = Path(path).suffix.lstrip('.').lower()
+  fmt = 'vcf' if fmt == 'vcard' else fmt
+  if fmt not in FORMATS:
+    raise ValueError(f'Cannot guess the file format of {path!r}, pass one of {FORMATS}.')
+
+  return fmt
+
+
+def _export_contacts(
+  path: str | Path,
+  fmt: str | None = None,
+  chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+  fmt = fmt or guess_format(path)
+  engine = _main.ENGINE
+  columns = [CONTACTS_TABLE.c[col] for col in _main.DB_COLUMNS]
+  exported = 0
+
+  with engine.connect() as conn, open(path, 'w', newline='', encoding='utf-8') as file:
+    write_rows = WRITERS[fmt](file)
+
+    # yield_per streams the cursor in fixed size partitions instead of
+    # fetching the whole table into memory first
+    result = conn.execution_options(yield_per=chunk_size).execute(
+      select(*columns).order_by(CONTACTS_TABLE.c.id)
+    )
+
+    for partition in result.partitions():
+      write_rows(partition)
+      exported += len(partition)
+
+  return exported
+
+
+@print_err_to_stderr
+@instrumented
+def import_contacts(
+  contacts: Iterable[_main.ContactEntry],
+  chunk_size: int = DEFAULT_CHUNK_SIZE,
+  on_reject: RejectHandler | None = None,
+  processes: int | None = 1,
+) -> ImportReport:
+  return _import_contacts(contacts, chunk_size, on_reject, processes)
+
+
+@print_err_to_stderr
+@instrumented
+def export_contacts(
+  path: str | Path,
+  fmt: str | None = None,
+  chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+  return _export_contacts(path, fmt, chunk_size)
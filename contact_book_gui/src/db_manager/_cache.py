@@ -0,0 +1,165 @@
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import TypedDict, NamedTuple, Hashable, Callable, Awaitable
+
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_TTL = 30.0
+
+
+class ContactSnapshot(NamedTuple):
+  id: int
+  name: str
+  phone_no: str | None
+  email: str | None
+  address: str | None
+
+
+class CacheStats(TypedDict):
+  size: int
+  max_size: int
+  hits: int
+  misses: int
+  evictions: int
+  invalidations: int
+  expirations: int
+
+
+class _Missing:
+  pass
+
+
+MISSING = _Missing()
+
+
+class QueryCache:
+  def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, ttl: float | None = DEFAULT_CACHE_TTL) -> None:
+    self.max_size = max_size
+    self.ttl = ttl
+
+    # key -> (table generation, expiry deadline, snapshot), least recently used first
+    self._entries: OrderedDict[Hashable, tuple[int, float | None, t.Any]] = OrderedDict()
+    self._lock = threading.Lock()
+
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.invalidations = 0
+    self.expirations = 0
+
+  def get(self, key: Hashable, generation: int) -> t.Any:
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return MISSING
+
+      entry_generation, expires_at, value = entry
+
+      if entry_generation != generation:
+        # The table was written to after this snapshot was taken
+        del self._entries[key]
+        self.invalidations += 1
+        self.misses += 1
+        return MISSING
+
+      if expires_at is not None and expires_at < time.monotonic():
+        del self._entries[key]
+        self.expirations += 1
+        self.misses += 1
+        return MISSING
+
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return value
+
+  def put(self, key: Hashable, generation: int, value: t.Any) -> None:
+    expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+
+    with self._lock:
+      self._entries[key] = (generation, expires_at, value)
+      self._entries.move_to_end(key)
+
+      while len(self._entries) > self.max_size:
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+  def clear(self) -> None:
+    with self._lock:
+      self._entries.clear()
+
+  def stats(self) -> CacheStats:
+    return {
+      'size': len(self._entries),
+      'max_size': self.max_size,
+      'hits': self.hits,
+      'misses': self.misses,
+      'evictions': self.evictions,
+      'invalidations': self.invalidations,
+      'expirations': self.expirations,
+    }
+
+
+# Bumped by every write that goes through db_manager. Cached snapshots
+# remember the generation they were read at and are dropped once it moves on.
+TABLE_GENERATION = 0
+QUERY_CACHE: QueryCache | None = None
+
+
+def bump_generation() -> None:
+  global TABLE_GENERATION
+  TABLE_GENERATION += 1
+
+
+def configure_query_cache(
+  max_size: int = DEFAULT_CACHE_SIZE,
+  ttl: float | None = DEFAULT_CACHE_TTL,
+) -> QueryCache:
+  global QUERY_CACHE
+  QUERY_CACHE = QueryCache(max_size, ttl)
+  return QUERY_CACHE
+
+
+def disable_query_cache() -> None:
+  global QUERY_CACHE
+  QUERY_CACHE = None
+
+
+def query_cache_stats() -> CacheStats | None:
+  return QUERY_CACHE.stats() if QUERY_CACHE is not None else None
+
+
+def freeze_rows(rows: t.Iterable[t.Sequence]) -> tuple[ContactSnapshot, ...]:
+  return tuple(ContactSnapshot(*row) for row in rows)
+
+
+def freeze_entries(rows: t.Iterable[t.Mapping]) -> tuple[MappingProxyType, ...]:
+  return tuple(MappingProxyType(dict(row)) for row in rows)
+
+
+def cached_query[T](key: Hashable, load: Callable[[], T]) -> T:
+  cache = QUERY_CACHE
+  # Read before loading: a write that lands mid-query must invalidate the result
+  generation = TABLE_GENERATION
+
+  if (value := cache.get(key, generation)) is not MISSING:
+    return value
+
+  value = load()
+  cache.put(key, generation, value)
+  return value
+
+
+async def async_cached_query[T](key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+  cache = QUERY_CACHE
+  generation = TABLE_GENERATION
+
+  if (value := cache.get(key, generation)) is not MISSING:
+    return value
+
+  value = await load()
+  cache.put(key, generation, value)
+  return value
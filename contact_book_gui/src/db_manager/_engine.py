@@ -0,0 +1,114 @@
+import os
+import typing as t
+from pathlib import Path
+from typing import NamedTuple, Literal
+
+from sqlalchemy import Connection, Engine, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import Pool, QueuePool, AsyncAdaptedQueuePool, NullPool, StaticPool
+
+
+type PoolKind = Literal['queue', 'null', 'static']
+
+
+class EngineProfile(NamedTuple):
+  # None leaves the setting as SQLite (or the database file) has it
+  journal_mode: str | None = 'WAL'
+  synchronous: str | None = 'NORMAL'
+  mmap_size: int | None = 256 * 1024 * 1024
+  # Negative sizes are in KiB, positive ones in pages
+  cache_size: int | None = -64 * 1024
+  busy_timeout: int | None = 5_000
+  pool: PoolKind = 'queue'
+  pool_size: int = 5
+
+
+PROFILES: dict[str, EngineProfile] = {
+  # What create_engine() gave before profiles existed
+  'compat': EngineProfile(
+    journal_mode=None, synchronous=None, mmap_size=None, cache_size=None, busy_timeout=None,
+  ),
+  # Readers don't block the writer or each other. Commits aren't synced, the
+  # log is at checkpoints: a power cut can lose the last commits, but can't
+  # corrupt the file
+  'balanced': EngineProfile(),
+  # Commits survive a crash of the process but not of the machine
+  'fast': EngineProfile(synchronous='OFF', mmap_size=1024 * 1024 * 1024, cache_size=-256 * 1024),
+  # WAL concurrency, every commit synced to disk
+  'durable': EngineProfile(synchronous='FULL'),
+}
+
+DEFAULT_PROFILE = os.environ.get('CONTACT_BOOK_DB_PROFILE', 'balanced')
+
+_SYNC_POOLS: dict[PoolKind, type[Pool]] = {'queue': QueuePool, 'null': NullPool, 'static': StaticPool}
+_ASYNC_POOLS: dict[PoolKind, type[Pool]] = {
+  'queue': AsyncAdaptedQueuePool, 'null': NullPool, 'static': StaticPool,
+}
+
+
+def resolve_profile(profile: str | EngineProfile | None) -> EngineProfile:
+  profile = DEFAULT_PROFILE if profile is None else profile
+  if isinstance(profile, EngineProfile):
+    return profile
+
+  try:
+    return PROFILES[profile]
+
+  except KeyError:
+    raise ValueError(
+      f"Unknown engine profile {profile!r}, expected one of {', '.join(PROFILES)}."
+    ) from None
+
+
+def _pragmas(profile: EngineProfile) -> list[str]:
+  settings = {
+    'journal_mode': profile.journal_mode,
+    'synchronous': profile.synchronous,
+    'mmap_size': profile.mmap_size,
+    'cache_size': profile.cache_size,
+    'busy_timeout': profile.busy_timeout,
+  }
+  return [f'PRAGMA {name} = {value}' for name, value in settings.items() if value is not None]
+
+
+def _apply_profile(engine: Engine, profile: EngineProfile) -> None:
+  pragmas = _pragmas(profile)
+
+  # Runs once per new DBAPI connection, before the pool hands it out
+  @event.listens_for(engine, 'connect')
+  def set_pragmas(dbapi_connection: t.Any, connection_record: t.Any) -> None:
+    # The driver only opens a transaction before INSERT, UPDATE and DELETE,
+    # so a SAVEPOINT or SELECT first ran outside of one and every RELEASE
+    # committed. It is told to leave transactions alone, and begin() below
+    # opens them
+    dbapi_connection.isolation_level = None
+
+    cursor = dbapi_connection.cursor()
+    for pragma in pragmas:
+      cursor.execute(pragma)
+    cursor.close()
+
+  @event.listens_for(engine, 'begin')
+  def begin_transaction(conn: Connection) -> None:
+    conn.exec_driver_sql('BEGIN')
+
+
+def _pool_options(profile: EngineProfile, pools: dict[PoolKind, type[Pool]]) -> dict[str, t.Any]:
+  options: dict[str, t.Any] = {'poolclass': pools[profile.pool]}
+  if profile.pool == 'queue':
+    options['pool_size'] = profile.pool_size
+  return options
+
+
+def create_db_engine(path: str | Path, profile: str | EngineProfile | None = None) -> Engine:
+  profile = resolve_profile(profile)
+  engine = create_engine(f"sqlite:///{path}", **_pool_options(profile, _SYNC_POOLS))
+  _apply_profile(engine, profile)
+  return engine
+
+
+def create_async_db_engine(path: str | Path, profile: str | EngineProfile | None = None) -> AsyncEngine:
+  profile = resolve_profile(profile)
+  engine = create_async_engine(f"sqlite+aiosqlite:///{path}", **_pool_options(profile, _ASYNC_POOLS))
+  _apply_profile(engine.sync_engine, profile)
+  return engine
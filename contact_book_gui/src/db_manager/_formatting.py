@@ -1,14 +1,16 @@
+import inspect
 import sys
 import typing as t
 from functools import wraps
 
-from rich import print as rich_print
-
 
 P = t.ParamSpec('P')
 
 
 def print_error(message: str | Exception) -> None:
+  # rich is only imported once there is something to print
+  from rich import print as rich_print
+
   if isinstance(message, Exception):
     output = f'{type(message).__name__}: {message}'
 
@@ -19,12 +21,24 @@ def print_error(message: str | Exception) -> None:
 
 
 def print_info(message: str) -> None:
+  from rich import print as rich_print
+
   output = r"\[info] {message}".format(message=message)
   rich_print(f'[blue]{output}[/]', file=sys.stderr)
 
 
 
 def print_err_to_stderr[F](func: F) -> F:
+  if inspect.iscoroutinefunction(func):
+    @wraps(func)
+    async def async_wrapper(*args: P.args, **kwargs: P.kwargs):
+      try:
+        return await func(*args, **kwargs)
+      except Exception as e:
+        print_error(f'({func.__name__}) {type(e).__name__}: {e}')
+
+    return async_wrapper
+
   @wraps(func)
   def wrapper(*args: P.args, **kwargs: P.kwargs):
     try:
@@ -34,12 +48,3 @@ def print_err_to_stderr[F](func: F) -> F:
 
   return wrapper
 
-
-def log_info_to_stdout[F](func: F) -> F:
-  @wraps(func)
-  def wrapper(*args: P.args, **kwargs: P.kwargs):
-    val = func(*args, **kwargs)
-    print_info(f'({func.__name__}) {args=}, {kwargs=}, return={val}')
-    return val
-
-  return wrapper
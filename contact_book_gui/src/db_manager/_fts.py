@@ -0,0 +1,73 @@
+import re
+
+from sqlalchemy import Connection, table, column, inspect, text
+from sqlalchemy.exc import OperationalError
+
+
+FTS_TABLE_NAME = 'contacts_fts'
+FTS_TOKEN_RE = re.compile(r'[^\W_]+')
+
+# External content table: the index only stores tokens, the rows stay in
+# `contacts` and are looked up by rowid
+CREATE_FTS_TABLE = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE_NAME} USING fts5(
+  name, phone_no, email, address,
+  content='contacts', content_rowid='id',
+  tokenize='unicode61 remove_diacritics 2',
+  prefix='2 3'
+)
+"""
+
+CREATE_FTS_TRIGGERS = (
+  f"""
+  CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+    INSERT INTO {FTS_TABLE_NAME}(rowid, name, phone_no, email, address)
+    VALUES (new.id, new.name, new.phone_no, new.email, new.address);
+  END
+  """,
+  f"""
+  CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+    INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, name, phone_no, email, address)
+    VALUES ('delete', old.id, old.name, old.phone_no, old.email, old.address);
+  END
+  """,
+  f"""
+  CREATE TRIGGER IF NOT EXISTS contacts_fts_au
+  AFTER UPDATE OF id, name, phone_no, email, address ON contacts BEGIN
+    INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}, rowid, name, phone_no, email, address)
+    VALUES ('delete', old.id, old.name, old.phone_no, old.email, old.address);
+    INSERT INTO {FTS_TABLE_NAME}(rowid, name, phone_no, email, address)
+    VALUES (new.id, new.name, new.phone_no, new.email, new.address);
+  END
+  """,
+)
+
+contacts_fts = table(FTS_TABLE_NAME, column('rowid'), column('rank'), column(FTS_TABLE_NAME))
+
+
+def create_fts_index(conn: Connection) -> bool:
+  if not inspect(conn).has_table(FTS_TABLE_NAME):
+    try:
+      conn.execute(text(CREATE_FTS_TABLE))
+
+    except OperationalError:
+      # SQLite was built without FTS5, search() keeps using LIKE
+      return False
+
+    # Index the rows that existed before the index did
+    conn.execute(text(f"INSERT INTO {FTS_TABLE_NAME}({FTS_TABLE_NAME}) VALUES ('rebuild')"))
+
+  for trigger in CREATE_FTS_TRIGGERS:
+    conn.execute(text(trigger))
+
+  return True
+
+
+def fts_match_expression(query: str) -> str | None:
+  tokens = FTS_TOKEN_RE.findall(query)
+  if not tokens:
+    return None
+
+  # Every token is a quoted prefix term, so user input can never be parsed
+  # as FTS5 query syntax
+  return ' '.join(f'"{token}"*' for token in tokens)
@@ -0,0 +1,133 @@
+from sqlalchemy import Connection, Select, table, column, inspect, text, select, union_all, func
+from sqlalchemy.exc import OperationalError
+
+
+FUZZY_TABLE_NAME = 'contacts_fuzzy'
+TRIGRAM_SIZE = 3
+# Queries longer than this are cut down to their first trigrams, which are
+# plenty to find candidates with
+MAX_QUERY_TRIGRAMS = 24
+
+# Trigram index over the columns people misspell. Like contacts_fts it only
+# stores tokens and is kept in step by triggers, so every insert, update and
+# delete only touches the trigrams of that one row.
+CREATE_FUZZY_TABLE = f"""
+CREATE VIRTUAL TABLE {FUZZY_TABLE_NAME} USING fts5(
+  name, email,
+  content='contacts', content_rowid='id',
+  tokenize='trigram',
+  detail='none'
+)
+"""
+
+CREATE_FUZZY_TRIGGERS = (
+  f"""
+  CREATE TRIGGER IF NOT EXISTS contacts_fuzzy_ai AFTER INSERT ON contacts BEGIN
+    INSERT INTO {FUZZY_TABLE_NAME}(rowid, name, email) VALUES (new.id, new.name, new.email);
+  END
+  """,
+  f"""
+  CREATE TRIGGER IF NOT EXISTS contacts_fuzzy_ad AFTER DELETE ON contacts BEGIN
+    INSERT INTO {FUZZY_TABLE_NAME}({FUZZY_TABLE_NAME}, rowid, name, email)
+    VALUES ('delete', old.id, old.name, old.email);
+  END
+  """,
+  f"""
+  CREATE TRIGGER IF NOT EXISTS contacts_fuzzy_au AFTER UPDATE OF id, name, email ON contacts BEGIN
+    INSERT INTO {FUZZY_TABLE_NAME}({FUZZY_TABLE_NAME}, rowid, name, email)
+    VALUES ('delete', old.id, old.name, old.email);
+    INSERT INTO {FUZZY_TABLE_NAME}(rowid, name, email) VALUES (new.id, new.name, new.email);
+  END
+  """,
+)
+
+contacts_fuzzy = table(FUZZY_TABLE_NAME, column('rowid'), column(FUZZY_TABLE_NAME))
+
+
+def create_fuzzy_index(conn: Connection) -> bool:
+  if not inspect(conn).has_table(FUZZY_TABLE_NAME):
+    try:
+      conn.execute(text(CREATE_FUZZY_TABLE))
+
+    except OperationalError:
+      # No FTS5 or an SQLite older than 3.34 without the trigram tokenizer,
+      # fuzzy_search() falls back to checking every contact
+      return False
+
+    conn.execute(text(f"INSERT INTO {FUZZY_TABLE_NAME}({FUZZY_TABLE_NAME}) VALUES ('rebuild')"))
+
+  for trigger in CREATE_FUZZY_TRIGGERS:
+    conn.execute(text(trigger))
+
+  return True
+
+
+def default_max_distance(query: str) -> int:
+  return 1 if len(query) <= 5 else 2
+
+
+def query_trigrams(query: str) -> list[str]:
+  query = query.lower()
+  trigrams = dict.fromkeys(
+    query[idx:idx + TRIGRAM_SIZE] for idx in range(len(query) - TRIGRAM_SIZE + 1)
+  )
+  return list(trigrams)[:MAX_QUERY_TRIGRAMS]
+
+
+def fuzzy_candidates(query: str, max_distance: int, limit: int) -> Select | None:
+  # None when the index can't narrow the search down, and every contact has
+  # to be checked
+  trigrams = query_trigrams(query)
+
+  # A substitution, insertion or deletion destroys at most three of the
+  # query's trigrams and a transposition of two neighbours four, so a row
+  # within max_distance still shares the rest of them. A short query may
+  # not have any left to require.
+  min_shared = len(trigrams) - (TRIGRAM_SIZE + 1) * max_distance
+  if min_shared < 1:
+    return None
+
+  # Counting shared trigrams per row is a walk over each trigram's posting
+  # list, unlike bm25 ranking which scores every row in the union
+  postings = union_all(*(
+    select(contacts_fuzzy.c.rowid)
+    .where(contacts_fuzzy.c[FUZZY_TABLE_NAME].match('"{}"'.format(trigram.replace('"', '""'))))
+    for trigram in trigrams
+  )).subquery()
+
+  shared = func.count().label('shared')
+  return (
+    select(postings.c.rowid, shared)
+    .group_by(postings.c.rowid)
+    .having(shared >= min_shared)
+    .order_by(shared.desc())
+    .limit(limit)
+  )
+
+
+def edit_distance(query: str, target: str, max_distance: int) -> int | None:
+  # Optimal string alignment distance between the query and the closest
+  # substring of target: a match may start and end anywhere in the target
+  if not query:
+    return 0
+
+  prev_prev: list[int] = []
+  prev = list(range(len(query) + 1))
+  best = prev[-1]
+
+  for j, target_char in enumerate(target, start=1):
+    row = [0]
+    for i, query_char in enumerate(query, start=1):
+      cost = query_char != target_char
+      dist = min(prev[i] + 1, row[i - 1] + 1, prev[i - 1] + cost)
+      if (
+        prev_prev and i > 1 and cost
+        and query_char == target[j - 2] and query[i - 2] == target_char
+      ):
+        dist = min(dist, prev_prev[i - 2] + 1)
+      row.append(dist)
+
+    best = min(best, row[-1])
+    prev_prev, prev = prev, row
+
+  return best if best <= max_distance else None
@@ -0,0 +1,177 @@
+import atexit
+import inspect
+import logging
+import os
+import reprlib
+import sys
+import time
+import typing as t
+from functools import wraps
+from typing import TypedDict
+
+from ._formatting import P
+
+
+LOGGER = logging.getLogger('contact_book_gui.db_manager')
+HISTOGRAM_BUCKETS = 32
+
+# Payloads can be whole result sets, so they are cut down before formatting
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlist = _payload_repr.maxtuple = _payload_repr.maxdict = 5
+_payload_repr.maxstring = _payload_repr.maxother = 80
+
+
+class OperationSnapshot(TypedDict):
+  count: int
+  errors: int
+  total_ms: float
+  mean_ms: float
+  max_ms: float
+  p50_ms: float
+  p90_ms: float
+  p99_ms: float
+  histogram: dict[float, int]
+
+
+class _OperationStats:
+  __slots__ = ('count', 'errors', 'total_ns', 'max_ns', 'buckets')
+
+  def __init__(self) -> None:
+    self.reset()
+
+  def reset(self) -> None:
+    self.count = 0
+    self.errors = 0
+    self.total_ns = 0
+    self.max_ns = 0
+    # Bucket i counts calls that took less than 2**i microseconds
+    self.buckets = [0] * HISTOGRAM_BUCKETS
+
+  def record(self, elapsed_ns: int, failed: bool) -> None:
+    # Plain increments, no lock: a lost update under heavy threading skews a
+    # counter by one, taking a lock would cost more than the measurement
+    self.count += 1
+    self.errors += failed
+    self.total_ns += elapsed_ns
+    if elapsed_ns > self.max_ns:
+      self.max_ns = elapsed_ns
+    self.buckets[min((elapsed_ns // 1000).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+  def percentile_ms(self, fraction: float) -> float:
+    # Upper bound of the bucket the percentile falls in, capped by the slowest
+    # call actually seen
+    target, seen = fraction * self.count, 0
+    for bucket, hits in enumerate(self.buckets):
+      seen += hits
+      if hits and seen >= target:
+        return min((1 << bucket) / 1000, self.max_ns / 1e6)
+    return 0.0
+
+  def snapshot(self) -> OperationSnapshot:
+    return {
+      'count': self.count,
+      'errors': self.errors,
+      'total_ms': self.total_ns / 1e6,
+      'mean_ms': self.total_ns / self.count / 1e6 if self.count else 0.0,
+      'max_ms': self.max_ns / 1e6,
+      'p50_ms': self.percentile_ms(0.50),
+      'p90_ms': self.percentile_ms(0.90),
+      'p99_ms': self.percentile_ms(0.99),
+      'histogram': {
+        (1 << bucket) / 1000: hits for bucket, hits in enumerate(self.buckets) if hits
+      },
+    }
+
+
+_STATS: dict[str, _OperationStats] = {}
+
+
+class _Payload:
+  __slots__ = ('value',)
+
+  def __init__(self, value: t.Any) -> None:
+    self.value = value
+
+  def __str__(self) -> str:
+    return _payload_repr.repr(self.value)
+
+
+def _log_call(name: str, args: tuple, kwargs: dict, val: t.Any, elapsed_ns: int) -> None:
+  LOGGER.debug(
+    '(%s) args=%s, kwargs=%s, return=%s in %.3fms',
+    name, _Payload(args), _Payload(kwargs), _Payload(val), elapsed_ns / 1e6,
+  )
+
+
+def instrumented[F](func: F) -> F:
+  name = func.__name__
+  stats = _STATS.setdefault(name, _OperationStats())
+
+  if inspect.iscoroutinefunction(func):
+    @wraps(func)
+    async def async_wrapper(*args: P.args, **kwargs: P.kwargs):
+      start = time.perf_counter_ns()
+      failed = True
+      try:
+        val = await func(*args, **kwargs)
+        failed = False
+        return val
+
+      finally:
+        elapsed_ns = time.perf_counter_ns() - start
+        stats.record(elapsed_ns, failed)
+        if not failed and LOGGER.isEnabledFor(logging.DEBUG):
+          _log_call(name, args, kwargs, val, elapsed_ns)
+
+    return async_wrapper
+
+  @wraps(func)
+  def wrapper(*args: P.args, **kwargs: P.kwargs):
+    start = time.perf_counter_ns()
+    failed = True
+    try:
+      val = func(*args, **kwargs)
+      failed = False
+      return val
+
+    finally:
+      elapsed_ns = time.perf_counter_ns() - start
+      stats.record(elapsed_ns, failed)
+      if not failed and LOGGER.isEnabledFor(logging.DEBUG):
+        _log_call(name, args, kwargs, val, elapsed_ns)
+
+  return wrapper
+
+
+def instrumentation_snapshot() -> dict[str, OperationSnapshot]:
+  return {name: stats.snapshot() for name, stats in _STATS.items() if stats.count}
+
+
+def reset_instrumentation() -> None:
+  for stats in _STATS.values():
+    stats.reset()
+
+
+def dump_instrumentation(file: t.TextIO | None = None) -> None:
+  file = file or sys.stderr
+  print(
+    f"{'operation':<24} {'calls':>8} {'errors':>6} {'total ms':>10} {'mean ms':>9}"
+    f" {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>9}",
+    file=file,
+  )
+
+  for name, snap in sorted(instrumentation_snapshot().items(), key=lambda item: -item[1]['total_ms']):
+    print(
+      f"{name:<24} {snap['count']:>8} {snap['errors']:>6} {snap['total_ms']:>10.2f}"
+      f" {snap['mean_ms']:>9.3f} {snap['p50_ms']:>8.3f} {snap['p90_ms']:>8.3f}"
+      f" {snap['p99_ms']:>8.3f} {snap['max_ms']:>9.3f}",
+      file=file,
+    )
+
+
+if log_level := os.environ.get('CONTACT_BOOK_LOG_LEVEL'):
+  logging.basicConfig(format='[%(levelname)s] %(message)s')
+  LOGGER.setLevel(log_level.upper())
+
+if os.environ.get('CONTACT_BOOK_PROFILE'):
+  atexit.register(dump_instrumentation)
@@ -0,0 +1,209 @@
+import json
+import typing as t
+from itertools import batched, groupby
+from typing import TypedDict, NotRequired, Literal, Iterable, Iterator
+
+from sqlalchemy import Connection, CursorResult, Select, select, delete, func, bindparam, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError
+
+from . import main as _main
+from ._table_managers import Contact, ContactChange
+from ._phone import with_phone_e164
+from ._formatting import print_err_to_stderr
+from ._instrumentation import instrumented
+from ._cache import bump_generation
+
+
+APPLY_CHUNK_SIZE = 5_000
+CONTACTS_TABLE = Contact.__table__
+CHANGES_TABLE = ContactChange.__table__
+NEW_UID = "lower(hex(randomblob(16)))"
+
+# Every write to contacts appends to contact_changes, whichever code path
+# (or other program) made it. Updates that leave the synced columns as they
+# were aren't recorded, so applying a change that came back from a peer ends
+# the round trip instead of starting another one.
+CREATE_JOURNAL_TRIGGERS = (
+  f"""
+  CREATE TRIGGER IF NOT EXISTS contacts_journal_ai AFTER INSERT ON contacts BEGIN
+    UPDATE contacts SET uid = {NEW_UID} WHERE id = new.id AND uid IS NULL;
+    INSERT INTO contact_changes(uid, op) SELECT uid, 'upsert' FROM contacts WHERE id = new.id;
+  END
+  """,
+  """
+  CREATE TRIGGER IF NOT EXISTS contacts_journal_au
+  AFTER UPDATE OF name, phone_no, email, address ON contacts
+  WHEN old.name IS NOT new.name OR old.phone_no IS NOT new.phone_no
+    OR old.email IS NOT new.email OR old.address IS NOT new.address
+  BEGIN
+    INSERT INTO contact_changes(uid, op) VALUES (new.uid, 'upsert');
+  END
+  """,
+  """
+  CREATE TRIGGER IF NOT EXISTS contacts_journal_ad AFTER DELETE ON contacts BEGIN
+    INSERT INTO contact_changes(uid, op) VALUES (old.uid, 'delete');
+  END
+  """,
+)
+
+
+class ChangeRecord(TypedDict):
+  v: int
+  op: Literal['upsert', 'delete']
+  uid: str
+  name: NotRequired[str]
+  phone_no: NotRequired[str | None]
+  email: NotRequired[str | None]
+  address: NotRequired[str | None]
+
+
+class ApplyReport(TypedDict):
+  upserted: int
+  deleted: int
+  # uid -> why the change couldn't be applied, e.g. a phone number that
+  # another local contact already has
+  conflicts: dict[str, str]
+  last_version: int
+
+
+def create_change_journal(conn: Connection) -> None:
+  for trigger in CREATE_JOURNAL_TRIGGERS:
+    conn.execute(text(trigger))
+
+
+@print_err_to_stderr
+@instrumented
+def changes_version() -> int:
+  with _main.ENGINE.connect() as conn:
+    return conn.execute(select(func.coalesce(func.max(CHANGES_TABLE.c.version), 0))).scalar()
+
+
+def _changes_since(since_version: int) -> Select:
+  # Only the newest change of each contact, with its current values
+  latest = (
+    select(CHANGES_TABLE.c.uid, func.max(CHANGES_TABLE.c.version).label('version'))
+    .where(CHANGES_TABLE.c.version > since_version)
+    .group_by(CHANGES_TABLE.c.uid)
+    .subquery()
+  )
+  return (
+    select(latest.c.version, latest.c.uid, CONTACTS_TABLE.c.id, *(
+      CONTACTS_TABLE.c[col] for col in _main.DB_COLUMNS
+    ))
+    .select_from(latest.outerjoin(CONTACTS_TABLE, CONTACTS_TABLE.c.uid == latest.c.uid))
+    .order_by(latest.c.version)
+  )
+
+
+def _change_records(conn: Connection, result: CursorResult) -> Iterator[ChangeRecord]:
+  with conn:
+    for row in result.mappings():
+      if row['id'] is None:
+        yield {'v': row['version'], 'op': 'delete', 'uid': row['uid']}
+      else:
+        yield {'v': row['version'], 'op': 'upsert', 'uid': row['uid']} | {
+          col: row[col] for col in _main.DB_COLUMNS
+        }
+
+
+@print_err_to_stderr
+@instrumented
+def export_changes(since_version: int = 0, batch_size: int = APPLY_CHUNK_SIZE) -> Iterator[ChangeRecord]:
+  conn = _main.ENGINE.connect()
+  try:
+    result = conn.execution_options(yield_per=batch_size).execute(_changes_since(since_version))
+
+  except Exception:
+    conn.close()
+    raise
+
+  return _change_records(conn, result)
+
+
+def _upsert_statement():
+  statement = insert(CONTACTS_TABLE)
+  synced = [*_main.DB_COLUMNS, 'phone_e164']
+  return statement.on_conflict_do_update(
+    index_elements=[CONTACTS_TABLE.c.uid],
+    set_={col: statement.excluded[col] for col in synced},
+  )
+
+
+def _upsert_rows(conn: Connection, changes: list[ChangeRecord], conflicts: dict[str, str]) -> int:
+  rows = [
+    {'uid': change['uid']} | with_phone_e164({col: change.get(col) for col in _main.DB_COLUMNS})
+    for change in changes
+  ]
+  statement = _upsert_statement()
+
+  try:
+    with conn.begin_nested():
+      conn.execute(statement, rows)
+    return len(rows)
+
+  except IntegrityError:
+    pass
+
+  # Retry one row at a time so only the conflicting changes are skipped
+  upserted = 0
+  for row in rows:
+    try:
+      with conn.begin_nested():
+        conn.execute(statement, row)
+      upserted += 1
+
+    except IntegrityError as e:
+      conflicts[row['uid']] = str(e.orig)
+
+  return upserted
+
+
+def _delete_rows(conn: Connection, changes: list[ChangeRecord]) -> int:
+  return conn.execute(
+    delete(CONTACTS_TABLE).where(CONTACTS_TABLE.c.uid == bindparam('_uid')),
+    [{'_uid': change['uid']} for change in changes],
+  ).rowcount
+
+
+@print_err_to_stderr
+@instrumented
+def apply_changes(changes: Iterable[ChangeRecord], chunk_size: int = APPLY_CHUNK_SIZE) -> ApplyReport:
+  report: ApplyReport = {'upserted': 0, 'deleted': 0, 'conflicts': {}, 'last_version': 0}
+
+  for chunk in batched(changes, chunk_size):
+    # Each chunk is applied whole or not at all: the engine opens a real
+    # transaction here, so the savepoints of _upsert_rows() only isolate the
+    # conflicting rows
+    with _main.ENGINE.begin() as conn:
+      # Runs of the same operation go in one statement each, in stream order
+      for op, run in groupby(chunk, key=lambda change: change['op']):
+        run = list(run)
+        if op == 'upsert':
+          report['upserted'] += _upsert_rows(conn, run, report['conflicts'])
+        else:
+          report['deleted'] += _delete_rows(conn, run)
+
+    report['last_version'] = max(report['last_version'], *(change['v'] for change in chunk))
+    bump_generation()
+
+  return report
+
+
+def dump_changes(changes: Iterable[ChangeRecord], file: t.TextIO) -> int:
+  # One JSON object per line, without the null fields
+  written = 0
+  for change in changes:
+    file.write(json.dumps(
+      {key: value for key, value in change.items() if value is not None},
+      ensure_ascii=False, separators=(',', ':'),
+    ))
+    file.write('\n')
+    written += 1
+  return written
+
+
+def load_changes(file: t.TextIO) -> Iterator[ChangeRecord]:
+  for line in file:
+    if line.strip():
+      yield json.loads(line)
@@ -0,0 +1,82 @@
+from typing import Callable
+
+from sqlalchemy import Connection, select, update, bindparam, inspect, text
+
+from ._table_managers import Contact
+from ._phone import normalize_phone_no
+
+
+BACKFILL_CHUNK_SIZE = 5_000
+CONTACTS_TABLE = Contact.__table__
+
+
+def _add_phone_e164(conn: Connection) -> None:
+  columns = {column['name'] for column in inspect(conn).get_columns('contacts')}
+  if 'phone_e164' not in columns:
+    conn.execute(text('ALTER TABLE contacts ADD COLUMN phone_e164 VARCHAR(16)'))
+  conn.execute(text('CREATE INDEX IF NOT EXISTS ix_contacts_phone_e164 ON contacts (phone_e164)'))
+
+  # The old FTS update trigger fired on every column; it is recreated limited
+  # to the indexed ones, so the backfill below doesn't reindex every row
+  conn.execute(text('DROP TRIGGER IF EXISTS contacts_fts_au'))
+
+  statement = (
+    update(CONTACTS_TABLE)
+    .where(CONTACTS_TABLE.c.id == bindparam('_id'))
+    .values(phone_e164=bindparam('phone_e164'))
+  )
+
+  last_id = 0
+  while True:
+    rows = conn.execute(
+      select(CONTACTS_TABLE.c.id, CONTACTS_TABLE.c.phone_no)
+      .where(CONTACTS_TABLE.c.id > last_id, CONTACTS_TABLE.c.phone_no.is_not(None))
+      .order_by(CONTACTS_TABLE.c.id)
+      .limit(BACKFILL_CHUNK_SIZE)
+    ).all()
+    if not rows:
+      break
+
+    conn.execute(statement, [
+      {'_id': _id, 'phone_e164': normalize_phone_no(phone_no)} for _id, phone_no in rows
+    ])
+    last_id = rows[-1][0]
+
+
+def _add_contact_uids(conn: Connection) -> None:
+  columns = {column['name'] for column in inspect(conn).get_columns('contacts')}
+  if 'uid' not in columns:
+    conn.execute(text('ALTER TABLE contacts ADD COLUMN uid VARCHAR(32)'))
+  conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS ix_contacts_uid ON contacts (uid)'))
+
+  conn.execute(text('UPDATE contacts SET uid = lower(hex(randomblob(16))) WHERE uid IS NULL'))
+  # Contacts from before the journal are changes a peer hasn't seen yet
+  conn.execute(text(
+    "INSERT INTO contact_changes(uid, op) SELECT uid, 'upsert' FROM contacts ORDER BY id"
+  ))
+
+
+def _add_sort_indexes(conn: Connection) -> None:
+  conn.execute(text(
+    'CREATE INDEX IF NOT EXISTS ix_contacts_name_nocase ON contacts (name COLLATE NOCASE)'
+  ))
+  for col in ('phone_no', 'email'):
+    conn.execute(text(
+      f"CREATE INDEX IF NOT EXISTS ix_contacts_{col}_sort ON contacts (coalesce({col}, ''))"
+    ))
+
+
+# Append only: a database at schema version N has run the first N of these
+MIGRATIONS: list[Callable[[Connection], None]] = [
+  _add_phone_e164,
+  _add_contact_uids,
+  _add_sort_indexes,
+]
+
+
+def migrate(conn: Connection) -> None:
+  version = conn.execute(text('PRAGMA user_version')).scalar()
+
+  for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+    migration(conn)
+    conn.execute(text(f'PRAGMA user_version = {number}'))
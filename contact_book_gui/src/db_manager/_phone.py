@@ -0,0 +1,65 @@
+import os
+import re
+import typing as t
+from functools import lru_cache
+
+# phonenumbers loads its metadata tables on import, which is only worth
+# paying for once a number is actually parsed
+if t.TYPE_CHECKING:
+  from phonenumbers import PhoneNumber
+
+
+# Numbers written without a country code ("020 7946 0000") can only be
+# normalized when we know which country they were dialled in
+PHONE_REGION = os.environ.get('CONTACT_BOOK_PHONE_REGION') or None
+# Parsing is the slowest part of validating a contact, and imports repeat
+# the same numbers (or the same empty-ish junk) a lot
+PHONE_PARSE_CACHE_SIZE = 64 * 1024
+IS_POSSIBLE_PHONE_NUMBER_RE = re.compile(r'^[0-9]{4,12}$')
+
+
+@lru_cache(maxsize=PHONE_PARSE_CACHE_SIZE)
+def parse_phone_no(phone_no: str, region: str | None = None) -> 'PhoneNumber | None':
+  from phonenumbers import NumberParseException, parse as phone_no_parse
+
+  try:
+    return phone_no_parse(phone_no, region, _check_region=False)
+  except NumberParseException:
+    return None
+
+
+def phone_no_is_valid(phone_no: str) -> bool:
+  from phonenumbers import is_possible_number, is_valid_number
+
+  # Same cache key as normalize_phone_no() when no region is set
+  parsed_no = parse_phone_no(phone_no, None)
+  if parsed_no is None:
+    return False
+
+  # Cheapest check first, is_valid_number() matches the number against every
+  # pattern of its region
+  return bool(
+    IS_POSSIBLE_PHONE_NUMBER_RE.match(phone_no)
+    or is_possible_number(parsed_no)
+    or is_valid_number(parsed_no)
+  )
+
+
+def normalize_phone_no(phone_no: str | None, region: str | None = PHONE_REGION) -> str | None:
+  if not phone_no:
+    return None
+
+  from phonenumbers import PhoneNumberFormat, format_number, is_possible_number
+
+  parsed_no = parse_phone_no(phone_no, region)
+  if parsed_no is None or not parsed_no.country_code or not is_possible_number(parsed_no):
+    return None
+
+  return format_number(parsed_no, PhoneNumberFormat.E164)
+
+
+def with_phone_e164[V: dict](values: V) -> V:
+  if 'phone_no' not in values:
+    return values
+
+  return values | {'phone_e164': normalize_phone_no(values['phone_no'])}
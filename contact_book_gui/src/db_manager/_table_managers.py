@@ -1,5 +1,7 @@
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import MetaData, Column, Text, CheckConstraint, Integer, String
+from sqlalchemy import (
+  MetaData, Column, Text, CheckConstraint, Index, Integer, String, collate, func, literal_column
+)
 
 
 metadata = MetaData()
@@ -17,10 +19,31 @@ class Contact(Base):
   phone_no = Column(String(15), unique=True)
   email = Column(String(50), nullable=True, unique=True)
   address = Column(Text)
+  phone_e164 = Column(String(16), index=True)
+  # Identifies the contact across synced databases, where ids differ
+  uid = Column(String(32), unique=True)
 
   __table_args__ = (
     CheckConstraint(
       "((phone_no IS NOT NULL) OR (email IS NOT NULL) OR (address IS NOT NULL))",
       name='phone_no_or_email_or_address_is_not_null'
     ),
-  )
\ No newline at end of file
+    # For sorting, see db_manager.main.SORT_COLUMNS
+    Index('ix_contacts_name_nocase', collate(name, 'NOCASE')),
+    Index('ix_contacts_phone_no_sort', func.coalesce(phone_no, literal_column("''"))),
+    Index('ix_contacts_email_sort', func.coalesce(email, literal_column("''"))),
+  )
+
+
+class ContactChange(Base):
+  __tablename__ = "contact_changes"
+
+  version = Column(Integer, primary_key=True, autoincrement=True)
+  uid = Column(String(32), nullable=False)
+  op = Column(String(6), nullable=False)
+
+  __table_args__ = (
+    CheckConstraint("op IN ('upsert', 'delete')", name='op_is_upsert_or_delete'),
+    # Versions are never reused, even after the newest changes are removed
+    {'sqlite_autoincrement': True},
+  )
@@ -0,0 +1,126 @@
+import typing as t
+from itertools import batched, groupby
+from typing import TypedDict, Iterable, Callable
+
+from sqlalchemy import Connection, select, update as sa_update, delete as sa_delete, bindparam
+from sqlalchemy.exc import IntegrityError
+
+from . import main as _main
+from ._table_managers import Contact
+from ._phone import with_phone_e164
+from ._formatting import print_err_to_stderr
+from ._instrumentation import instrumented
+from ._cache import bump_generation
+
+
+FLUSH_CHUNK_SIZE = 500
+CONTACTS_TABLE = Contact.__table__
+
+
+class FlushReport(TypedDict):
+  updated: int
+  deleted: int
+  errors: dict[int, str]
+
+
+type ProgressHandler = Callable[[int, int], None]
+
+
+def _update_statement(columns: tuple[str, ...]):
+  return (
+    sa_update(CONTACTS_TABLE)
+    .where(CONTACTS_TABLE.c.id == bindparam('_id'))
+    .values({col: bindparam(col) for col in columns})
+  )
+
+
+def _update_chunk(conn: Connection, chunk: tuple[tuple[int, dict[str, t.Any]], ...], errors: dict[int, str]) -> int:
+  ids = [_id for _id, _ in chunk]
+  existing = set(conn.scalars(select(CONTACTS_TABLE.c.id).where(CONTACTS_TABLE.c.id.in_(ids))))
+
+  rows = []
+  for _id, values in chunk:
+    if _id in existing:
+      # Empty strings would collide with each other on the unique columns
+      rows.append({'_id': _id} | with_phone_e164({col: val or None for col, val in values.items()}))
+    else:
+      errors[_id] = 'Contact no longer exists.'
+
+  # One executemany per distinct set of edited columns
+  groups = groupby(sorted(rows, key=lambda row: sorted(row)), key=lambda row: tuple(sorted(row)))
+  updated = 0
+
+  for columns, group in groups:
+    group = list(group)
+    statement = _update_statement(tuple(col for col in columns if col != '_id'))
+
+    # A failed executemany keeps the rows before the failing one, the
+    # savepoint takes them back out before the group is retried
+    try:
+      with conn.begin_nested():
+        conn.execute(statement, group)
+      updated += len(group)
+      continue
+
+    except IntegrityError:
+      pass
+
+    # Retry the group one row at a time so only the offending rows fail
+    for row in group:
+      try:
+        with conn.begin_nested():
+          conn.execute(statement, row)
+        updated += 1
+
+      except IntegrityError as e:
+        errors[row['_id']] = str(e.orig)
+
+  return updated
+
+
+def _apply_changes(
+  conn: Connection,
+  changes: t.Mapping[int, dict[str, t.Any]],
+  deletions: Iterable[int],
+  chunk_size: int = FLUSH_CHUNK_SIZE,
+  on_progress: ProgressHandler | None = None,
+) -> FlushReport:
+  deletions = set(deletions)
+  changes = {_id: values for _id, values in changes.items() if values and _id not in deletions}
+  report: FlushReport = {'updated': 0, 'deleted': 0, 'errors': {}}
+  total, done = len(changes) + len(deletions), 0
+
+  # Everything runs in the caller's transaction, committed by it in one go.
+  # This savepoint undoes a flush that fails partway, but not the other
+  # unsaved changes of the session (the contacts add() flushed).
+  with conn.begin_nested():
+    for chunk in batched(changes.items(), chunk_size):
+      report['updated'] += _update_chunk(conn, chunk, report['errors'])
+      done += len(chunk)
+      if on_progress is not None:
+        on_progress(done, total)
+
+    for chunk in batched(deletions, chunk_size):
+      report['deleted'] += conn.execute(
+        sa_delete(CONTACTS_TABLE).where(CONTACTS_TABLE.c.id.in_(chunk))
+      ).rowcount
+      done += len(chunk)
+      if on_progress is not None:
+        on_progress(done, total)
+
+  return report
+
+
+@print_err_to_stderr
+@instrumented
+def flush_changes(
+  changes: t.Mapping[int, dict[str, t.Any]],
+  deletions: Iterable[int] = (),
+  chunk_size: int = FLUSH_CHUNK_SIZE,
+  on_progress: ProgressHandler | None = None,
+) -> FlushReport:
+  session = _main.current_session()
+  report = _apply_changes(session.connection(), changes, deletions, chunk_size, on_progress)
+  session.commit()
+  bump_generation()
+  return report
@@ -0,0 +1,110 @@
+import os
+import re
+import typing as t
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import batched
+from multiprocessing import get_context
+from typing import TypedDict, Literal, Iterable, Iterator
+
+from ._phone import normalize_phone_no, phone_no_is_valid
+from ._formatting import print_err_to_stderr
+from ._instrumentation import instrumented
+
+
+EMAIL_REGEX = re.compile(r'^(([^<>()[\]\.,;:\s@\"]+(\.[^<>()[\]\\.,;:\s@\"]+)*|\".+\")@(([a-z\d-]+\.)+[a-z]{2,})|others)$')
+VALIDATION_CHUNK_SIZE = 5_000
+# Chunks validated ahead per worker process: the workers check the next
+# ones while import_contacts() inserts the current one, and a streamed CSV
+# is never read further ahead than that
+CHUNKS_IN_FLIGHT_PER_PROCESS = 2
+
+type ErrorCode = Literal['empty_name', 'no_contact_info', 'invalid_email', 'invalid_phone_no']
+
+ERROR_MESSAGES: dict[ErrorCode, str] = {
+  'empty_name': 'Name cannot be empty.',
+  'no_contact_info': 'Either phone number, email or address is required to add a new entry.',
+  'invalid_email': 'The given email address is not valid.',
+  'invalid_phone_no': 'The givem phone number is not valid.',
+}
+
+
+class ValidationResult(TypedDict):
+  # Stripped, with None for the empty fields and phone_e164 added, ready to
+  # insert when there are no errors
+  values: dict[str, str | None]
+  errors: list[ErrorCode]
+
+
+def contact_errors(name: str, phone_no: str, email: str, address: str) -> list[ErrorCode]:
+  errors: list[ErrorCode] = []
+
+  if not name:
+    errors.append('empty_name')
+
+  if not (phone_no or email or address):
+    errors.append('no_contact_info')
+
+  if email and not EMAIL_REGEX.match(email):
+    errors.append('invalid_email')
+
+  if phone_no and not phone_no_is_valid(phone_no):
+    errors.append('invalid_phone_no')
+
+  return errors
+
+
+def validate_contact(entry: t.Mapping[str, t.Any]) -> ValidationResult:
+  name, phone_no, email, address = (
+    (entry.get(col) or '').strip() for col in ('name', 'phone_no', 'email', 'address')
+  )
+  return {
+    'values': {
+      'name': name or None,
+      'phone_no': phone_no or None,
+      'email': email or None,
+      'address': address or None,
+      'phone_e164': normalize_phone_no(phone_no),
+    },
+    'errors': contact_errors(name, phone_no, email, address),
+  }
+
+
+def _validate_chunk(chunk: tuple[t.Mapping[str, t.Any], ...]) -> list[ValidationResult]:
+  return [validate_contact(entry) for entry in chunk]
+
+
+def _validate_in_pool(
+  contacts: Iterable[t.Mapping[str, t.Any]],
+  processes: int,
+  chunk_size: int,
+) -> Iterator[ValidationResult]:
+  # Spawned workers don't inherit the GUI's threads or open database handles
+  with ProcessPoolExecutor(processes, mp_context=get_context('spawn')) as executor:
+    pending: deque[Future[list[ValidationResult]]] = deque()
+
+    # A bounded window instead of executor.map(), which would read the whole
+    # input up front
+    for chunk in batched(contacts, chunk_size):
+      pending.append(executor.submit(_validate_chunk, chunk))
+      if len(pending) >= processes * CHUNKS_IN_FLIGHT_PER_PROCESS:
+        yield from pending.popleft().result()
+
+    while pending:
+      yield from pending.popleft().result()
+
+
+@print_err_to_stderr
+@instrumented
+def validate_contacts(
+  contacts: Iterable[t.Mapping[str, t.Any]],
+  processes: int | None = 1,
+  chunk_size: int = VALIDATION_CHUNK_SIZE,
+) -> Iterator[ValidationResult]:
+  # One result per contact, in input order. processes=None uses every core;
+  # starting the workers costs about a second, only worth it for big imports
+  processes = processes or os.cpu_count() or 1
+  if processes == 1:
+    return map(validate_contact, contacts)
+
+  return _validate_in_pool(contacts, processes, chunk_size)
@@ -1,16 +1,31 @@
-import re
+import typing as t
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import TypedDict, NoReturn
+from typing import TypedDict, NamedTuple, NoReturn, Iterator
 
-from sqlalchemy import create_engine, or_
-from sqlalchemy.orm import sessionmaker
-from phonenumbers import is_valid_number, is_possible_number, parse as phone_no_parse
+from sqlalchemy import (
+  or_, and_, select, func, literal, literal_column, collate, tuple_, Select, ColumnElement,
+  Connection,
+)
+from sqlalchemy.orm import Session, sessionmaker
 
 from ._table_managers import Base, Contact
-from ._formatting import print_err_to_stderr, log_info_to_stdout
+from ._engine import EngineProfile, create_db_engine
+from ._fts import contacts_fts, create_fts_index, fts_match_expression
+from ._fuzzy import (
+  TRIGRAM_SIZE, create_fuzzy_index, fuzzy_candidates, default_max_distance, edit_distance
+)
+from ._migrations import migrate
+from ._journal import create_change_journal
+from ._phone import normalize_phone_no, with_phone_e164
+from ._validation import ERROR_MESSAGES, contact_errors
+from ._formatting import print_err_to_stderr
+from ._instrumentation import instrumented
+from . import _cache
+from ._cache import ContactSnapshot, bump_generation, cached_query, freeze_rows, freeze_entries
 
 
-EMAIL_REGEX = re.compile(r'^(([^<>()[\]\.,;:\s@\"]+(\.[^<>()[\]\\.,;:\s@\"]+)*|\".+\")@(([a-z\d-]+\.)+[a-z]{2,})|others)$')
 file_parent_path = Path(__file__).parent.relative_to(Path().resolve(strict=True))
 db_path = file_parent_path.parent.parent / 'db' / 'contacts.db'
 
@@ -23,95 +38,389 @@ class ContactEntry(TypedDict):
   address: str | None
 
 
+class FuzzyMatch(ContactEntry):
+  distance: int
+
+
+class SortOrder(NamedTuple):
+  column: str = 'id'
+  descending: bool = False
+
+
 DB_COLUMNS = ['name', 'phone_no', 'email', 'address']
-IS_POSSIBLE_PHONE_NUMBER_RE = re.compile(r'^[0-9]{4,12}$')
+CONTACT_COLUMNS = (Contact.id, *(getattr(Contact, col) for col in DB_COLUMNS))
+# Keys a page can be sorted by, each matching an index of the contacts table
+# (which also ends in the rowid), so SQLite reads a sorted page straight off
+# it. The nullable columns sort as '' when empty, a NULL key would need its
+# own branch in every keyset condition. The literal '' keeps the expressions
+# identical to the indexed ones, a bound parameter wouldn't match them.
+SORT_COLUMNS: dict[str, ColumnElement] = {
+  'id': Contact.id,
+  'name': collate(Contact.name, 'NOCASE'),
+  'phone_no': func.coalesce(Contact.phone_no, literal_column("''")),
+  'email': func.coalesce(Contact.email, literal_column("''")),
+}
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_FUZZY_LIMIT = 20
+FUZZY_CANDIDATE_LIMIT = 200
+FTS_ENABLED = False
+FUZZY_ENABLED = False
+
+
+def _validate(values: ContactEntry) -> ContactEntry | NoReturn:
+  errors = contact_errors(
+    values.get('name', ''),
+    *(values.get(col, '').strip() for col in ('phone_no', 'email', 'address')),
+  )
+  if errors:
+    raise ValueError(ERROR_MESSAGES[errors[0]])
+
+  return values
 
 
 @print_err_to_stderr
 def validator(values: ContactEntry) -> ContactEntry | NoReturn:
-  if not values.get('name', ''):
-    raise ValueError('Name cannot be empty.')
+  return _validate(values)
 
-  email = values.get('email', '').strip()
-  phone_no = values.get('phone_no', '').strip()
-  address = values.get('address', '').strip()
 
-  if not (phone_no or email or address):
-    raise ValueError(
-      "Either phone number, email or address is required to add a new entry."
-    )
+def _new_contact(values: ContactEntry) -> Contact:
+  _validate(values)
 
-  if email and not EMAIL_REGEX.match(email):
-    raise ValueError("The given email address is not valid.")
+  # Empty strings would collide with each other on the unique columns
+  return Contact(**with_phone_e164({col: values.get(col) or None for col in DB_COLUMNS}))
 
-  phone_no = values.get("phone_no", '').strip()
-  if not phone_no:
-    return
 
-  try:
-    parsed_no = phone_no_parse(phone_no, _check_region=False)
+@print_err_to_stderr
+@instrumented
+def add(values: ContactEntry) -> int:
+  contact = _new_contact(values)
 
-    if not (
-      is_valid_number(parsed_no)
-      or is_possible_number(parsed_no)
-      or IS_POSSIBLE_PHONE_NUMBER_RE.match(phone_no)
-    ):
-      raise ValueError(phone_no)
+  # The row is flushed in a savepoint of the session's transaction: if it
+  # violates a constraint only the savepoint is rolled back, and the rest of
+  # the unsaved changes still wait for save_changes(). That takes the BEGIN
+  # the engine emits (_engine.py), pysqlite alone would commit on RELEASE.
+  session = current_session()
+  with session.begin_nested():
+    session.add(contact)
 
-  except Exception as e:
-    raise ValueError(f"The givem phone number is not valid.") from e
+  bump_generation()
+  return contact.id
 
-  return values
 
+def _like_filter(query: str) -> ColumnElement[bool]:
+  return or_(
+    getattr(Contact, attr).ilike(f"%{query}%")
+    for attr in ('name', 'phone_no', 'email', 'address')
+  )
+
+
+def _fts_matches(query: str, fts: bool) -> Select | None:
+  match = fts_match_expression(query) if fts and FTS_ENABLED else None
+  if match is None:
+    return None
+
+  return (
+    select(contacts_fts.c.rowid, contacts_fts.c.rank)
+    .where(contacts_fts.c[contacts_fts.name].match(match))
+  )
+
+
+def _search(query: str | None = None, fts: bool = True) -> Select[tuple[Contact]]:
+  sql_query = select(Contact)
+
+  if not query:
+    return sql_query
+
+  matches = _fts_matches(query, fts)
+  if matches is None:
+    return sql_query.where(_like_filter(query))
+
+  ranked = matches.subquery()
+  return sql_query.join(ranked, Contact.id == ranked.c.rowid).order_by(ranked.c.rank)
+
+
+def _search_rows(query: str | None = None, fts: bool = True) -> Select:
+  # Plain column rows never enter the session's identity map, unlike
+  # Contact instances
+  sql_query = select(*CONTACT_COLUMNS)
+
+  if not query:
+    return sql_query
+
+  matches = _fts_matches(query, fts)
+  if matches is None:
+    return sql_query.where(_like_filter(query))
+
+  return sql_query.where(Contact.id.in_(matches.with_only_columns(contacts_fts.c.rowid)))
+
+
+def _after(order: SortOrder, after_value: t.Any, after_id: int) -> ColumnElement[bool]:
+  # The rows past (after_value, after_id) in the given order. The bound on
+  # the key alone is what lets SQLite seek into the index, it doesn't for
+  # the row value comparison
+  key = SORT_COLUMNS[order.column]
+  if order.column == 'id':
+    return key < after_id if order.descending else key > after_id
+
+  after_value = '' if after_value is None else after_value
+  if order.descending:
+    return and_(key <= after_value, tuple_(key, Contact.id) < (after_value, after_id))
+  return and_(key >= after_value, tuple_(key, Contact.id) > (after_value, after_id))
+
+
+def _search_page(
+  query: str | None,
+  after_id: int,
+  limit: int,
+  fts: bool,
+  order: SortOrder = SortOrder(),
+  after_value: t.Any = None,
+) -> Select:
+  # Keyset paging: the next page starts after the last row of the previous
+  # one, given by its id and its value in the sort column; after_id=0 is
+  # the first page
+  if order.column not in SORT_COLUMNS:
+    raise ValueError(f"Contacts can't be sorted by {order.column!r}.")
+
+  statement = _search_rows(query, fts)
+  if after_id:
+    statement = statement.where(_after(order, after_value, after_id))
+
+  columns = (SORT_COLUMNS[order.column], Contact.id) if order.column != 'id' else (Contact.id,)
+  return (
+    statement
+    .order_by(*(column.desc() if order.descending else column for column in columns))
+    .limit(limit)
+  )
 
-@print_err_to_stderr
-@log_info_to_stdout
-def add(values: ContactEntry) -> None:
-  validator(values)
-  DB_SESSION.add(Contact(**values))
+
+def _cache_key(kind: str, query: str | None, fts: bool, *args: t.Hashable) -> tuple:
+  # Queries that reach the FTS index are keyed by their case folded match
+  # expression, so "John  DOE" and "john doe" share an entry
+  match = fts_match_expression(query) if query and fts and FTS_ENABLED else None
+  return (kind, ('fts', match.casefold()) if match else ('like', query or None), *args)
 
 
 @print_err_to_stderr
-@log_info_to_stdout
-def search(query: str | None = None) -> list[Contact]:
-  sql_query = DB_SESSION.query(Contact)
-
-  if query:
-    sql_query = sql_query.filter(
-      or_(
-        getattr(Contact, attr).ilike(f"%{query}%")
-        for attr in ('name', 'phone_no', 'email', 'address')
-      )
+@instrumented
+def search(query: str | None = None, fts: bool = True) -> list[ContactSnapshot]:
+  # Snapshots with or without the cache, in a list of their own, so changing
+  # a result never changes a cached entry or the session's Contact rows
+  def load() -> tuple[ContactSnapshot, ...]:
+    return freeze_rows(
+      current_session().execute(_search(query, fts).with_only_columns(*CONTACT_COLUMNS))
     )
 
-  return sql_query.all()
+  if _cache.QUERY_CACHE is None:
+    return list(load())
+  return list(cached_query(_cache_key('search', query, fts), load))
+
+
+@print_err_to_stderr
+@instrumented
+def search_page(
+  query: str | None = None,
+  after_id: int = 0,
+  limit: int = DEFAULT_PAGE_SIZE,
+  fts: bool = True,
+  order: SortOrder = SortOrder(),
+  after_value: t.Any = None,
+) -> list[ContactEntry]:
+  statement = _search_page(query, after_id, limit, fts, order, after_value)
+
+  if _cache.QUERY_CACHE is None:
+    return [dict(row) for row in current_session().execute(statement).mappings()]
+
+  # Fresh dicts off the cached entry, the same as without the cache
+  entries = cached_query(
+    _cache_key('search_page', query, fts, after_id, limit, order, after_value),
+    lambda: freeze_entries(current_session().execute(statement).mappings()),
+  )
+  return [dict(entry) for entry in entries]
+
+
+@print_err_to_stderr
+@instrumented
+def iter_search(
+  query: str | None = None,
+  batch_size: int = DEFAULT_PAGE_SIZE,
+  fts: bool = True,
+) -> Iterator[ContactEntry]:
+  result = current_session().execute(
+    _search_rows(query, fts).order_by(Contact.id),
+    execution_options={'yield_per': batch_size},
+  )
+  return (dict(row) for row in result.mappings())
+
+
+def _fuzzy_search(query: str, max_distance: int) -> Select | None:
+  # Anything shorter than a trigram is within a typo or two of nearly every
+  # contact
+  if len(query) < TRIGRAM_SIZE:
+    return None
+
+  candidates = fuzzy_candidates(query, max_distance, FUZZY_CANDIDATE_LIMIT) if FUZZY_ENABLED else None
+  if candidates is None:
+    # Without the trigram index, or with a query too short for it to rule
+    # any contact out, every contact has to be checked
+    return select(*CONTACT_COLUMNS, literal(0).label('shared'))
+
+  candidates = candidates.subquery()
+  return (
+    select(*CONTACT_COLUMNS, candidates.c.shared)
+    .join(candidates, Contact.id == candidates.c.rowid)
+    .order_by(candidates.c.shared.desc())
+  )
+
+
+def _rank_fuzzy(
+  query: str,
+  rows: t.Iterable[t.Mapping[str, t.Any]],
+  max_distance: int,
+  limit: int,
+) -> list[FuzzyMatch]:
+  query = query.lower()
+  ranked = []
+
+  for row in rows:
+    distances = [
+      distance for value in (row['name'], row['email']) if value
+      if (distance := edit_distance(query, value.lower(), max_distance)) is not None
+    ]
+    if distances:
+      contact = {col: row[col] for col in ('id', *DB_COLUMNS)}
+      ranked.append((min(distances), -row['shared'], row['id'], contact))
+
+  ranked.sort(key=lambda item: item[:3])
+  return [contact | {'distance': distance} for distance, _, _, contact in ranked[:limit]]
+
+
+@print_err_to_stderr
+@instrumented
+def fuzzy_search(
+  query: str,
+  max_distance: int | None = None,
+  limit: int = DEFAULT_FUZZY_LIMIT,
+) -> list[FuzzyMatch]:
+  query = query.strip()
+  if max_distance is None:
+    max_distance = default_max_distance(query)
+
+  statement = _fuzzy_search(query, max_distance)
+  if statement is None:
+    return []
+
+  result = current_session().execute(
+    statement, execution_options={'yield_per': FUZZY_CANDIDATE_LIMIT}
+  )
+  return _rank_fuzzy(query, result.mappings(), max_distance, limit)
+
+
+@print_err_to_stderr
+@instrumented
+def find_by_phone(phone_no: str) -> list[ContactEntry]:
+  # Numbers that can't be normalized can still match their exact spelling
+  phone_e164 = normalize_phone_no(phone_no)
+  condition = Contact.phone_e164 == phone_e164 if phone_e164 else Contact.phone_no == phone_no
+
+  result = current_session().execute(
+    select(*CONTACT_COLUMNS).where(condition).order_by(Contact.id)
+  )
+  return [dict(row) for row in result.mappings()]
 
 
 @print_err_to_stderr
-@log_info_to_stdout
+@instrumented
+def find_duplicates() -> dict[str, list[int]]:
+  # A single pass over ix_contacts_phone_e164, grouped by the database
+  result = current_session().execute(
+    select(Contact.phone_e164, func.group_concat(Contact.id))
+    .where(Contact.phone_e164.is_not(None))
+    .group_by(Contact.phone_e164)
+    .having(func.count() > 1)
+  )
+  return {
+    phone_e164: sorted(map(int, ids.split(',')))
+    for phone_e164, ids in result
+  }
+
+
+@print_err_to_stderr
+@instrumented
 def update(query: ContactEntry, values: ContactEntry) -> None:
-  DB_SESSION.query(Contact).filter_by(**query).update(values)
+  current_session().query(Contact).filter_by(**query).update(with_phone_e164(values))
+  bump_generation()
 
 
 @print_err_to_stderr
-@log_info_to_stdout
+@instrumented
 def delete(query: ContactEntry) -> None:
-  DB_SESSION.query(Contact).filter_by(**query).delete()
+  current_session().query(Contact).filter_by(**query).delete()
+  bump_generation()
 
 
 @print_err_to_stderr
-@log_info_to_stdout
+@instrumented
 def save_changes():
-  DB_SESSION.commit()
+  current_session().commit()
+  bump_generation()
 
 
-@print_err_to_stderr
-@log_info_to_stdout
-def init_db_session():
-  global DB_SESSION
+def _create_schema(conn: Connection) -> None:
+  global FTS_ENABLED, FUZZY_ENABLED
 
-  engine = create_engine(f"sqlite:///{db_path}")
-  Base.metadata.create_all(bind=engine)
+  Base.metadata.create_all(bind=conn)
+  migrate(conn)
+  FTS_ENABLED = create_fts_index(conn)
+  FUZZY_ENABLED = create_fuzzy_index(conn)
+  create_change_journal(conn)
 
-  DB_SESSION = sessionmaker(bind=engine)()
+
+@print_err_to_stderr
+@instrumented
+def init_db_session(path: str | Path = db_path, profile: str | EngineProfile | None = None) -> Session:
+  global ENGINE, SESSION_MAKER, DB_SESSION
+
+  ENGINE = create_db_engine(path, profile)
+  with ENGINE.begin() as conn:
+    _create_schema(conn)
+
+  SESSION_MAKER = sessionmaker(bind=ENGINE)
+  # Used by calls made outside of a session_scope(), its changes are kept
+  # until save_changes()
+  DB_SESSION = SESSION_MAKER()
+  bump_generation()
   return DB_SESSION
+
+
+_SCOPED_SESSION: ContextVar[Session | None] = ContextVar('db_manager_session', default=None)
+
+
+def current_session() -> Session:
+  return _SCOPED_SESSION.get() or DB_SESSION
+
+
+@contextmanager
+def session_scope() -> Iterator[Session]:
+  # One session per unit of work: every db_manager call inside the block
+  # uses it, it is committed when the block ends and rolled back if the block
+  # raises. Each thread and task gets its own, nested blocks share the
+  # outer one.
+  if (session := _SCOPED_SESSION.get()) is not None:
+    yield session
+    return
+
+  session = SESSION_MAKER()
+  token = _SCOPED_SESSION.set(session)
+  try:
+    yield session
+    session.commit()
+
+  except BaseException:
+    session.rollback()
+    raise
+
+  finally:
+    _SCOPED_SESSION.reset(token)
+    session.close()
+    bump_generation()
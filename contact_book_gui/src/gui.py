@@ -1,18 +1,36 @@
+import os
 import sys
+import time
 from functools import wraps
+from pathlib import Path
 import typing as t
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer, QSignalBlocker, Signal
 from PySide6.QtWidgets import (
   QApplication, QMainWindow, QWidget, QLineEdit, QPushButton, QHeaderView, QVBoxLayout,
-  QHBoxLayout, QTableWidget, QTableWidgetItem, QMessageBox, QAbstractItemView,
-  QLabel, QDialog
+  QHBoxLayout, QTableView, QMessageBox, QAbstractItemView, QLabel, QDialog, QProgressBar
 )
 
-from .db_manager import (
-  ContactEntry, init_db_session, add, search, update, delete, save_changes, validator,
-  DB_COLUMNS
-)
+from .async_runner import AsyncRunner
+from .table_model import ContactsTableModel, ContactsFilterProxyModel
+
+# db_manager pulls in SQLAlchemy, which takes longer to import than PySide6.
+# It is imported on the runner's thread by open_db(), after the window is up
+if t.TYPE_CHECKING:
+  from sqlalchemy.ext.asyncio import AsyncSession
+  from .db_manager import FlushReport
+
+
+SEARCH_DEBOUNCE_MS = 200
+# '1' prints import, first paint and first rows times to stderr, 'exit' also
+# quits once the first rows are shown
+STARTUP_TIMES = os.environ.get('CONTACT_BOOK_STARTUP_TIMES', '')
+
+
+async def open_db(db_path: str | Path | None) -> 'AsyncSession | None':
+  from .db_manager import init_async_db_session
+
+  return await (init_async_db_session() if db_path is None else init_async_db_session(db_path))
 
 
 class BigLineEdit(QLineEdit):
@@ -84,6 +102,8 @@ class AddContactDialog(QDialog):
       self.set_err_msg("")
 
   def add_contact(self) -> None:
+    from .db_manager import validator
+
     name = self.name_input.text()
     phone_no = self.phone_input.text()
     email = self.email_input.text()
@@ -96,7 +116,21 @@ class AddContactDialog(QDialog):
       self.set_err_msg(str(e))
       return
 
-    self.parent().add_contact(name, phone_no, email, address, True)
+    # The dialog stays up until the database has taken the contact
+    self.save_button.setEnabled(False)
+    self.parent().add_contact(name, phone_no, email, address, True, on_done=self.on_added)
+
+  def on_added(self, added: bool) -> None:
+    self.save_button.setEnabled(True)
+
+    if not added:
+      # Most likely a phone number or email another contact already has
+      message = "The contact could not be added, check that its phone number and email aren't taken."
+      if self.isVisible():
+        self.set_err_msg(message)
+      else:
+        QMessageBox.warning(self.parent(), "Error", message)
+      return
 
     name = self.name_input.clear()
     phone_no = self.phone_input.clear()
@@ -107,7 +141,9 @@ class AddContactDialog(QDialog):
 
 
 class ContactBook(QMainWindow):
-  def __init__(self):
+  db_opened = Signal(bool)
+
+  def __init__(self, db_path: str | Path | None = None):
     super().__init__()
 
     self.setWindowTitle("Contacts Book")
@@ -122,8 +158,8 @@ class ContactBook(QMainWindow):
     menubar = self.menuBar()
     file_menu = menubar.addMenu('File')
 
-    save_action = file_menu.addAction("Save", self.save_changes_to_db, shortcut="Ctrl+S")
-    file_menu.addAction(save_action)
+    self.save_action = file_menu.addAction("Save", self.save_changes_to_db, shortcut="Ctrl+S")
+    file_menu.addAction(self.save_action)
 
     # Add button
     add_contact_btn = QPushButton("Add")
@@ -133,6 +169,7 @@ class ContactBook(QMainWindow):
     self.search_input = QLineEdit()
     self.search_input.setPlaceholderText('Search')
     self.search_input.returnPressed.connect(self.search_contact)
+    self.search_input.textEdited.connect(self.on_search_edited)
     search_btn = QPushButton("Search")
     search_btn.clicked.connect(self.search_contact)
 
@@ -146,12 +183,34 @@ class ContactBook(QMainWindow):
     buttons_layout.addWidget(add_contact_btn)
     buttons_layout.addWidget(delete_contact_btn)
 
-    # Table to display contacts
-    self.contact_table = QTableWidget(0, 4)
+    # Database work runs off the UI thread so the window keeps repainting
+    self.db_runner = AsyncRunner(self)
+    self.db_runner.progress.connect(self.show_progress)
+    self.db_runner.failed.connect(self.show_db_error)
+
+    self.progress_bar = QProgressBar()
+    self.progress_bar.setMaximumWidth(200)
+    self.progress_bar.hide()
+    self.statusBar().addPermanentWidget(self.progress_bar)
+
+    # Table to display contacts, rows are pulled from the database page by
+    # page as the view scrolls
+    self.contact_model = ContactsTableModel(self.db_runner, self)
+    self.contact_model.loading_changed.connect(self.on_loading_changed)
+    self.contact_proxy = ContactsFilterProxyModel(self.contact_model, self)
+    self.contact_table = QTableView()
+    self.contact_table.setModel(self.contact_proxy)
     self.contact_table.setContentsMargins(0, 0, 0, 0)
     self.contact_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+    self.contact_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
     self.contact_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
-    self.contact_table.setHorizontalHeaderLabels(["Name", "Phone", "Email", "Address"])
+    # Clicking a header sorts in the database, clicking it a third time goes
+    # back to the insertion order
+    header = self.contact_table.horizontalHeader()
+    header.setSortIndicatorClearable(True)
+    header.setSortIndicator(-1, Qt.AscendingOrder)
+    header.sortIndicatorChanged.connect(self.on_sort_indicator_changed)
+    self.contact_table.setSortingEnabled(True)
 
     self._layout.addLayout(buttons_layout)
     self._layout.addWidget(self.contact_table)
@@ -159,13 +218,22 @@ class ContactBook(QMainWindow):
     self.input_fields = AddContactDialog(self)
     self.input_fields.hide()
 
-    self.local_changes: dict[int, ContactEntry] = {}
-    self.local_deletion_changes: set[int] = set()
-    self.db_session = init_db_session()
-    self.load_db()
-    self.contact_table.itemChanged.connect(self.update_local_changes_cache)
+    # Search as you type, once the typing pauses
+    self.search_timer = QTimer(self)
+    self.search_timer.setSingleShot(True)
+    self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+    self.search_timer.timeout.connect(self.filter_contacts)
+
+    self.awaiting_search_results: bool = False
+    self.saving: bool = False
 
-    self.showing_search_results: bool = False
+    # The window is shown while the database opens, and stays disabled until
+    # it can be used
+    self.db_session: 'AsyncSession | None' = None
+    self.main_widget.setEnabled(False)
+    self.save_action.setEnabled(False)
+    self.show_busy(True)
+    self.db_runner.submit(open_db(db_path), self.on_db_opened)
 
   def display_err_as_critical[F](func: F) -> F:
     @wraps(func)
@@ -178,30 +246,66 @@ class ContactBook(QMainWindow):
 
     return wrapper
 
-  @display_err_as_critical
-  def delete_selected_contacts(self) -> None:
-    selected_items = self.contact_table.selectedItems()
-    if not selected_items:
-      QMessageBox.warning(self, "Error", "No contacts selected to delete.")
+  def on_db_opened(self, session: 'AsyncSession | None') -> None:
+    self.show_busy(False)
+
+    if session is None:
+      self.db_opened.emit(False)
+      QMessageBox.critical(self, "Error", "The contacts database could not be opened.")
       return
 
-    rows_to_delete = {item.row() for item in selected_items}
+    self.db_session = session
+    self.main_widget.setEnabled(True)
+    self.save_action.setEnabled(True)
+    self.load_db()
+    self.db_opened.emit(True)
 
-    for row in sorted(rows_to_delete, reverse=True):
-      self.add_local_deletion_changes_cache(row)
-      self.contact_table.removeRow(row)
+  def on_sort_indicator_changed(self, column: int, order: Qt.SortOrder) -> None:
+    # Only the indexed columns can be sorted by, the indicator goes back to
+    # the column the rows are sorted by
+    if self.contact_model.can_sort(column):
+      return
 
-    QMessageBox.information(self, "Info", "Selected contacts have been deleted.")
+    header = self.contact_table.horizontalHeader()
+    with QSignalBlocker(header):
+      header.setSortIndicator(*self.contact_model.sort_indicator)
 
-  @display_err_as_critical
-  def update_local_changes_cache(self, item: QTableWidgetItem) -> None:
-    row = self.contact_table.item(item.row(), 0).data(Qt.UserRole)
-    self.local_changes.setdefault(row, {})[DB_COLUMNS[item.column()]] = item.text()
+  def show_db_error(self, error: Exception) -> None:
+    QMessageBox.critical(self, "Error", f"{type(error).__name__}: {error}")
+
+  def show_progress(self, done: int, total: int) -> None:
+    self.progress_bar.setRange(0, total)
+    self.progress_bar.setValue(done)
+    self.progress_bar.show()
+
+  def show_busy(self, busy: bool) -> None:
+    # A 0..0 range turns the bar into a busy indicator
+    self.progress_bar.setRange(0, 0)
+    self.progress_bar.setVisible(busy)
+
+  def on_loading_changed(self, loading: bool) -> None:
+    if not self.saving:
+      self.show_busy(loading)
+
+    if loading or not self.awaiting_search_results:
+      return
+
+    self.awaiting_search_results = False
+    if not self.contact_model.rowCount():
+      QMessageBox.information(self, "Not Found", "No contact found matching the query.")
 
   @display_err_as_critical
-  def add_local_deletion_changes_cache(self, row_id: int) -> None:
-    row = self.contact_table.item(row_id, 0).data(Qt.UserRole)
-    self.local_deletion_changes.add(row)
+  def delete_selected_contacts(self) -> None:
+    selected_indexes = self.contact_table.selectionModel().selectedIndexes()
+    if not selected_indexes:
+      QMessageBox.warning(self, "Error", "No contacts selected to delete.")
+      return
+
+    self.contact_model.remove_rows(
+      self.contact_proxy.mapToSource(index).row() for index in selected_indexes
+    )
+
+    QMessageBox.information(self, "Info", "Selected contacts have been deleted.")
 
   def show_add_contact_fields(self):
     self.input_fields.show()
@@ -218,82 +322,113 @@ class ContactBook(QMainWindow):
     address: str = '',
     update_db: bool = False,
     _id: int = -1,
+    on_done: t.Callable[[bool], None] | None = None,
   ) -> None:
-    row_position = self.contact_table.rowCount()
-    self.contact_table.insertRow(row_position)
+    from .db_manager import async_add
 
-    if update_db:
-      _id = add({"name": name, "phone_no": phone_no, "email": email, "address": address})
+    contact = {'id': _id, 'name': name, 'phone_no': phone_no, 'email': email, 'address': address}
 
-    name_item = QTableWidgetItem(name)
-    name_item.setData(Qt.UserRole, _id)
+    if not update_db:
+      self.contact_model.append_contact(contact)
+      return
 
-    self.contact_table.setItem(row_position, 0, name_item)
-    self.contact_table.setItem(row_position, 1, QTableWidgetItem(phone_no))
-    self.contact_table.setItem(row_position, 2, QTableWidgetItem(email))
-    self.contact_table.setItem(row_position, 3, QTableWidgetItem(address))
+    def on_added(_id: int | None) -> None:
+      if _id is not None:
+        self.contact_model.append_contact(contact | {'id': _id}, unsaved=True)
+
+      # async_add() returns None when the insert fails, its error is on stderr
+      if on_done is not None:
+        on_done(_id is not None)
+      elif _id is None:
+        QMessageBox.warning(self, "Error", f"{name} could not be added to the contacts.")
+
+    self.db_runner.submit(async_add(contact), on_added, lambda error: on_added(None))
 
   def search_contact(self):
-    query = self.search_input.text().lower()
-    found = False
+    self.search_timer.stop()
+    self.run_search(report_not_found=True)
+
+  def filter_contacts(self):
+    self.run_search(report_not_found=False)
 
-    if not query:
-      if self.showing_search_results:
-        for rowIdx in range(self.contact_table.rowCount()):
-          if self.contact_table.isRowHidden(rowIdx):
-            self.contact_table.showRow(rowIdx)
+  def run_search(self, report_not_found: bool) -> None:
+    query = self.search_input.text().strip()
 
-        self.showing_search_results = False
+    if self.contact_model.is_fully_loaded:
+      # Every contact is already in memory, no need to ask the database
+      if not self.contact_proxy.set_filter(query) and query and report_not_found:
+        QMessageBox.information(self, "Not Found", "No contact found matching the query.")
       return
 
-    self.showing_search_results = True
+    if query == (self.contact_model.query or '') and not report_not_found:
+      return
 
-    for row in range(self.contact_table.rowCount()):
-      match = False
-      for col in range(self.contact_table.columnCount()):
-        item = self.contact_table.item(row, col)
-        if item and query in item.text().lower():
-          match = True
-          break
+    self.awaiting_search_results = bool(query) and report_not_found
+    self.contact_proxy.set_filter(None)
+    self.contact_model.set_query(query)
 
-      if not match:
-        self.contact_table.hideRow(row)
-        found = True
+  def on_search_edited(self):
+    self.cancel_search()
+    self.search_timer.start()
 
-    if not found:
-      QMessageBox.information(self, "Not Found", "No contact found matching the query.")
-      self.showing_search_results = False
+  def cancel_search(self):
+    # The query being typed replaces whatever search is still running
+    if self.awaiting_search_results:
+      self.awaiting_search_results = False
+      self.contact_model.cancel_fetch()
 
   @display_err_as_critical
   def load_db(self):
-    for contact in search():
-      self.add_contact(
-        name=contact.name,
-        phone_no=contact.phone_no,
-        address=contact.address,
-        email=contact.email,
-        _id=contact.id,
-      )
+    # Only the first page is read here, the view asks for more as it scrolls
+    self.contact_proxy.set_filter(None)
+    self.contact_model.set_query(None)
 
   @display_err_as_critical
   def save_changes_to_db(self):
-    if self.local_changes:
-      for _id, contact in self.local_changes.items():
-        update({'id': _id}, contact)
-
-      self.local_changes = {}
-
-    if self.local_deletion_changes:
-      for _id in self.local_deletion_changes:
-        delete({'id': _id})
-
-      self.local_deletion_changes = set()
+    if self.saving or self.db_session is None:
+      return
 
-    save_changes()
+    from .db_manager import async_flush_changes
+
+    changes, deletions, additions = self.contact_model.take_pending()
+    self.saving = True
+    self.show_progress(0, len(changes) + len(deletions))
+
+    def on_saved(report: 'FlushReport | None') -> None:
+      self.saving = False
+      self.show_busy(self.contact_model.is_loading)
+
+      if report is None:
+        self.contact_model.restore_pending(changes, deletions, additions)
+        QMessageBox.critical(self, "Error", "The changes could not be saved.")
+        return
+
+      if report['errors']:
+        # Rows that were rejected stay pending so they can be fixed and saved again
+        self.contact_model.restore_pending(
+          {_id: changes[_id] for _id in report['errors'] if _id in changes}, set(), {}
+        )
+        QMessageBox.warning(
+          self, "Error",
+          "Some contacts could not be saved:\n" + "\n".join(
+            f"#{_id}: {error}" for _id, error in list(report['errors'].items())[:20]
+          )
+        )
+
+    self.db_runner.submit(
+      async_flush_changes(changes, deletions, on_progress=self.db_runner.report_progress),
+      on_saved, lambda error: on_saved(None),
+    )
+
+
+def run(started_at: float | None = None, db_path: str | Path | None = None):
+  imported_at = time.perf_counter()
+  app = QApplication(sys.argv)
+  window = ContactBook(db_path)
 
+  if STARTUP_TIMES:
+    from .startup_timer import StartupTimer
+    StartupTimer(window, started_at or imported_at, imported_at, quit_when_done=STARTUP_TIMES == 'exit')
 
-def run():
-  app = QApplication(sys.argv)
-  window = ContactBook()
   window.show()
   sys.exit(app.exec())
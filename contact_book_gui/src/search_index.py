@@ -0,0 +1,49 @@
+import typing as t
+
+
+# Cells are joined with a character no query can contain, so a match never
+# spans two columns
+CELL_SEPARATOR = '\0'
+
+
+# Case insensitive substring search over the rows loaded into the table.
+# Every row keeps a precomputed lowercased haystack, and a query that extends
+# the previous one only rechecks the previous matches.
+class SearchIndex:
+  def __init__(self) -> None:
+    self._haystacks: dict[int, str] = {}
+
+    self._last_query: str | None = None
+    self._last_matches: set[int] = set()
+
+  def __len__(self) -> int:
+    return len(self._haystacks)
+
+  def _changed(self) -> None:
+    self._last_query = None
+    self._last_matches = set()
+
+  def add(self, _id: int, cells: t.Iterable[str]) -> None:
+    self._haystacks[_id] = CELL_SEPARATOR.join(cells).lower()
+    self._changed()
+
+  def discard(self, _id: int) -> None:
+    self._haystacks.pop(_id, None)
+    self._changed()
+
+  def clear(self) -> None:
+    self._haystacks.clear()
+    self._changed()
+
+  def search(self, query: str) -> set[int]:
+    query = query.lower()
+    haystacks = self._haystacks
+
+    if self._last_query is not None and self._last_query in query:
+      # Anything matching the longer query also matched the shorter one
+      matches = {_id for _id in self._last_matches if query in haystacks[_id]}
+    else:
+      matches = {_id for _id, haystack in haystacks.items() if query in haystack}
+
+    self._last_query, self._last_matches = query, matches
+    return matches
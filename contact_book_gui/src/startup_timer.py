@@ -0,0 +1,61 @@
+import json
+import sys
+import time
+import typing as t
+
+from PySide6.QtCore import QObject, QEvent, QTimer
+from PySide6.QtWidgets import QApplication
+
+if t.TYPE_CHECKING:
+  from .gui import ContactBook
+
+
+# Times from the start of `python -m contact_book_gui` to the end of the
+# imports, the first paint of the window, the database being open and the
+# first page of contacts being shown. Printed to stderr as one JSON object.
+class StartupTimer(QObject):
+  def __init__(
+    self,
+    window: 'ContactBook',
+    started_at: float,
+    imported_at: float,
+    quit_when_done: bool = False,
+  ) -> None:
+    super().__init__(window)
+
+    self.window = window
+    self.started_at = started_at
+    self.quit_when_done = quit_when_done
+    self.times_ms: dict[str, float] = {'imports': (imported_at - started_at) * 1000}
+
+    window.installEventFilter(self)
+    window.db_opened.connect(self.on_db_opened)
+    window.contact_model.loading_changed.connect(self.on_loading_changed)
+
+  def mark(self, name: str) -> None:
+    self.times_ms.setdefault(name, (time.perf_counter() - self.started_at) * 1000)
+
+  def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+    if event.type() == QEvent.Type.Paint:
+      self.mark('first_paint')
+      self.window.removeEventFilter(self)
+    return False
+
+  def on_db_opened(self, opened: bool) -> None:
+    self.mark('db_opened')
+    if not opened:
+      self.done()
+
+  def on_loading_changed(self, loading: bool) -> None:
+    if not loading and 'db_opened' in self.times_ms:
+      self.mark('first_rows')
+      self.done()
+
+  def done(self) -> None:
+    self.window.db_opened.disconnect(self.on_db_opened)
+    self.window.contact_model.loading_changed.disconnect(self.on_loading_changed)
+
+    print(json.dumps({name: round(ms, 1) for name, ms in self.times_ms.items()}), file=sys.stderr)
+    if self.quit_when_done:
+      # Queued, so it also ends the loop of an error box shown right after
+      QTimer.singleShot(0, QApplication.quit)
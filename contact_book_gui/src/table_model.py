@@ -0,0 +1,335 @@
+from array import array
+from concurrent.futures import Future
+import typing as t
+
+from PySide6.QtCore import (
+  Qt, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QPersistentModelIndex, Signal
+)
+
+from .async_runner import AsyncRunner
+from .search_index import CELL_SEPARATOR, SearchIndex
+
+# db_manager (and SQLAlchemy with it) is imported on the runner's thread
+# once the window is up, see ContactBook
+if t.TYPE_CHECKING:
+  from .db_manager import ContactEntry
+
+
+type ModelIndex = QModelIndex | QPersistentModelIndex
+
+COLUMN_LABELS = ["Name", "Phone", "Email", "Address"]
+# Same as db_manager.DB_COLUMNS, spelled out so the model can be built
+# before db_manager is imported
+DB_COLUMNS = ['name', 'phone_no', 'email', 'address']
+# The columns of db_manager.SORT_COLUMNS shown in the table
+SORT_COLUMNS = {'name', 'phone_no', 'email'}
+PAGE_SIZE = 500
+
+
+def _contiguous_ranges(rows_desc: list[int]) -> t.Iterator[tuple[int, int]]:
+  if not rows_desc:
+    return
+
+  last = first = rows_desc[0]
+  for row in rows_desc[1:]:
+    if row != first - 1:
+      yield first, last
+      last = row
+    first = row
+
+  yield first, last
+
+
+class ContactsTableModel(QAbstractTableModel):
+  loading_changed = Signal(bool)
+
+  def __init__(self, runner: AsyncRunner, parent=None, page_size: int = PAGE_SIZE) -> None:
+    super().__init__(parent)
+
+    self.runner = runner
+    self.page_size = page_size
+    self.query: str | None = None
+    # Rows are sorted by the database, by id unless a column was picked
+    self.sort_column = 'id'
+    self.sort_descending = False
+
+    # Column store: one compact id array plus one list per column, instead of
+    # an object per cell
+    self._ids = array('q')
+    self._columns: list[list[str]] = [[] for _ in DB_COLUMNS]
+
+    self._last_fetched_id = 0
+    self._last_fetched_value: str | None = None
+    # Nothing is fetched until the first set_query(), when the database is open
+    self._exhausted = True
+    self._added_ids: set[int] = set()
+    self.search_index = SearchIndex()
+
+    # Pages are fetched on the runner; a result that arrives after the model
+    # was reset belongs to an older generation and is dropped
+    self._generation = 0
+    self._fetching: Future | None = None
+
+    self.pending_changes: dict[int, dict[str, str]] = {}
+    self.pending_deletions: set[int] = set()
+    # Contacts added since the last save. They wait in the write session's
+    # transaction, which the pages aren't read from, so the model keeps them
+    # across resets itself
+    self.pending_additions: dict[int, 'ContactEntry'] = {}
+
+  def rowCount(self, parent: ModelIndex = QModelIndex()) -> int:
+    return 0 if parent.isValid() else len(self._ids)
+
+  def columnCount(self, parent: ModelIndex = QModelIndex()) -> int:
+    return 0 if parent.isValid() else len(DB_COLUMNS)
+
+  def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> t.Any:
+    if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+      return COLUMN_LABELS[section]
+    return super().headerData(section, orientation, role)
+
+  def flags(self, index: ModelIndex) -> Qt.ItemFlag:
+    return super().flags(index) | Qt.ItemIsEditable
+
+  def data(self, index: ModelIndex, role: int = Qt.DisplayRole) -> t.Any:
+    if not index.isValid():
+      return None
+
+    if role in (Qt.DisplayRole, Qt.EditRole):
+      return self._columns[index.column()][index.row()]
+
+    if role == Qt.UserRole:
+      return self._ids[index.row()]
+
+    return None
+
+  def setData(self, index: ModelIndex, value: t.Any, role: int = Qt.EditRole) -> bool:
+    if not index.isValid() or role != Qt.EditRole:
+      return False
+
+    row, col = index.row(), index.column()
+    if self._columns[col][row] == value:
+      return False
+
+    self._columns[col][row] = value
+    self.search_index.add(self._ids[row], (values[row] for values in self._columns))
+    self.pending_changes.setdefault(self._ids[row], {})[DB_COLUMNS[col]] = value
+    self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+    return True
+
+  def canFetchMore(self, parent: ModelIndex = QModelIndex()) -> bool:
+    return not (parent.isValid() or self._exhausted)
+
+  @property
+  def is_loading(self) -> bool:
+    return self._fetching is not None
+
+  @property
+  def is_fully_loaded(self) -> bool:
+    # Every contact in the database is in memory and can be searched here
+    return self.query is None and self._exhausted
+
+  @property
+  def added_ids(self) -> set[int]:
+    return self._added_ids
+
+  def id_at(self, row: int) -> int:
+    return self._ids[row]
+
+  def fetchMore(self, parent: ModelIndex = QModelIndex()) -> None:
+    if parent.isValid() or self._exhausted or self.is_loading:
+      return
+
+    from .db_manager import async_search_page, SortOrder
+
+    generation = self._generation
+    self._fetching = self.runner.submit(
+      async_search_page(
+        self.query, self._last_fetched_id, self.page_size,
+        order=SortOrder(self.sort_column, self.sort_descending),
+        after_value=self._last_fetched_value,
+      ),
+      lambda page: self._on_page_fetched(generation, page),
+    )
+    self.loading_changed.emit(True)
+
+  def cancel_fetch(self) -> None:
+    if self._fetching is None:
+      return
+
+    self._generation += 1
+    self._fetching.cancel()
+    self._fetching = None
+    self.loading_changed.emit(False)
+
+  def _on_page_fetched(self, generation: int, page: 'list[ContactEntry] | None') -> None:
+    if generation != self._generation:
+      return
+
+    self._fetching = None
+
+    if page is None:
+      self._exhausted = True
+      self.loading_changed.emit(False)
+      return
+
+    if len(page) < self.page_size:
+      self._exhausted = True
+    if page:
+      self._last_fetched_id = page[-1]['id']
+      if self.sort_column != 'id':
+        self._last_fetched_value = page[-1][self.sort_column]
+
+    # Rows added or deleted locally since the model was reset are already
+    # accounted for, the database just doesn't know yet
+    page = [
+      contact for contact in page
+      if contact['id'] not in self._added_ids and contact['id'] not in self.pending_deletions
+    ]
+    if page:
+      self._append(page)
+
+    self.loading_changed.emit(False)
+
+  def _cells(self, contact: 'ContactEntry') -> list[str]:
+    changes = self.pending_changes.get(contact['id'], {})
+    return [changes.get(col, contact[col]) or '' for col in DB_COLUMNS]
+
+  def _append(self, contacts: 'list[ContactEntry]') -> None:
+    first = len(self._ids)
+    self.beginInsertRows(QModelIndex(), first, first + len(contacts) - 1)
+
+    for contact in contacts:
+      cells = self._cells(contact)
+      self._ids.append(contact['id'])
+      for cell, values in zip(cells, self._columns):
+        values.append(cell)
+      self.search_index.add(contact['id'], cells)
+
+    self.endInsertRows()
+
+  def append_contact(self, contact: 'ContactEntry', unsaved: bool = False) -> None:
+    if unsaved:
+      self.pending_additions[contact['id']] = contact
+    self._added_ids.add(contact['id'])
+    self._append([contact])
+
+  def set_query(self, query: str | None) -> None:
+    self.cancel_fetch()
+    self.beginResetModel()
+
+    self.query = query or None
+    self._ids = array('q')
+    self._columns = [[] for _ in DB_COLUMNS]
+    self._last_fetched_id = 0
+    self._last_fetched_value = None
+    self._exhausted = False
+    self._added_ids.clear()
+    self.search_index.clear()
+
+    self.endResetModel()
+
+    # Matched the way the search index does, the database can't see them
+    additions = [
+      contact for contact in self.pending_additions.values()
+      if not self.query or self.query.lower() in CELL_SEPARATOR.join(self._cells(contact)).lower()
+    ]
+    if additions:
+      self._added_ids.update(contact['id'] for contact in additions)
+      self._append(additions)
+
+    self.fetchMore()
+
+  def can_sort(self, column: int) -> bool:
+    return column == -1 or (0 <= column < len(DB_COLUMNS) and DB_COLUMNS[column] in SORT_COLUMNS)
+
+  @property
+  def sort_indicator(self) -> tuple[int, Qt.SortOrder]:
+    column = -1 if self.sort_column == 'id' else DB_COLUMNS.index(self.sort_column)
+    return column, Qt.DescendingOrder if self.sort_descending else Qt.AscendingOrder
+
+  def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+    # Sorting happens in the database, where the whole table is: the rows are
+    # fetched again from the first page, in the new order. Column -1 goes
+    # back to the id order.
+    if not self.can_sort(column):
+      return
+
+    sort_column = DB_COLUMNS[column] if column != -1 else 'id'
+    descending = sort_column != 'id' and order == Qt.DescendingOrder
+    if (sort_column, descending) == (self.sort_column, self.sort_descending):
+      return
+
+    self.sort_column, self.sort_descending = sort_column, descending
+    self.set_query(self.query)
+
+  def remove_rows(self, rows: t.Iterable[int]) -> None:
+    # Remove contiguous runs bottom-up so the earlier row numbers stay valid
+    for first, last in _contiguous_ranges(sorted(set(rows), reverse=True)):
+      self.beginRemoveRows(QModelIndex(), first, last)
+
+      for _id in self._ids[first:last + 1]:
+        self.pending_changes.pop(_id, None)
+        self.pending_additions.pop(_id, None)
+        self.pending_deletions.add(_id)
+        self.search_index.discard(_id)
+
+      del self._ids[first:last + 1]
+      for values in self._columns:
+        del values[first:last + 1]
+
+      self.endRemoveRows()
+
+  def take_pending(self) -> tuple[dict[int, dict[str, str]], set[int], 'dict[int, ContactEntry]']:
+    pending = self.pending_changes, self.pending_deletions, self.pending_additions
+    self.pending_changes, self.pending_deletions, self.pending_additions = {}, set(), {}
+    return pending
+
+  def restore_pending(
+    self,
+    changes: dict[int, dict[str, str]],
+    deletions: set[int],
+    additions: 'dict[int, ContactEntry]',
+  ) -> None:
+    # Edits made while the save was running win over the restored ones
+    for _id, values in changes.items():
+      self.pending_changes[_id] = values | self.pending_changes.get(_id, {})
+    self.pending_deletions |= deletions
+    self.pending_additions |= {
+      _id: contact for _id, contact in additions.items() if _id not in self.pending_deletions
+    }
+
+
+# Shows the rows of a fully loaded ContactsTableModel that match a query.
+# The matching ids come from the model's search index in one go, and the
+# view is refreshed once per query instead of once per row.
+class ContactsFilterProxyModel(QSortFilterProxyModel):
+  def __init__(self, source: ContactsTableModel, parent=None) -> None:
+    super().__init__(parent)
+    self.setSourceModel(source)
+    self.source = source
+    self._visible: set[int] | None = None
+
+  def sort(self, column: int, order: Qt.SortOrder = Qt.AscendingOrder) -> None:
+    # Sorted here, only the rows loaded so far would be ordered
+    self.source.sort(column, order)
+
+  @property
+  def is_filtering(self) -> bool:
+    return self._visible is not None
+
+  def set_filter(self, query: str | None) -> int:
+    # A reset rebuilds the mapping in one pass, refiltering in place emits a
+    # removal or insertion for every run of rows that changed
+    self.beginResetModel()
+    self._visible = self.source.search_index.search(query) if query else None
+    self.endResetModel()
+    return self.rowCount()
+
+  def filterAcceptsRow(self, source_row: int, source_parent: ModelIndex) -> bool:
+    if self._visible is None:
+      return True
+
+    # Contacts added while a filter is active stay visible
+    _id = self.source.id_at(source_row)
+    return _id in self._visible or _id in self.source.added_ids
@@ -0,0 +1,17 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ..src.db_manager import main as db_main, init_db_session
+
+
+# Each test gets a database of its own in a temporary directory
+class DatabaseTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    tmp_dir = tempfile.TemporaryDirectory()
+    self.addCleanup(tmp_dir.cleanup)
+    self.db_path = Path(tmp_dir.name) / 'contacts.db'
+
+    init_db_session(self.db_path)
+    self.addCleanup(db_main.ENGINE.dispose)
+    self.addCleanup(db_main.DB_SESSION.close)
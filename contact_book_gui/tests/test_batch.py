@@ -0,0 +1,46 @@
+import json
+import sqlite3
+import unittest
+
+from ..src.db_manager import run_commands
+from ._db import DatabaseTestCase
+
+
+class RunCommandsTest(DatabaseTestCase):
+  def run_lines(self, *commands: dict) -> list[dict]:
+    return list(run_commands(json.dumps(command) for command in commands))
+
+  def saved_names(self) -> list[str]:
+    with sqlite3.connect(self.db_path) as conn:
+      return [name for name, in conn.execute('SELECT name FROM contacts ORDER BY id')]
+
+  def assert_fails_alone(self, bad_command: dict, error: str) -> None:
+    results = self.run_lines(
+      {'op': 'add', 'values': {'name': 'Before', 'email': 'before@example.com'}},
+      bad_command,
+      {'op': 'add', 'values': {'name': 'After', 'email': 'after@example.com'}},
+    )
+
+    self.assertEqual([result['ok'] for result in results], [True, False, True])
+    self.assertIn(error, results[1]['error'])
+    self.assertEqual(self.saved_names(), ['Before', 'After'])
+
+  def test_non_string_value(self) -> None:
+    self.assert_fails_alone(
+      {'op': 'add', 'values': {'name': 'E', 'email': 5}}, "must be strings or null: email",
+    )
+
+  def test_non_scalar_filter(self) -> None:
+    self.assert_fails_alone(
+      {'op': 'update', 'query': {'name': {'x': 1}}, 'values': {'address': 'x'}},
+      "must be compared to a string, number or null: name",
+    )
+
+  def test_unbindable_parameter(self) -> None:
+    self.assert_fails_alone(
+      {'op': 'search', 'order_by': 'name', 'after_id': 1, 'after_value': {'x': 1}}, 'ProgrammingError',
+    )
+
+
+if __name__ == '__main__':
+  unittest.main()
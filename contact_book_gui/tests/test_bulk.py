@@ -0,0 +1,41 @@
+import io
+import unittest
+
+from ..src.db_manager import DB_COLUMNS, import_contacts, export_contacts
+from ..src.db_manager._bulk import read_vcard
+from ._db import DatabaseTestCase
+
+
+CONTACTS = [
+  {'name': 'Asha Rao', 'phone_no': '', 'email': 'asha@example.com', 'address': 'Flat 4; MG Road, Pune'},
+  {'name': 'Ravi, Jr.', 'phone_no': '', 'email': 'ravi@example.com', 'address': 'C:\\Users; Block\\;B'},
+  {'name': 'Meena', 'phone_no': '', 'email': 'meena@example.com', 'address': 'Line 1\nLine 2;'},
+]
+
+
+class VCardRoundTripTest(DatabaseTestCase):
+  def test_export_then_read(self) -> None:
+    report = import_contacts(CONTACTS)
+    self.assertEqual(report['inserted'], len(CONTACTS))
+
+    path = self.db_path.with_name('contacts.vcf')
+    self.assertEqual(export_contacts(path), len(CONTACTS))
+
+    with open(path, newline='', encoding='utf-8') as file:
+      self.assertEqual(list(read_vcard(file)), [{col: c[col] for col in DB_COLUMNS} for c in CONTACTS])
+
+  def test_structured_values_split_on_unescaped_semicolons(self) -> None:
+    card = io.StringIO(
+      'BEGIN:VCARD\r\n'
+      'N:Rao\\;Iyer;Asha;;;\r\n'
+      'EMAIL:asha@example.com\r\n'
+      'ADR:;;12 Main St\\; Apt 3;Pune;;411001;India\r\n'
+      'END:VCARD\r\n'
+    )
+    [contact] = read_vcard(card)
+    self.assertEqual(contact['name'], 'Asha Rao;Iyer')
+    self.assertEqual(contact['address'], '12 Main St; Apt 3, Pune, 411001, India')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from ..src.db_manager import main as db_main, add, save_changes, fuzzy_search
+from ._db import DatabaseTestCase
+
+
+CONTACTS = [
+  ('Alice Rao', 'alice@example.com'),
+  ('Bob Shah', 'bob@example.com'),
+  ('Carol Iyer', 'carol@example.com'),
+  ('Jonathan Das', 'jon@example.com'),
+]
+
+
+class FuzzySearchTest(DatabaseTestCase):
+  def setUp(self) -> None:
+    super().setUp()
+    self.assertTrue(db_main.FUZZY_ENABLED, 'SQLite has no trigram tokenizer')
+
+    for name, email in CONTACTS:
+      add({'name': name, 'phone_no': '', 'email': email, 'address': ''})
+    save_changes()
+
+  def assert_same_as_full_scan(self, query: str) -> list[db_main.FuzzyMatch]:
+    indexed = fuzzy_search(query)
+
+    db_main.FUZZY_ENABLED = False
+    try:
+      full_scan = fuzzy_search(query)
+    finally:
+      db_main.FUZZY_ENABLED = True
+
+    self.assertEqual(indexed, full_scan)
+    return indexed
+
+  def test_transpositions(self) -> None:
+    for query, name in [('alcie', 'Alice Rao'), ('jonahtan', 'Jonathan Das'), ('carlo', 'Carol Iyer')]:
+      with self.subTest(query=query):
+        matches = self.assert_same_as_full_scan(query)
+        self.assertEqual((matches[0]['name'], matches[0]['distance']), (name, 1))
+
+  def test_short_queries(self) -> None:
+    for query, name in [('bbo', 'Bob Shah'), ('aice', 'Alice Rao')]:
+      with self.subTest(query=query):
+        matches = self.assert_same_as_full_scan(query)
+        self.assertIn(name, [match['name'] for match in matches])
+
+  def test_long_queries_use_the_index(self) -> None:
+    self.assertIsNotNone(db_main.fuzzy_candidates('jonathan das', 1, 10))
+    self.assert_same_as_full_scan('jonathan das')
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,38 @@
+from .main import Human_unreadable_urlsafe_password as Human_unreadable_urlsafe_password
+from .main import Human_unreadable_password_using_printable_characters as Human_unreadable_password_using_printable_characters
+from .main import Human_unreadable_password_meeting_a_policy as Human_unreadable_password_meeting_a_policy
+from .main import XKCD_password_generation_method as XKCD_password_generation_method
+from .main import options as options
+
+from ._bulk import METHOD_ALPHABETS as METHOD_ALPHABETS
+from ._bulk import random_chars as random_chars
+from ._bulk import password_block as password_block
+from ._bulk import generate_passwords as generate_passwords
+from ._bulk import write_passwords as write_passwords
+
+from ._wordlist import Wordlist as Wordlist
+from ._wordlist import load_wordlist as load_wordlist
+from ._wordlist import compile_wordlist as compile_wordlist
+from ._wordlist import write_passphrases as write_passphrases
+
+from ._policy import PasswordPolicy as PasswordPolicy
+from ._policy import AMBIGUOUS_CHARACTERS as AMBIGUOUS_CHARACTERS
+from ._policy import check_policy as check_policy
+from ._policy import meets_policy as meets_policy
+from ._policy import generate_with_policy as generate_with_policy
+from ._policy import policy_passwords as policy_passwords
+from ._policy import write_policy_passwords as write_policy_passwords
+
+from ._generate import METHODS as METHODS
+from ._generate import GenerateOptions as GenerateOptions
+from ._generate import generate as generate
+from ._generate import generate_many as generate_many
+
+from ._analysis import entropy_bits as entropy_bits
+from ._analysis import policy_entropy_bits as policy_entropy_bits
+from ._analysis import char_probabilities as char_probabilities
+from ._analysis import check_distribution as check_distribution
+
+from .breach import BreachIndex as BreachIndex
+from .breach import open_breach_index as open_breach_index
+from .breach import compile_breach_corpus as compile_breach_corpus
@@ -0,0 +1,192 @@
+import argparse
+import contextlib
+import os
+import sys
+from itertools import batched
+from typing import BinaryIO
+
+from .main import main as interactive_main
+from ._bulk import METHOD_ALPHABETS, PASSWORDS_PER_BLOCK, write_passwords
+from ._wordlist import DEFAULT_WORDLIST, load_wordlist, write_passphrases
+from ._policy import AMBIGUOUS_CHARACTERS, PasswordPolicy, policy_alphabet, write_policy_passwords
+from ._generate import METHODS, GenerateOptions, generate_many
+from ._analysis import entropy_bits
+from .breach import BreachIndex, open_breach_index
+
+
+DEFAULT_POLICY = PasswordPolicy()
+# Rounds in a row whose every password was breached before giving up
+MAX_BREACHED_ROUNDS = 100
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    prog='python -m password_generator',
+    description='Generate a password interactively, or many of them with --count.',
+  )
+  parser.add_argument(
+    '--count', type=int, help='Write this many passwords, one per line, without asking anything.'
+  )
+  parser.add_argument('--method', choices=METHODS, default='urlsafe')
+  parser.add_argument('--length', type=int, default=16, help='Characters per password.')
+  parser.add_argument('--words', type=int, default=6, help='Words per xkcd passphrase.')
+  parser.add_argument('--delimiter', default=' ', help='Between the words of a passphrase.')
+  parser.add_argument(
+    '--wordlist', default=DEFAULT_WORDLIST,
+    help='Text file with a word per line, or one compiled from it, for the xkcd method.',
+  )
+
+  policy_group = parser.add_argument_group('policy', 'Rules that every password of the policy method meets.')
+  for name in ('lowercase', 'uppercase', 'digits', 'symbols'):
+    policy_group.add_argument(f'--min-{name}', type=int, default=getattr(DEFAULT_POLICY, f'min_{name}'))
+  policy_group.add_argument('--symbols', default=DEFAULT_POLICY.symbols, help='The allowed symbols.')
+  policy_group.add_argument(
+    '--no-ambiguous', action='store_true', help=f'Leave out the look-alikes {AMBIGUOUS_CHARACTERS}.'
+  )
+  policy_group.add_argument('--max-run', type=int, help='Longest run of one repeated character.')
+
+  parser.add_argument(
+    '--entropy', action='store_true', help='Print the entropy of the chosen method and exit.'
+  )
+  parser.add_argument(
+    '--breach-index',
+    help='Replace the passwords found in this index, compiled with `python -m password_generator.breach compile`.',
+  )
+  parser.add_argument('-o', '--output', default='-', help="Defaults to '-', stdout.")
+  parser.add_argument('--block-size', type=int, default=PASSWORDS_PER_BLOCK, help='Passwords per write.')
+  parser.add_argument(
+    '--workers', type=int, default=1,
+    help='Generate in this many worker processes, 0 for one per core. The output is in no particular order.',
+  )
+
+  args = parser.parse_args(argv)
+  if args.count is not None and (
+    args.count < 0 or args.length < 1 or args.words < 1 or args.block_size < 1 or args.workers < 0
+  ):
+    parser.error(
+      '--count and --workers must not be negative, --length, --words and --block-size must be positive'
+    )
+  return args
+
+
+def policy(args: argparse.Namespace) -> PasswordPolicy:
+  return PasswordPolicy(
+    min_lowercase=args.min_lowercase,
+    min_uppercase=args.min_uppercase,
+    min_digits=args.min_digits,
+    min_symbols=args.min_symbols,
+    exclude_ambiguous=args.no_ambiguous,
+    max_run=args.max_run,
+    symbols=args.symbols,
+  )
+
+
+def generate_options(args: argparse.Namespace) -> GenerateOptions:
+  return GenerateOptions(args.length, args.words, args.delimiter, args.wordlist, policy(args))
+
+
+def print_entropy(args: argparse.Namespace) -> int:
+  bits = entropy_bits(args.method, generate_options(args))
+
+  if args.method == 'xkcd':
+    wordlist = load_wordlist(args.wordlist)
+    print(
+      f'{len(wordlist):,} words, {wordlist.bits_per_word:.2f} bits per word,'
+      f' {bits:.1f} bits per passphrase of {args.words} words'
+    )
+    return 0
+
+  if args.method == 'policy':
+    # Every password meeting the policy is possible, though not all of them
+    # are equally likely
+    print(
+      f'{len(policy_alphabet(policy(args)))} characters, at most {bits:.1f} bits per password of'
+      f' {args.length} characters'
+    )
+    return 0
+
+  print(
+    f'{len(METHOD_ALPHABETS[args.method])} characters, {bits / args.length:.2f} bits per character,'
+    f' {bits:.1f} bits per password of {args.length} characters'
+  )
+  return 0
+
+
+def write_stream(file: BinaryIO, args: argparse.Namespace, index: BreachIndex | None) -> None:
+  # Passwords as they come from the workers, a block at a time, less the
+  # breached ones, which are made up for by another round
+  if '\n' in args.delimiter:
+    raise ValueError("Passphrases are written one per line, the delimiter can't have newlines.")
+
+  written = breached_rounds = 0
+
+  while written < args.count:
+    passwords = generate_many(
+      args.method, args.count - written, args.workers or None, ordered=False, chunk_size=args.block_size,
+      **generate_options(args)._asdict(),
+    )
+
+    round_written = 0
+    for block in batched(passwords, args.block_size):
+      if index is not None:
+        block = [password for password, breached in zip(block, index.screen(block, len(block))) if not breached]
+      if block:
+        file.write(('\n'.join(block) + '\n').encode('utf-8'))
+      round_written += len(block)
+
+    breached_rounds = 0 if round_written else breached_rounds + 1
+    if breached_rounds == MAX_BREACHED_ROUNDS:
+      raise ValueError('Nearly every password this method generates is in the breach index.')
+    written += round_written
+
+
+def write(file: BinaryIO, args: argparse.Namespace) -> None:
+  if args.breach_index or args.workers != 1:
+    write_stream(file, args, open_breach_index(args.breach_index) if args.breach_index else None)
+  elif args.method == 'xkcd':
+    write_passphrases(
+      file, load_wordlist(args.wordlist), args.words, args.count, args.delimiter, args.block_size
+    )
+  elif args.method == 'policy':
+    write_policy_passwords(file, args.length, args.count, policy(args), args.block_size)
+  else:
+    write_passwords(file, METHOD_ALPHABETS[args.method], args.length, args.count, args.block_size)
+
+
+def run_bulk(args: argparse.Namespace) -> int:
+  with contextlib.ExitStack() as stack:
+    file = sys.stdout.buffer if args.output == '-' else stack.enter_context(open(args.output, 'wb'))
+    try:
+      write(file, args)
+      file.flush()
+
+    except BrokenPipeError:
+      # The reader stopped early (e.g. `| head`). stdout is pointed at devnull
+      # so flushing it at exit doesn't raise again
+      os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+      return 1
+
+  return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = parse_args(argv)
+
+  try:
+    if args.entropy:
+      return print_entropy(args)
+
+    if args.count is None:
+      interactive_main(open_breach_index(args.breach_index) if args.breach_index else None)
+      return 0
+
+    return run_bulk(args)
+
+  # A missing wordlist or breach index, or a policy no password can meet
+  except (OSError, ValueError) as e:
+    print(f'{type(e).__name__}: {e}', file=sys.stderr)
+    return 1
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,125 @@
+import math
+import string
+from typing import Callable, NamedTuple
+
+from ._bulk import METHOD_ALPHABETS
+from ._generate import GenerateOptions
+from ._wordlist import load_wordlist
+from ._policy import PasswordPolicy, _character_classes, check_policy, policy_alphabet
+from .main import Human_unreadable_urlsafe_password, Human_unreadable_password_using_printable_characters
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+
+# What the character generators of main.options draw from
+INTERACTIVE_ALPHABETS: dict[Callable[[int], str], str] = {
+  # token_urlsafe(n) base64 encodes n random bytes into about 4n/3
+  # characters, of which the first n are kept. Each one carries 6 bits,
+  # not the 8 of a byte.
+  Human_unreadable_urlsafe_password: METHOD_ALPHABETS['urlsafe'],
+  # string.printable, whitespace (' \t\n\r\x0b\x0c') included
+  Human_unreadable_password_using_printable_characters: string.printable,
+}
+
+
+class ChiSquare(NamedTuple):
+  statistic: float
+  dof: int
+  # How likely a statistic this big is from a generator that does follow
+  # the expected distribution
+  p_value: float
+
+
+class DistributionCheck(NamedTuple):
+  samples: int
+  # Characters that shouldn't have come up at all
+  unexpected: int
+  # Character counts against their expected frequencies
+  overall: ChiSquare
+  # The same at every position of the passwords, summed
+  by_position: ChiSquare
+
+
+def policy_entropy_bits(length: int, policy: PasswordPolicy = PasswordPolicy()) -> float:
+  # log2 of how many passwords of length meet the policy, max_run aside.
+  # Constructed passwords are all among them but not all equally likely,
+  # so this is an upper bound.
+  check_policy(policy, length)
+
+  # ways[n]: strings of n characters meeting the minimums of the classes so far
+  ways = [1] + [0] * length
+  for _, chars, min_count in _character_classes(policy):
+    if chars:
+      ways = [
+        sum(math.comb(n, k) * len(chars) ** k * ways[n - k] for k in range(min_count, n + 1))
+        for n in range(length + 1)
+      ]
+  return math.log2(ways[length])
+
+
+def entropy_bits(method: str, options: GenerateOptions = GenerateOptions()) -> float:
+  if method == 'xkcd':
+    return options.words * load_wordlist(options.wordlist).bits_per_word
+  if method == 'policy':
+    return policy_entropy_bits(options.length, options.policy)
+  return options.length * math.log2(len(METHOD_ALPHABETS[method]))
+
+
+def char_probabilities(method: str, options: GenerateOptions = GenerateOptions()) -> dict[str, float]:
+  # The chance of each character at any one position of a password
+  if method != 'policy':
+    alphabet = METHOD_ALPHABETS[method]
+    return dict.fromkeys(alphabet, 1 / len(alphabet))
+
+  # The required characters of each class plus a uniform fill, shuffled.
+  # Breaking runs (max_run) moves this a little.
+  policy = options.policy
+  classes = [char_class for char_class in _character_classes(policy) if char_class.chars]
+  allowed = policy_alphabet(policy)
+  fill_share = (options.length - sum(min_count for *_, min_count in classes)) / len(allowed)
+  return {
+    c: (min_count / len(chars) + fill_share) / options.length
+    for _, chars, min_count in classes for c in chars
+  }
+
+
+def chi_square_p_value(statistic: float, dof: int) -> float:
+  # Wilson-Hilferty: the cube root of statistic / dof is close to normal.
+  # Good to a few digits from a few dozen degrees of freedom up, which
+  # every alphabet here has
+  variance = 2 / (9 * dof)
+  z = ((statistic / dof) ** (1 / 3) - (1 - variance)) / math.sqrt(variance)
+  return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def chi_square(observed: list[int], expected: list[float]) -> ChiSquare:
+  statistic = sum((o - e) ** 2 / e for o, e in zip(observed, expected))
+  dof = len(observed) - 1
+  return ChiSquare(statistic, dof, chi_square_p_value(statistic, dof))
+
+
+def char_counts(chars: bytes, alphabet: str) -> list[int]:
+  # One pass over chars with NumPy, one bytes.count() per character without
+  if np is not None:
+    counts = np.bincount(np.frombuffer(chars, dtype=np.uint8), minlength=256)
+    return [int(counts[ord(c)]) for c in alphabet]
+  return [chars.count(c.encode('latin-1')) for c in alphabet]
+
+
+def check_distribution(chars: bytes, length: int, probabilities: dict[str, float]) -> DistributionCheck:
+  # chars are passwords of length single byte characters, back to back
+  alphabet = ''.join(probabilities)
+  counts = char_counts(chars, alphabet)
+  overall = chi_square(counts, [p * len(chars) for p in probabilities.values()])
+
+  per_position = len(chars) // length
+  expected = [p * per_position for p in probabilities.values()]
+  statistic = sum(chi_square(char_counts(chars[pos::length], alphabet), expected).statistic for pos in range(length))
+  dof = length * (len(alphabet) - 1)
+
+  return DistributionCheck(
+    len(chars), len(chars) - sum(counts), overall, ChiSquare(statistic, dof, chi_square_p_value(statistic, dof)),
+  )
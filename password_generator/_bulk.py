@@ -0,0 +1,136 @@
+import os
+import string
+import typing as t
+from array import array
+from functools import lru_cache
+from typing import BinaryIO, Iterator
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+
+METHOD_ALPHABETS: dict[str, str] = {
+  # What secrets.token_urlsafe() draws from
+  'urlsafe': string.ascii_letters + string.digits + '-_',
+  # string.printable without its whitespace, which would break up the lines
+  # of the output
+  'printable': string.digits + string.ascii_letters + string.punctuation,
+}
+# os.urandom() is read a block at a time instead of once per character
+MAX_RANDOM_BLOCK_SIZE = 1 << 20
+PASSWORDS_PER_BLOCK = 10_000
+
+
+@lru_cache
+def _sampling_table(alphabet: str) -> tuple[bytes, bytes, int]:
+  encoded = alphabet.encode('latin-1')
+  if not 0 < len(encoded) <= 256 or len(set(encoded)) != len(encoded):
+    raise ValueError('An alphabet needs 1 to 256 distinct single byte characters.')
+
+  # Random byte b becomes alphabet[b % size]. The bytes past the last whole
+  # multiple of size are dropped, or the first 256 % size characters would
+  # come up more often than the rest.
+  size = len(encoded)
+  accepted = 256 - 256 % size
+  table = bytes(encoded[b % size] for b in range(accepted)) + bytes(256 - accepted)
+  return table, bytes(range(accepted, 256)), accepted
+
+
+def random_chars(alphabet: str, count: int) -> bytes:
+  # count characters drawn uniformly from alphabet, in one bytes.translate()
+  # pass per block of random bytes instead of a secrets.choice() per character
+  table, rejected, accepted = _sampling_table(alphabet)
+  chars = bytearray()
+
+  while len(chars) < count:
+    # Enough bytes to be left with what's missing after the rejections, most
+    # of the time
+    missing = count - len(chars)
+    block_size = min(missing * 256 // accepted + 64, MAX_RANDOM_BLOCK_SIZE)
+    chars += os.urandom(block_size).translate(table, rejected)
+
+  del chars[count:]
+  return bytes(chars)
+
+
+def random_indices(size: int, count: int) -> list[int]:
+  # count draws from range(size) out of 32 bit os.urandom() words. As in
+  # random_chars(), the draws past the last whole multiple of size are
+  # rejected so that every index is equally likely; below 2**16 that is
+  # less than one draw in 65536
+  accepted = (1 << 32) - (1 << 32) % size
+  indices: list[int] = []
+
+  while len(indices) < count:
+    draws = array('I', os.urandom(4 * (count - len(indices))))
+    indices += [draw % size for draw in draws if draw < accepted]
+
+  return indices
+
+
+class RandomStream:
+  # Uniform integers below any bound, for draws whose bounds change from one
+  # to the next (like a shuffle's). os.urandom() is read a block at a time;
+  # a stream belongs to one batch of passwords and is never shared, so a
+  # forked process can't replay its bytes.
+  def __init__(self, block_size: int = 1024) -> None:
+    self.block_size = block_size
+    self._draws: t.Iterator[int] = iter(())
+
+  def below(self, bound: int) -> int:
+    accepted = (1 << 32) - (1 << 32) % bound
+    while True:
+      for draw in self._draws:
+        if draw < accepted:
+          return draw % bound
+      self._draws = iter(array('I', os.urandom(4 * self.block_size)))
+
+  def shuffle(self, items: list) -> None:
+    # Fisher-Yates
+    for i in range(len(items) - 1, 0, -1):
+      j = self.below(i + 1)
+      items[i], items[j] = items[j], items[i]
+
+
+def password_block(alphabet: str, length: int, count: int) -> bytes:
+  # count passwords, each one followed by a newline
+  if '\n' in alphabet:
+    raise ValueError("Passwords are written one per line, the alphabet can't have newlines.")
+
+  chars = random_chars(alphabet, length * count)
+
+  if np is not None:
+    block = np.full((count, length + 1), ord('\n'), dtype=np.uint8)
+    block[:, :length] = np.frombuffer(chars, dtype=np.uint8).reshape(count, length)
+    return block.tobytes()
+
+  # The same, a column at a time
+  block = bytearray(b'\n' * (count * (length + 1)))
+  for col in range(length):
+    block[col::length + 1] = chars[col::length]
+  return bytes(block)
+
+
+def generate_passwords(alphabet: str, length: int, count: int) -> Iterator[str]:
+  for start in range(0, count, PASSWORDS_PER_BLOCK):
+    chars = random_chars(alphabet, length * min(PASSWORDS_PER_BLOCK, count - start)).decode('latin-1')
+    yield from (chars[i:i + length] for i in range(0, len(chars), length))
+
+
+def write_passwords(
+  file: BinaryIO,
+  alphabet: str,
+  length: int,
+  count: int,
+  block_size: int = PASSWORDS_PER_BLOCK,
+) -> int:
+  written = 0
+
+  while written < count:
+    passwords = min(block_size, count - written)
+    file.write(password_block(alphabet, length, passwords))
+    written += passwords
+
+  return written
@@ -0,0 +1,122 @@
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+from ._bulk import METHOD_ALPHABETS, PASSWORDS_PER_BLOCK, generate_passwords
+from ._wordlist import DEFAULT_WORDLIST, load_wordlist
+from ._policy import PasswordPolicy, check_policy, policy_passwords
+
+
+METHODS = (*METHOD_ALPHABETS, 'policy', 'xkcd')
+# Chunks a worker process may have ready or in progress before the caller
+# takes them. Without a limit every chunk of count would be submitted at
+# once, and millions of passwords would wait in memory to be read.
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+class GenerateOptions(NamedTuple):
+  # Characters per password, for every method but xkcd
+  length: int = 16
+  # Words per passphrase, and what goes between them, for xkcd
+  words: int = 6
+  delimiter: str = ' '
+  wordlist: str | Path = DEFAULT_WORDLIST
+  policy: PasswordPolicy = PasswordPolicy()
+
+
+def _prepare(method: str, options: GenerateOptions) -> None:
+  # Fails before anything is generated, and leaves the wordlist mapped for
+  # the chunks that follow
+  if method not in METHODS:
+    raise ValueError(f"Unknown method {method!r}, expected one of {', '.join(METHODS)}.")
+  if options.length < 1 or options.words < 1:
+    raise ValueError('length and words must be positive.')
+
+  if method == 'xkcd':
+    load_wordlist(options.wordlist)
+  elif method == 'policy':
+    check_policy(options.policy, options.length)
+
+
+def generate(method: str, count: int, options: GenerateOptions = GenerateOptions()) -> Iterator[str]:
+  _prepare(method, options)
+
+  if method == 'xkcd':
+    return load_wordlist(options.wordlist).passphrases(options.words, count, options.delimiter)
+  if method == 'policy':
+    return policy_passwords(options.length, count, options.policy)
+  return generate_passwords(METHOD_ALPHABETS[method], options.length, count)
+
+
+def _generate_chunk(method: str, count: int, options: GenerateOptions) -> list[str]:
+  return list(generate(method, count, options))
+
+
+def _generate_in_pool(
+  method: str,
+  count: int,
+  options: GenerateOptions,
+  workers: int,
+  ordered: bool,
+  chunk_size: int,
+) -> Iterator[str]:
+  # Each worker reads its own random bytes from os.urandom(), whose stream
+  # no two processes share, and spawned workers start without any state of
+  # this one. The initializer does the setup once per worker.
+  with ProcessPoolExecutor(
+    workers, mp_context=get_context('spawn'), initializer=_prepare, initargs=(method, options),
+  ) as executor:
+    window = workers * CHUNKS_IN_FLIGHT_PER_WORKER
+    ordered_pending: deque[Future[list[str]]] = deque()
+    pending: set[Future[list[str]]] = set()
+
+    for start in range(0, count, chunk_size):
+      future = executor.submit(_generate_chunk, method, min(chunk_size, count - start), options)
+
+      if ordered:
+        ordered_pending.append(future)
+        if len(ordered_pending) >= window:
+          yield from ordered_pending.popleft().result()
+        continue
+
+      pending.add(future)
+      if len(pending) >= window:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          yield from future.result()
+
+    while ordered_pending:
+      yield from ordered_pending.popleft().result()
+
+    while pending:
+      done, pending = wait(pending, return_when=FIRST_COMPLETED)
+      for future in done:
+        yield from future.result()
+
+
+def generate_many(
+  method: str,
+  count: int,
+  workers: int | None = 1,
+  ordered: bool = True,
+  chunk_size: int = PASSWORDS_PER_BLOCK,
+  **options,
+) -> Iterator[str]:
+  # count passwords, streamed as the workers hand in chunks of chunk_size,
+  # in chunk order or (unordered) as soon as each chunk is done. options are
+  # the fields of GenerateOptions. workers=None uses every core; starting
+  # them costs about as much as generating a million urlsafe passwords, it
+  # is worth it for the slower methods and big counts.
+  generate_options = GenerateOptions(**options)
+  _prepare(method, generate_options)
+  if count < 0 or chunk_size < 1:
+    raise ValueError("count can't be negative and chunk_size must be positive.")
+
+  workers = workers or os.cpu_count() or 1
+  if workers == 1 or count <= chunk_size:
+    return generate(method, count, generate_options)
+
+  return _generate_in_pool(method, count, generate_options, workers, ordered, chunk_size)
@@ -0,0 +1,154 @@
+import re
+import string
+from itertools import islice
+from typing import BinaryIO, NamedTuple, Iterator
+
+from ._bulk import PASSWORDS_PER_BLOCK, RandomStream, random_chars
+
+
+# Characters easily mistaken for one another
+AMBIGUOUS_CHARACTERS = 'Il1|O0o'
+
+
+class PasswordPolicy(NamedTuple):
+  min_lowercase: int = 0
+  min_uppercase: int = 1
+  min_digits: int = 1
+  min_symbols: int = 1
+  exclude_ambiguous: bool = False
+  # The longest run of one repeated character, None for no limit
+  max_run: int | None = None
+  symbols: str = string.punctuation
+
+
+class _CharacterClass(NamedTuple):
+  name: str
+  chars: str
+  min_count: int
+
+
+def _character_classes(policy: PasswordPolicy) -> list[_CharacterClass]:
+  # Including the classes left empty, by the policy or by excluding the
+  # ambiguous characters
+  classes = [
+    _CharacterClass('lowercase letters', string.ascii_lowercase, policy.min_lowercase),
+    _CharacterClass('uppercase letters', string.ascii_uppercase, policy.min_uppercase),
+    _CharacterClass('digits', string.digits, policy.min_digits),
+    _CharacterClass('symbols', policy.symbols, policy.min_symbols),
+  ]
+  if policy.exclude_ambiguous:
+    classes = [
+      char_class._replace(chars=''.join(c for c in char_class.chars if c not in AMBIGUOUS_CHARACTERS))
+      for char_class in classes
+    ]
+  return classes
+
+
+def check_policy(policy: PasswordPolicy, length: int) -> None:
+  symbols = policy.symbols
+  if (
+    any(c.isspace() or c.isalnum() or not c.isascii() or not c.isprintable() for c in symbols)
+    or len(set(symbols)) != len(symbols)
+  ):
+    raise ValueError('Symbols must be distinct printable ASCII characters other than letters and digits.')
+
+  classes = _character_classes(policy)
+  if any(min_count < 0 for *_, min_count in classes) or (policy.max_run is not None and policy.max_run < 1):
+    raise ValueError('The minimum counts must not be negative and max_run must be positive.')
+
+  for name, chars, min_count in classes:
+    if min_count and not chars:
+      raise ValueError(f'{min_count} {name} are required, but none are allowed.')
+
+  if sum(min_count for *_, min_count in classes) > length:
+    raise ValueError(f"The required characters don't fit in {length} characters.")
+
+  # A run is broken by swapping in another character of the same class,
+  # one that differs from both of its neighbours
+  if policy.max_run is not None and any(0 < len(chars) < 3 for _, chars, _ in classes):
+    raise ValueError('With max_run, every allowed class needs at least 3 characters.')
+
+
+def _break_runs(chars: list[str], max_run: int, class_of: dict[str, str], stream: RandomStream) -> None:
+  run = 1
+  for i in range(1, len(chars)):
+    run = run + 1 if chars[i] == chars[i - 1] else 1
+    if run <= max_run:
+      continue
+
+    neighbours = {chars[i - 1], chars[i + 1] if i + 1 < len(chars) else chars[i - 1]}
+    choices = [c for c in class_of[chars[i]] if c not in neighbours]
+    chars[i] = choices[stream.below(len(choices))]
+    run = 1
+
+
+def policy_passwords(length: int, count: int, policy: PasswordPolicy = PasswordPolicy()) -> Iterator[str]:
+  # Builds passwords that meet the policy instead of drawing until one does:
+  # the required characters of every class and a fill from all the allowed
+  # ones are shuffled together, then any run longer than max_run is broken.
+  # Each password takes the same work however strict the policy is.
+  check_policy(policy, length)
+
+  classes = [char_class for char_class in _character_classes(policy) if char_class.chars]
+  allowed = policy_alphabet(policy)
+  class_of = {c: chars for _, chars, _ in classes for c in chars}
+  run_re = re.compile(rf'(.)\1{{{policy.max_run}}}', re.DOTALL) if policy.max_run else None
+  fill_length = length - sum(min_count for *_, min_count in classes)
+  stream = RandomStream()
+
+  for start in range(0, count, PASSWORDS_PER_BLOCK):
+    passwords = min(PASSWORDS_PER_BLOCK, count - start)
+    required = [
+      (random_chars(chars, min_count * passwords).decode('latin-1'), min_count)
+      for _, chars, min_count in classes if min_count
+    ]
+    fill = random_chars(allowed, fill_length * passwords).decode('latin-1')
+
+    for n in range(passwords):
+      chars = [
+        *(c for drawn, min_count in required for c in drawn[n * min_count:(n + 1) * min_count]),
+        *fill[n * fill_length:(n + 1) * fill_length],
+      ]
+      stream.shuffle(chars)
+      password = ''.join(chars)
+
+      if run_re is not None and run_re.search(password):
+        _break_runs(chars, policy.max_run, class_of, stream)
+        password = ''.join(chars)
+
+      yield password
+
+
+def generate_with_policy(length: int, policy: PasswordPolicy = PasswordPolicy()) -> str:
+  return next(policy_passwords(length, 1, policy))
+
+
+def meets_policy(password: str, policy: PasswordPolicy) -> bool:
+  classes = _character_classes(policy)
+  allowed = {c for _, chars, _ in classes for c in chars}
+  return (
+    all(c in allowed for c in password)
+    and all(sum(c in chars for c in password) >= min_count for _, chars, min_count in classes)
+    and not (policy.max_run and re.search(rf'(.)\1{{{policy.max_run}}}', password, re.DOTALL))
+  )
+
+
+def policy_alphabet(policy: PasswordPolicy) -> str:
+  return ''.join(chars for _, chars, _ in _character_classes(policy))
+
+
+def write_policy_passwords(
+  file: BinaryIO,
+  length: int,
+  count: int,
+  policy: PasswordPolicy = PasswordPolicy(),
+  block_size: int = PASSWORDS_PER_BLOCK,
+) -> int:
+  passwords = policy_passwords(length, count, policy)
+  written = 0
+
+  while block := list(islice(passwords, block_size)):
+    file.write(('\n'.join(block) + '\n').encode('ascii'))
+    written += len(block)
+
+  return written
@@ -0,0 +1,167 @@
+import math
+import mmap
+import os
+import secrets
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from ._bulk import PASSWORDS_PER_BLOCK, random_indices
+
+
+DEFAULT_WORDLIST = Path(__file__).parent / 'wordlist.txt'
+COMPILED_SUFFIX = '.compiled'
+# Magic, format version, word count. The header is followed by count + 1
+# little endian uint32 offsets into the UTF-8 words stored right after them,
+# word i being words[offsets[i]:offsets[i + 1]]
+MAGIC = b'PWWL'
+VERSION = 1
+HEADER = struct.Struct('<4sII')
+
+
+class Wordlist:
+  def __init__(self, buffer: bytes | mmap.mmap, source: Path | None = None) -> None:
+    magic, version, count = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError(f'{source or "The buffer"} is not a compiled wordlist.')
+    if not count:
+      raise ValueError(f'{source or "The wordlist"} has no words.')
+
+    self.source = source
+    self._buffer = buffer
+    offsets_end = HEADER.size + 4 * (count + 1)
+    self._words = memoryview(buffer)[offsets_end:]
+
+    if sys.byteorder == 'little':
+      self._offsets = memoryview(buffer)[HEADER.size:offsets_end].cast('I')
+    else:
+      self._offsets = array('I', buffer[HEADER.size:offsets_end])
+      self._offsets.byteswap()
+
+  def __len__(self) -> int:
+    return len(self._offsets) - 1
+
+  def __getitem__(self, index: int) -> str:
+    return str(self._words[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+  @property
+  def bits_per_word(self) -> float:
+    return math.log2(len(self))
+
+  def passphrase(self, num_words: int, delimiter: str = ' ') -> str:
+    return delimiter.join([self[index] for index in random_indices(len(self), num_words)])
+
+  def passphrases(self, num_words: int, count: int, delimiter: str = ' ') -> Iterator[str]:
+    indices = iter(random_indices(len(self), num_words * count))
+    for _ in range(count):
+      yield delimiter.join([self[index] for index in islice(indices, num_words)])
+
+  def passphrase_block(self, num_words: int, count: int, delimiter: str = ' ') -> bytes:
+    # count passphrases, each one followed by a newline. The words are joined
+    # as they are mapped, without decoding them
+    words, offsets = self._words, self._offsets
+    separator = delimiter.encode('utf-8')
+    indices = iter(random_indices(len(self), num_words * count))
+
+    lines = [
+      separator.join([words[offsets[index]:offsets[index + 1]] for index in islice(indices, num_words)])
+      for _ in range(count)
+    ]
+    return b'\n'.join(lines) + b'\n'
+
+
+def read_words(lines: Iterable[str]) -> list[str]:
+  # One word per line. The last field is the word, so diceware lists with
+  # their dice rolls in front work as they are. Repeated words would only
+  # make the list look bigger than it is, they are kept once.
+  words = dict.fromkeys(fields[-1] for line in lines if (fields := line.split()))
+  return list(words)
+
+
+def compile_words(words: list[str]) -> bytes:
+  encoded = [word.encode('utf-8') for word in words]
+
+  offsets = array('I', [0])
+  for word in encoded:
+    offsets.append(offsets[-1] + len(word))
+  if sys.byteorder != 'little':
+    offsets.byteswap()
+
+  return HEADER.pack(MAGIC, VERSION, len(encoded)) + offsets.tobytes() + b''.join(encoded)
+
+
+def compile_wordlist(source: str | Path, target: str | Path | None = None) -> Path:
+  source = Path(source)
+  target = Path(target) if target else source.with_name(source.name + COMPILED_SUFFIX)
+
+  with open(source, encoding='utf-8') as file:
+    compiled = compile_words(read_words(file))
+
+  # Written aside and renamed, a process mapping the old file keeps its view.
+  # It gets the source's mtime, which tells whether it is still up to date.
+  partial = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+  partial.write_bytes(compiled)
+  stat = source.stat()
+  os.utime(partial, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+  os.replace(partial, target)
+  return target
+
+
+def _map(path: Path) -> mmap.mmap:
+  with open(path, 'rb') as file:
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _is_compiled(path: Path) -> bool:
+  with open(path, 'rb') as file:
+    return file.read(len(MAGIC)) == MAGIC
+
+
+@lru_cache
+def _load(file_path: str, device: int, inode: int, mtime_ns: int) -> Wordlist:
+  path = Path(file_path)
+  if _is_compiled(path):
+    return Wordlist(_map(path), path)
+
+  compiled = path.with_name(path.name + COMPILED_SUFFIX)
+  try:
+    if not compiled.exists() or compiled.stat().st_mtime_ns != mtime_ns:
+      compile_wordlist(path, compiled)
+    return Wordlist(_map(compiled), path)
+
+  except PermissionError:
+    # Somewhere read only, the list is compiled in memory instead
+    with open(path, encoding='utf-8') as file:
+      return Wordlist(compile_words(read_words(file)), path)
+
+
+def load_wordlist(path: str | Path = DEFAULT_WORDLIST) -> Wordlist:
+  # Plain text lists are compiled next to themselves on first use, and again
+  # once they change. Every call for an unchanged file shares one mapping.
+  stat = os.stat(path)
+  return _load(os.fspath(path), stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+
+
+def write_passphrases(
+  file: BinaryIO,
+  wordlist: Wordlist,
+  num_words: int,
+  count: int,
+  delimiter: str = ' ',
+  block_size: int = PASSWORDS_PER_BLOCK,
+) -> int:
+  if '\n' in delimiter:
+    raise ValueError("Passphrases are written one per line, the delimiter can't have newlines.")
+
+  written = 0
+
+  while written < count:
+    passphrases = min(block_size, count - written)
+    file.write(wordlist.passphrase_block(num_words, passphrases, delimiter))
+    written += passphrases
+
+  return written
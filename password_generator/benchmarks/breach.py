@@ -0,0 +1,69 @@
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from .._bulk import METHOD_ALPHABETS, generate_passwords
+from ..breach import BreachIndex, compile_breach_index
+
+
+def fake_digests(count: int, breached: list[str]) -> list[bytes]:
+  digests = [hashlib.sha1(password.encode()).digest() for password in breached]
+  random_bytes = os.urandom(20 * (count - len(digests)))
+  return digests + [random_bytes[i:i + 20] for i in range(0, len(random_bytes), 20)]
+
+
+def per_call_us(func, number: int) -> float:
+  return timeit.timeit(func, number=number) / number * 1e6
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Time compiling a breach index, looking passwords up in it and screening them in bulk.'
+  )
+  parser.add_argument('--hashes', type=int, default=5_000_000, help='hashes in the corpus')
+  parser.add_argument('--candidates', type=int, default=1_000_000, help='passwords screened in bulk')
+  parser.add_argument('--bloom-bits', type=int, default=10, help='bits per hash of the bloom filter')
+  args = parser.parse_args()
+
+  breached = [f'password{i}' for i in range(1000)]
+  digests = fake_digests(args.hashes, breached)
+  random.shuffle(digests)
+  candidates = list(generate_passwords(METHOD_ALPHABETS['urlsafe'], 12, args.candidates))
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    rows = []
+    for bloom_bits in (0, args.bloom_bits):
+      path = Path(tmp_dir) / f'bloom{bloom_bits}.index'
+
+      start = time.perf_counter()
+      compile_breach_index(digests, path, bloom_bits)
+      compile_s = time.perf_counter() - start
+      index = BreachIndex(path)
+
+      start = time.perf_counter()
+      sum(index.screen(candidates))
+      screen_s = time.perf_counter() - start
+
+      rows.append((
+        'bloom filter' if bloom_bits else 'sorted digests',
+        compile_s,
+        per_call_us(lambda: index.is_breached(random.choice(breached)), 100_000),
+        per_call_us(lambda: index.is_breached(random.choice(candidates)), 100_000),
+        args.candidates / screen_s,
+      ))
+
+  print(f'{args.hashes:,} hashes, {args.candidates:,} candidates screened')
+  print(f"{'':<16} {'compile s':>10} {'hit us':>8} {'miss us':>8} {'screened/s':>12}")
+  for name, compile_s, hit_us, miss_us, screened in rows:
+    print(f'{name:<16} {compile_s:>10.1f} {hit_us:>8.2f} {miss_us:>8.2f} {screened:>12,.0f}')
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,65 @@
+import argparse
+import sys
+import time
+from itertools import islice
+
+from .._bulk import generate_passwords
+from .._policy import PasswordPolicy, meets_policy, policy_alphabet, policy_passwords
+
+
+POLICIES: dict[str, PasswordPolicy] = {
+  'none': PasswordPolicy(min_uppercase=0, min_digits=0, min_symbols=0),
+  'default': PasswordPolicy(),
+  'no_ambiguous_max_run_1': PasswordPolicy(exclude_ambiguous=True, max_run=1),
+  '3_of_each': PasswordPolicy(min_lowercase=3, min_uppercase=3, min_digits=3, min_symbols=3),
+  '4_of_each_max_run_1': PasswordPolicy(
+    min_lowercase=4, min_uppercase=4, min_digits=4, min_symbols=4, exclude_ambiguous=True, max_run=1,
+  ),
+}
+
+
+def regenerate(length: int, count: int, policy: PasswordPolicy, max_draws: int) -> tuple[float, float]:
+  # Draws from the policy's alphabet until count passwords meet it, or
+  # max_draws have been tried. Returns seconds per compliant password and
+  # the share of draws that complied.
+  alphabet = policy_alphabet(policy)
+  start = time.perf_counter()
+  draws = accepted = 0
+
+  while accepted < count and draws < max_draws:
+    for password in generate_passwords(alphabet, length, min(10_000, max_draws - draws)):
+      draws += 1
+      accepted += meets_policy(password, policy)
+
+  elapsed = time.perf_counter() - start
+  return (elapsed / accepted if accepted else float('inf')), accepted / draws
+
+
+def construct(length: int, count: int, policy: PasswordPolicy) -> float:
+  start = time.perf_counter()
+  for _ in islice(policy_passwords(length, count, policy), count):
+    pass
+  return (time.perf_counter() - start) / count
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Time passwords built to meet a policy against regenerating until one does.'
+  )
+  parser.add_argument('--length', type=int, default=16)
+  parser.add_argument('--count', type=int, default=20_000, help='compliant passwords per run')
+  parser.add_argument(
+    '--max-draws', type=int, default=1_000_000, help='give up regenerating after this many tries'
+  )
+  args = parser.parse_args()
+
+  print(f"{'policy':<24} {'complying':>10} {'regenerate us':>14} {'construct us':>13}")
+  for name, policy in POLICIES.items():
+    regenerate_s, acceptance = regenerate(args.length, args.count, policy, args.max_draws)
+    construct_s = construct(args.length, args.count, policy)
+    print(f'{name:<24} {acceptance:>10.2%} {regenerate_s * 1e6:>14,.1f} {construct_s * 1e6:>13,.1f}')
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
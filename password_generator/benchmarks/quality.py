@@ -0,0 +1,146 @@
+import argparse
+import io
+import math
+import string
+import sys
+import time
+from typing import Callable
+
+from ..main import Human_unreadable_password_meeting_a_policy, XKCD_password_generation_method
+from .._analysis import INTERACTIVE_ALPHABETS, check_distribution, char_probabilities, entropy_bits
+from .._bulk import METHOD_ALPHABETS, password_block, write_passwords
+from .._generate import GenerateOptions
+from .._wordlist import load_wordlist, write_passphrases
+from .._policy import policy_passwords, write_policy_passwords
+
+
+def time_calls(func: Callable[[], str], count: int) -> tuple[float, int]:
+  # Seconds for count calls, and the characters they returned
+  start = time.perf_counter()
+  chars = sum(len(func()) for _ in range(count))
+  return time.perf_counter() - start, chars
+
+
+def time_bulk(method: str, options: GenerateOptions, count: int) -> tuple[float, int]:
+  # Seconds to write count passwords as the command line does, and their
+  # size without the newlines
+  output = io.BytesIO()
+  start = time.perf_counter()
+
+  if method == 'xkcd':
+    write_passphrases(output, load_wordlist(options.wordlist), options.words, count)
+  elif method == 'policy':
+    write_policy_passwords(output, options.length, count)
+  else:
+    write_passwords(output, METHOD_ALPHABETS[method], options.length, count)
+
+  return time.perf_counter() - start, output.tell() - count
+
+
+def throughput_rows(args: argparse.Namespace) -> list[tuple[str, int, float, float, float]]:
+  # Generator, length (words for xkcd), bits of entropy, passwords/sec and
+  # bytes/sec
+  rows = []
+
+  def add_row(name: str, length: int, bits: float, count: int, elapsed: float, size: int) -> None:
+    rows.append((name, length, bits, count / elapsed, size / elapsed))
+
+  for length in args.lengths:
+    options = GenerateOptions(length=length)
+
+    for func, alphabet in INTERACTIVE_ALPHABETS.items():
+      elapsed, size = time_calls(lambda: func(length), args.interactive_count)
+      add_row(func.__name__, length, length * math.log2(len(alphabet)), args.interactive_count, elapsed, size)
+
+    # The default policy, which the prompt's defaults match
+    elapsed, size = time_calls(
+      lambda: Human_unreadable_password_meeting_a_policy(length, 1, 1, 1, 0), args.interactive_count
+    )
+    add_row(
+      Human_unreadable_password_meeting_a_policy.__name__, length, entropy_bits('policy', options),
+      args.interactive_count, elapsed, size,
+    )
+
+    for method in ('urlsafe', 'printable', 'policy'):
+      elapsed, size = time_bulk(method, options, args.count)
+      add_row(f'--method {method}', length, entropy_bits(method, options), args.count, elapsed, size)
+
+  if args.wordlist:
+    options = GenerateOptions(words=args.words, wordlist=args.wordlist)
+    bits = entropy_bits('xkcd', options)
+
+    # What XKCD_password_generation_method() does, with the given wordlist
+    wordlist = load_wordlist(args.wordlist)
+    elapsed, size = time_calls(lambda: wordlist.passphrase(args.words), args.interactive_count)
+    add_row(XKCD_password_generation_method.__name__, args.words, bits, args.interactive_count, elapsed, size)
+    elapsed, size = time_bulk('xkcd', options, args.count)
+    add_row('--method xkcd', args.words, bits, args.count, elapsed, size)
+
+  return rows
+
+
+def sample_chars(name: str, length: int, samples: int) -> bytes:
+  # About samples characters from each generator, as passwords of length
+  count = max(1, samples // length)
+  if name == 'policy':
+    return ''.join(policy_passwords(length, count)).encode('ascii')
+  if name in METHOD_ALPHABETS:
+    return password_block(METHOD_ALPHABETS[name], length, count).replace(b'\n', b'')
+
+  func = next(func for func in INTERACTIVE_ALPHABETS if func.__name__ == name)
+  return ''.join(func(length) for _ in range(count)).encode('ascii')
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Compare the generators on entropy, speed and how evenly they draw their characters.'
+  )
+  parser.add_argument('--lengths', type=int, nargs='+', default=[8, 16, 32])
+  parser.add_argument('--count', type=int, default=1_000_000, help='passwords per bulk run')
+  parser.add_argument('--interactive-count', type=int, default=20_000, help='calls per interactive generator')
+  parser.add_argument('--samples', type=int, default=10_000_000, help='characters per distribution check')
+  parser.add_argument(
+    '--interactive-samples', type=int, default=1_000_000,
+    help='characters per distribution check of the interactive generators, which are far slower',
+  )
+  parser.add_argument('--words', type=int, default=6, help='words per xkcd passphrase')
+  parser.add_argument('--wordlist', help='Also time the xkcd generators with this wordlist.')
+  args = parser.parse_args()
+
+  print(f"{'generator':<54} {'length':>6} {'bits':>7} {'passwords/s':>13} {'bytes/s':>13}")
+  for name, length, bits, passwords_per_sec, bytes_per_sec in throughput_rows(args):
+    print(f'{name:<54} {length:>6} {bits:>7.1f} {passwords_per_sec:>13,.0f} {bytes_per_sec:>13,.0f}')
+
+  # Whitespace doesn't survive being copied into most password fields
+  length = 16
+  whitespace = sum(c.isspace() for c in string.printable) / len(string.printable)
+  print(
+    f'\n{1 - (1 - whitespace) ** length:.0%} of the {length} character passwords of'
+    ' Human_unreadable_password_using_printable_characters have whitespace in them'
+  )
+
+  print(f"\n{'distribution check':<54} {'samples':>11} {'chi2':>10} {'dof':>5} {'p':>7} {'p by position':>14}")
+  checks = [
+    (method, args.samples, char_probabilities(method, GenerateOptions(length=length)))
+    for method in ('urlsafe', 'printable', 'policy')
+  ]
+  checks += [
+    (func.__name__, args.interactive_samples, dict.fromkeys(alphabet, 1 / len(alphabet)))
+    for func, alphabet in INTERACTIVE_ALPHABETS.items()
+  ]
+
+  for name, samples, probabilities in checks:
+    start = time.perf_counter()
+    check = check_distribution(sample_chars(name, length, samples), length, probabilities)
+    elapsed = time.perf_counter() - start
+    print(
+      f'{name:<54} {check.samples:>11,} {check.overall.statistic:>10.1f} {check.overall.dof:>5}'
+      f' {check.overall.p_value:>7.3f} {check.by_position.p_value:>14.3f}'
+      + (f'  {check.unexpected:,} unexpected characters' if check.unexpected else '')
+      + f'  ({elapsed:.1f}s)'
+    )
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,103 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+import typing as t
+from typing import TypedDict, Callable
+
+from .. import _bulk
+from ..main import Human_unreadable_urlsafe_password, Human_unreadable_password_using_printable_characters
+
+
+# The interactive generators, called once per password
+PER_PASSWORD: dict[str, Callable[[int], str]] = {
+  'urlsafe': Human_unreadable_urlsafe_password,
+  'printable': Human_unreadable_password_using_printable_characters,
+}
+
+
+class Result(TypedDict):
+  method: str
+  path: str
+  count: int
+  median_s: float
+  passwords_per_sec: float
+
+
+class _NullFile:
+  def write(self, data: bytes) -> int:
+    return len(data)
+
+
+def _time(func: Callable[[], t.Any], repeat: int) -> float:
+  timings = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    func()
+    timings.append(time.perf_counter() - start)
+  return statistics.median(timings)
+
+
+def bench_method(method: str, length: int, count: int, repeat: int) -> list[Result]:
+  alphabet = _bulk.METHOD_ALPHABETS[method]
+  generate = PER_PASSWORD[method]
+  paths: dict[str, Callable[[], t.Any]] = {
+    'per_password': lambda: [generate(length) for _ in range(count)],
+    'bulk': lambda: _bulk.write_passwords(_NullFile(), alphabet, length, count),
+  }
+
+  results = []
+  for path, func in paths.items():
+    elapsed = _time(func, repeat)
+    results.append({
+      'method': method, 'path': path, 'count': count, 'median_s': elapsed,
+      'passwords_per_sec': count / elapsed,
+    })
+
+  if _bulk.np is not None:
+    np, _bulk.np = _bulk.np, None
+    try:
+      elapsed = _time(paths['bulk'], repeat)
+    finally:
+      _bulk.np = np
+
+    results.append({
+      'method': method, 'path': 'bulk_without_numpy', 'count': count, 'median_s': elapsed,
+      'passwords_per_sec': count / elapsed,
+    })
+
+  return results
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Compare the per character generators with the buffered bulk mode.'
+  )
+  parser.add_argument('--count', type=int, default=100_000, help='passwords per run')
+  parser.add_argument('--length', type=int, default=16)
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--json', action='store_true', help='print the results as JSON')
+  args = parser.parse_args()
+
+  results = [
+    result
+    for method in PER_PASSWORD
+    for result in bench_method(method, args.length, args.count, args.repeat)
+  ]
+
+  if args.json:
+    print(json.dumps(results, indent=2))
+    return 0
+
+  print(f"{'method':<10} {'path':<20} {'seconds':>8} {'passwords/s':>14}")
+  for result in results:
+    print(
+      f"{result['method']:<10} {result['path']:<20} {result['median_s']:>8.3f}"
+      f" {result['passwords_per_sec']:>14,.0f}"
+    )
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
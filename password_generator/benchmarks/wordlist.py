@@ -0,0 +1,74 @@
+import argparse
+import io
+import random
+import secrets
+import string
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from .._wordlist import load_wordlist, write_passphrases
+
+
+def fake_words(count: int, seed: int = 0) -> list[str]:
+  rng = random.Random(seed)
+  words: set[str] = set()
+  while len(words) < count:
+    words.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))))
+  return sorted(words)
+
+
+def read_and_split(path: Path, num_words: int) -> str:
+  # What XKCD_password_generation_method did before the wordlists were compiled
+  with open(path) as f:
+    wordlist = f.read().split()
+    return ' '.join(secrets.choice(wordlist) for _ in range(num_words))
+
+
+def per_call_us(func, number: int) -> float:
+  return timeit.timeit(func, number=number) / number * 1e6
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Time passphrases from a compiled wordlist against reading the list on every call.'
+  )
+  parser.add_argument('--words', type=int, default=100_000, help='words in the list')
+  parser.add_argument('--num-words', type=int, default=6, help='words per passphrase')
+  parser.add_argument('--count', type=int, default=1_000_000, help='passphrases in the bulk run')
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    path = Path(tmp_dir) / 'wordlist.txt'
+    path.write_text('\n'.join(fake_words(args.words)) + '\n')
+
+    start = time.perf_counter()
+    wordlist = load_wordlist(path)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    load_wordlist(path)
+    cached_us = (time.perf_counter() - start) * 1e6
+
+    rows = [
+      ('compile on first load', compile_ms * 1000),
+      ('later loads', cached_us),
+      ('read and split per call', per_call_us(lambda: read_and_split(path, args.num_words), 20)),
+      ('compiled, per call', per_call_us(lambda: wordlist.passphrase(args.num_words), 100_000)),
+    ]
+
+    start = time.perf_counter()
+    write_passphrases(io.BytesIO(), wordlist, args.num_words, args.count)
+    rows.append(('compiled, bulk', (time.perf_counter() - start) / args.count * 1e6))
+
+  print(f'{args.words:,} words, {wordlist.bits_per_word:.2f} bits per word')
+  print(f"{'':<26} {'us':>12}")
+  for name, us in rows:
+    print(f'{name:<26} {us:>12,.2f}')
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+
+from .._generate import METHODS, generate_many
+
+
+def main() -> int:
+  parser = argparse.ArgumentParser(
+    description='Time generate_many() with 1 to --workers worker processes for every method.'
+  )
+  parser.add_argument('--count', type=int, default=1_000_000)
+  parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+  parser.add_argument('--wordlist', help='Also time the xkcd method with this wordlist.')
+  args = parser.parse_args()
+
+  methods = [method for method in METHODS if method != 'xkcd' or args.wordlist]
+  options = {'wordlist': args.wordlist} if args.wordlist else {}
+  worker_counts = sorted({1, *range(2, args.workers + 1, 2), args.workers})
+
+  print(f'{args.count:,} passwords, passwords/sec')
+  print(f"{'workers':<10}" + ''.join(f'{method:>12}' for method in methods))
+  for workers in worker_counts:
+    rates = []
+    for method in methods:
+      start = time.perf_counter()
+      # Consumed without keeping the passwords around
+      deque(generate_many(method, args.count, workers, ordered=False, **options), maxlen=0)
+      rates.append(args.count / (time.perf_counter() - start))
+
+    print(f'{workers:<10}' + ''.join(f'{rate:>12,.0f}' for rate in rates))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,7 @@
+from ._index import BreachIndex as BreachIndex
+from ._index import open_breach_index as open_breach_index
+from ._index import compile_breach_index as compile_breach_index
+from ._index import compile_breach_corpus as compile_breach_corpus
+from ._index import read_digests as read_digests
+
+from ._bloom import BloomFilter as BloomFilter
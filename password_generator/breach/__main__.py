@@ -0,0 +1,116 @@
+import argparse
+import contextlib
+import os
+import sys
+import time
+from itertools import batched
+
+from . import compile_breach_corpus, open_breach_index
+from ._index import RUN_SIZE, SCREEN_CHUNK_SIZE
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+    prog='python -m password_generator.breach',
+    description='Compile a corpus of breached password hashes and screen passwords against it.',
+  )
+  subparsers = parser.add_subparsers(dest='command', required=True)
+
+  compile_parser = subparsers.add_parser(
+    'compile', help='Compile SHA-1 hashes, one hex hash (or HASH:COUNT) per line, into an index.'
+  )
+  compile_parser.add_argument('source')
+  compile_parser.add_argument('index', nargs='?', help='Defaults to the source with an .index suffix.')
+  compile_parser.add_argument(
+    '--bloom-bits', type=int, default=0,
+    help='Also build a bloom filter with this many bits per hash, 10 gives about 1%% false positives.',
+  )
+  compile_parser.add_argument(
+    '--run-size', type=int, default=RUN_SIZE, help='Hashes sorted in memory at a time.'
+  )
+
+  screen_parser = subparsers.add_parser(
+    'screen', help='Write the passwords, one per line, that are not in the index.'
+  )
+  screen_parser.add_argument('index')
+  screen_parser.add_argument('path', nargs='?', default='-', help="Defaults to '-', stdin.")
+  screen_parser.add_argument('-o', '--output', default='-', help="Defaults to '-', stdout.")
+  screen_parser.add_argument(
+    '--breached', action='store_true', help='Write the passwords that are in the index instead.'
+  )
+  screen_parser.add_argument('--chunk-size', type=int, default=SCREEN_CHUNK_SIZE)
+
+  args = parser.parse_args(argv)
+  if args.command == 'compile' and (args.bloom_bits < 0 or args.run_size < 1):
+    parser.error('--bloom-bits must not be negative and --run-size must be positive')
+  if args.command == 'screen' and args.chunk_size < 1:
+    parser.error('--chunk-size must be positive')
+  return args
+
+
+def run_compile(args: argparse.Namespace) -> int:
+  start = time.perf_counter()
+  index = open_breach_index(compile_breach_corpus(args.source, args.index, args.bloom_bits, args.run_size))
+
+  print(
+    f'Compiled {len(index):,} hashes into {index.path} in {time.perf_counter() - start:.1f}s',
+    file=sys.stderr,
+  )
+  return 0
+
+
+def run_screen(args: argparse.Namespace) -> int:
+  index = open_breach_index(args.index)
+  start = time.perf_counter()
+  screened = breached = 0
+
+  with contextlib.ExitStack() as stack:
+    source = sys.stdin.buffer if args.path == '-' else stack.enter_context(open(args.path, 'rb'))
+    output = sys.stdout.buffer if args.output == '-' else stack.enter_context(open(args.output, 'wb'))
+    # Passwords are hashed as the bytes they are, without decoding them
+    passwords = (line.rstrip(b'\r\n') for line in source)
+
+    try:
+      for chunk in batched(passwords, args.chunk_size):
+        flags = list(index.screen(chunk, args.chunk_size))
+        kept = [password for password, flag in zip(chunk, flags) if flag == args.breached]
+        if kept:
+          output.write(b'\n'.join(kept) + b'\n')
+        screened += len(chunk)
+        breached += sum(flags)
+      output.flush()
+
+    except BrokenPipeError:
+      # As in `python -m password_generator`
+      os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+      return 1
+
+  elapsed = time.perf_counter() - start
+  print(
+    f'Screened {screened:,} passwords, {breached:,} breached, in {elapsed:.1f}s'
+    f' ({screened / elapsed if elapsed else 0:,.0f} passwords/sec)',
+    file=sys.stderr,
+  )
+  return 0
+
+
+RUNNERS = {
+  'compile': run_compile,
+  'screen': run_screen,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = parse_args(argv)
+
+  try:
+    return RUNNERS[args.command](args)
+
+  # A missing file, or a corpus line that isn't a hash
+  except (OSError, ValueError) as e:
+    print(f'{type(e).__name__}: {e}', file=sys.stderr)
+    return 1
+
+
+if __name__ == '__main__':
+  sys.exit(main())
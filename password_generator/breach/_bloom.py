@@ -0,0 +1,90 @@
+import math
+import mmap
+import os
+import struct
+from pathlib import Path
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+
+HASH_SIZE = 20
+# Magic, format version, hashes the filter was built from, block count, bits
+# set per hash, then the blocks. A hash sets all of its bits in one 64 byte
+# block, so a lookup touches one page instead of one per bit.
+MAGIC = b'PWBF'
+VERSION = 1
+HEADER = struct.Struct('<4sIQQI')
+BLOCK_SIZE = 64
+BLOCK_BITS = BLOCK_SIZE * 8
+# Bit positions are 9 bit slices of one 64 bit word of the hash
+MAX_BITS_PER_HASH = 7
+HASHES_PER_CHUNK = 1 << 20
+
+
+def bloom_size(count: int, bits_per_entry: int) -> tuple[int, int]:
+  # Blocks for count hashes at bits_per_entry bits each, and the number of
+  # bits set per hash that keeps false positives lowest at that size
+  blocks = max(1, math.ceil(count * bits_per_entry / BLOCK_BITS))
+  bits_per_hash = min(MAX_BITS_PER_HASH, max(1, round(bits_per_entry * math.log(2))))
+  return blocks, bits_per_hash
+
+
+def _bit_positions(digest: bytes, blocks: int, bits_per_hash: int) -> list[int]:
+  # SHA-1 digests are uniformly distributed already, their bytes are used as
+  # they are instead of being hashed again
+  start = int.from_bytes(digest[:8], 'little') % blocks * BLOCK_BITS
+  word = int.from_bytes(digest[8:16], 'little')
+  return [start + (word >> 9 * i & BLOCK_BITS - 1) for i in range(bits_per_hash)]
+
+
+def build_bloom_filter(digests: memoryview, target: Path, bits_per_entry: int) -> Path:
+  # digests holds 20 byte SHA-1 digests back to back
+  count = len(digests) // HASH_SIZE
+  blocks, bits_per_hash = bloom_size(count, bits_per_entry)
+  bits = bytearray(blocks * BLOCK_SIZE)
+
+  for chunk_start in range(0, count, HASHES_PER_CHUNK):
+    chunk = digests[chunk_start * HASH_SIZE:(chunk_start + HASHES_PER_CHUNK) * HASH_SIZE]
+
+    if np is not None:
+      fields = np.frombuffer(chunk, dtype=np.dtype([('block', '<u8'), ('word', '<u8'), ('rest', 'V4')]))
+      starts = fields['block'] % np.uint64(blocks) * np.uint64(BLOCK_BITS)
+      for i in range(bits_per_hash):
+        positions = starts + (fields['word'] >> np.uint64(9 * i) & np.uint64(BLOCK_BITS - 1))
+        np.bitwise_or.at(
+          np.frombuffer(bits, dtype=np.uint8), positions >> np.uint64(3),
+          np.left_shift(1, positions & np.uint64(7)).astype(np.uint8),
+        )
+      continue
+
+    for start in range(0, len(chunk), HASH_SIZE):
+      for position in _bit_positions(chunk[start:start + HASH_SIZE], blocks, bits_per_hash):
+        bits[position >> 3] |= 1 << (position & 7)
+
+  partial = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+  with open(partial, 'wb') as file:
+    file.write(HEADER.pack(MAGIC, VERSION, count, blocks, bits_per_hash))
+    file.write(bits)
+  os.replace(partial, target)
+  return target
+
+
+class BloomFilter:
+  def __init__(self, path: Path) -> None:
+    with open(path, 'rb') as file:
+      self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, self.count, self.blocks, self.bits_per_hash = HEADER.unpack_from(self._map)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError(f'{path} is not a bloom filter of a breach index.')
+    self.path = path
+
+  def might_contain(self, digest: bytes) -> bool:
+    bits = self._map
+    for position in _bit_positions(digest, self.blocks, self.bits_per_hash):
+      if not bits[HEADER.size + (position >> 3)] >> (position & 7) & 1:
+        return False
+    return True
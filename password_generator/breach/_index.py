@@ -0,0 +1,270 @@
+import binascii
+import hashlib
+import heapq
+import mmap
+import os
+import string
+import struct
+import sys
+import tempfile
+from array import array
+from collections import Counter
+from functools import lru_cache
+from itertools import batched, chain
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from ._bloom import HASH_SIZE, BloomFilter, build_bloom_filter
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+
+BLOOM_SUFFIX = '.bloom'
+# Magic, format version, hash count, prefix bits. The header is followed by
+# the sorted, distinct 20 byte SHA-1 digests, then 2**prefix_bits + 1 little
+# endian uint64 indexes: the digests whose first prefix_bits bits are p are
+# digests[fanout[p]:fanout[p + 1]]
+MAGIC = b'PWBI'
+VERSION = 1
+HEADER = struct.Struct('<4sIQI')
+# Prefixes are counted at this many bits while compiling, then merged into
+# buckets of about HASHES_PER_BUCKET digests, a few pages to search
+MAX_PREFIX_BITS = 24
+HASHES_PER_BUCKET = 32
+# Digests sorted in memory at a time, about 300MB of them
+RUN_SIZE = 4_000_000
+DIGESTS_PER_BLOCK = 65536
+SCREEN_CHUNK_SIZE = 100_000
+
+
+def read_digests(lines: Iterable[bytes]) -> Iterator[bytes]:
+  # A hex SHA-1 hash per line. Anything after a colon is ignored, so the
+  # HASH:COUNT lines of the Pwned Passwords downloads work as they are. Each
+  # block of lines is decoded in one go.
+  line_no = 0
+
+  for block in batched(lines, DIGESTS_PER_BLOCK):
+    hex_digests = [hex_digest for line in block if (hex_digest := line.split(b':', 1)[0].strip())]
+    try:
+      if any(len(hex_digest) != 2 * HASH_SIZE for hex_digest in hex_digests):
+        raise binascii.Error
+      digests = binascii.a2b_hex(b''.join(hex_digests))
+
+    except binascii.Error:
+      for line_no, line in enumerate(block, start=line_no + 1):
+        hex_digest = line.split(b':', 1)[0].strip()
+        if hex_digest and (len(hex_digest) != 2 * HASH_SIZE or hex_digest.strip(string.hexdigits.encode())):
+          raise ValueError(f'Line {line_no} is not a SHA-1 hash.') from None
+      raise
+
+    line_no += len(block)
+    yield from (digests[i:i + HASH_SIZE] for i in range(0, len(digests), HASH_SIZE))
+
+
+def _read_run(path: Path) -> Iterator[list[bytes]]:
+  with open(path, 'rb') as file:
+    while chunk := file.read(HASH_SIZE * DIGESTS_PER_BLOCK):
+      yield [chunk[i:i + HASH_SIZE] for i in range(0, len(chunk), HASH_SIZE)]
+
+
+def _sorted_blocks(digests: Iterable[bytes], tmp_dir: Path, run_size: int) -> Iterator[list[bytes]]:
+  # Sorted runs of run_size digests are written aside and merged. Corpora
+  # that come sorted already (like Pwned Passwords) leave runs that don't
+  # overlap, which are read back one after the other instead.
+  runs: list[Path] = []
+  overlapping = False
+  last = b''
+
+  for run in batched(digests, run_size):
+    run = sorted(run)
+    overlapping |= run[0] <= last
+    last = run[-1]
+
+    runs.append(tmp_dir / f'{len(runs)}.run')
+    runs[-1].write_bytes(b''.join(run))
+
+  blocks = [_read_run(run) for run in runs]
+  if not overlapping:
+    return chain.from_iterable(blocks)
+
+  merged = heapq.merge(*(chain.from_iterable(run_blocks) for run_blocks in blocks))
+  return (list(block) for block in batched(merged, DIGESTS_PER_BLOCK))
+
+
+def _count_prefixes(prefix_counts: array, digests: list[bytes]) -> None:
+  if np is not None:
+    prefixes = np.frombuffer(b''.join(digest[:4] for digest in digests), dtype='>u4') >> 32 - MAX_PREFIX_BITS
+    # Sorted, so each prefix is counted once
+    prefixes, counts = np.unique(prefixes, return_counts=True)
+    np.frombuffer(prefix_counts, dtype=np.uint32)[prefixes] += counts.astype(np.uint32)
+    return
+
+  for prefix, prefix_count in Counter(digest[:3] for digest in digests).items():
+    prefix_counts[int.from_bytes(prefix) >> 24 - MAX_PREFIX_BITS] += prefix_count
+
+
+def _prefix_bits(count: int) -> int:
+  return min(MAX_PREFIX_BITS, max(0, (count // HASHES_PER_BUCKET).bit_length() - 1))
+
+
+def compile_breach_index(
+  digests: Iterable[bytes],
+  target: str | Path,
+  bloom_bits_per_entry: int = 0,
+  run_size: int = RUN_SIZE,
+) -> Path:
+  # digests are 20 byte SHA-1 digests in any order, repeats included. With
+  # bloom_bits_per_entry, a bloom filter of that many bits per digest is
+  # written to <target>.bloom as well.
+  target = Path(target)
+  bloom_target = target.with_name(target.name + BLOOM_SUFFIX)
+  partial = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+  prefix_counts = array('I', bytes(4 << MAX_PREFIX_BITS))
+  count = 0
+
+  try:
+    with tempfile.TemporaryDirectory(dir=target.parent) as tmp_dir, open(partial, 'wb') as file:
+      file.write(bytes(HEADER.size))
+      previous = b''
+
+      for block in _sorted_blocks(digests, Path(tmp_dir), run_size):
+        if any(len(digest) != HASH_SIZE for digest in block):
+          raise ValueError('Every digest has to be a 20 byte SHA-1 digest.')
+
+        distinct = [digest for digest, before in zip(block, [previous, *block]) if digest != before]
+        file.write(b''.join(distinct))
+        _count_prefixes(prefix_counts, distinct)
+        previous = block[-1]
+        count += len(distinct)
+
+      prefix_bits = _prefix_bits(count)
+      merged = 1 << MAX_PREFIX_BITS - prefix_bits
+      fanout = array('Q', [0])
+      for start in range(0, len(prefix_counts), merged):
+        fanout.append(fanout[-1] + sum(prefix_counts[start:start + merged]))
+      if sys.byteorder != 'little':
+        fanout.byteswap()
+
+      file.write(fanout.tobytes())
+      file.seek(0)
+      file.write(HEADER.pack(MAGIC, VERSION, count, prefix_bits))
+
+    if bloom_bits_per_entry:
+      with open(partial, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+          build_bloom_filter(view[HEADER.size:HEADER.size + count * HASH_SIZE], bloom_target, bloom_bits_per_entry)
+    else:
+      # A filter left from an earlier corpus would hide the digests added since
+      bloom_target.unlink(missing_ok=True)
+
+  except BaseException:
+    partial.unlink(missing_ok=True)
+    raise
+
+  os.replace(partial, target)
+  return target
+
+
+def compile_breach_corpus(
+  source: str | Path,
+  target: str | Path | None = None,
+  bloom_bits_per_entry: int = 0,
+  run_size: int = RUN_SIZE,
+) -> Path:
+  source = Path(source)
+  target = Path(target) if target else source.with_suffix('.index')
+  with open(source, 'rb') as file:
+    return compile_breach_index(read_digests(file), target, bloom_bits_per_entry, run_size)
+
+
+def _digest(password: str | bytes) -> bytes:
+  return hashlib.sha1(password if isinstance(password, bytes) else password.encode('utf-8')).digest()
+
+
+class BreachIndex:
+  # Nothing is read up front: a lookup reads a fanout entry and searches the
+  # one bucket of the mapped file it points to, a few pages in all
+  def __init__(self, path: str | Path) -> None:
+    self.path = Path(path)
+    with open(self.path, 'rb') as file:
+      self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, self._count, self._prefix_bits = HEADER.unpack_from(self._map)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError(f'{self.path} is not a breach index.')
+
+    fanout_start = HEADER.size + self._count * HASH_SIZE
+    self._digests = None
+    if np is not None:
+      self._digests = np.frombuffer(self._map, dtype=f'S{HASH_SIZE}', count=self._count, offset=HEADER.size)
+
+    if sys.byteorder == 'little':
+      self._fanout = memoryview(self._map)[fanout_start:].cast('Q')
+    else:
+      self._fanout = array('Q', self._map[fanout_start:])
+      self._fanout.byteswap()
+
+    self.bloom_filter = None
+    bloom_path = self.path.with_name(self.path.name + BLOOM_SUFFIX)
+    if bloom_path.exists():
+      self.bloom_filter = BloomFilter(bloom_path)
+      if self.bloom_filter.count != self._count:
+        raise ValueError(f"{bloom_path} wasn't built from {self.path}.")
+
+  def __len__(self) -> int:
+    return self._count
+
+  def __contains__(self, digest: bytes) -> bool:
+    if self.bloom_filter is not None and not self.bloom_filter.might_contain(digest):
+      return False
+
+    prefix = int.from_bytes(digest[:8]) >> 64 - self._prefix_bits
+    start = HEADER.size + self._fanout[prefix] * HASH_SIZE
+    end = HEADER.size + self._fanout[prefix + 1] * HASH_SIZE
+
+    # A bucket is small enough for mmap.find() to scan in less time than a
+    # binary search takes in Python. A match has to start on a digest.
+    position = self._map.find(digest, start, end)
+    while position >= 0 and (position - HEADER.size) % HASH_SIZE:
+      position = self._map.find(digest, position + 1, end)
+    return position >= 0
+
+  def is_breached(self, password: str | bytes) -> bool:
+    return _digest(password) in self
+
+  def screen(self, passwords: Iterable[str | bytes], chunk_size: int = SCREEN_CHUNK_SIZE) -> Iterator[bool]:
+    # Whether each password is breached, in order. A chunk is looked up in
+    # digest order, so the lookups walk the file front to back instead of
+    # jumping around it, which the page cache and readahead handle far better
+    # when the corpus doesn't fit in memory.
+    for chunk in batched(passwords, chunk_size):
+      digests = [_digest(password) for password in chunk]
+
+      if self._digests is not None and self._count:
+        # Byte strings of equal length order in NumPy as they do in Python
+        queries = np.array(digests, dtype=self._digests.dtype)
+        order = np.argsort(queries)
+        positions = np.searchsorted(self._digests, queries[order]).clip(max=self._count - 1)
+        breached = np.empty(len(queries), dtype=bool)
+        breached[order] = self._digests[positions] == queries[order]
+        yield from breached.tolist()
+        continue
+
+      breached = [False] * len(digests)
+      for i in sorted(range(len(digests)), key=digests.__getitem__):
+        breached[i] = digests[i] in self
+      yield from breached
+
+
+@lru_cache
+def _open(file_path: str, device: int, inode: int, mtime_ns: int) -> BreachIndex:
+  return BreachIndex(file_path)
+
+
+def open_breach_index(path: str | Path) -> BreachIndex:
+  # Every call for an unchanged file shares one mapping
+  stat = os.stat(path)
+  return _open(os.fspath(path), stat.st_dev, stat.st_ino, stat.st_mtime_ns)
@@ -1,10 +1,12 @@
-from pathlib import Path
-import pyperclip
 import string
 import secrets
 import inspect
 from typing import Any, Callable
 
+from ._wordlist import load_wordlist
+from ._policy import PasswordPolicy, generate_with_policy
+from .breach import BreachIndex
+
 
 def Human_unreadable_urlsafe_password(password_length: int) -> str:
   return secrets.token_urlsafe(password_length)[:password_length]
@@ -14,15 +16,29 @@ def Human_unreadable_password_using_printable_characters(password_length: int) -
   return ''.join(secrets.choice(string.printable) for _ in range(password_length))
 
 
+def Human_unreadable_password_meeting_a_policy(
+  password_length: int,
+  min_uppercase: int,
+  min_digits: int,
+  min_symbols: int,
+  max_repeated_characters: int,
+) -> str:
+  return generate_with_policy(password_length, PasswordPolicy(
+    min_uppercase=min_uppercase,
+    min_digits=min_digits,
+    min_symbols=min_symbols,
+    max_run=max_repeated_characters or None,
+  ))
+
+
 def XKCD_password_generation_method(num_words: int, delimiter: str = ' ') -> str:
-  with open(Path(__file__).parent / 'wordlist.txt') as f:
-    wordlist = f.read().split()
-    return delimiter.join(secrets.choice(wordlist) for _ in range(num_words))
- 
+  return load_wordlist().passphrase(num_words, delimiter)
+
 
 options: list[Callable[[Any], str]] = [
   Human_unreadable_urlsafe_password,
   Human_unreadable_password_using_printable_characters,
+  Human_unreadable_password_meeting_a_policy,
   XKCD_password_generation_method
 ]
 
@@ -63,7 +79,7 @@ def list_options():
   return type_based_input('Choose the option: ', int, lambda x: 0 < x <= len(options))
 
 
-def main():
+def main(breach_index: BreachIndex | None = None):
   print('\nPASSWORD GENERATOR')
   print('------------------')
 
@@ -86,8 +102,24 @@ def main():
       )
     )
 
-  pyperclip.copy(pass_gen_func(*args))
+  # Only needed here, the bulk mode runs on machines without a clipboard
+  import pyperclip
+
+  password = pass_gen_func(*args)
+  tries = 1
+  while breach_index is not None and breach_index.is_breached(password):
+    # Methods with little entropy can keep turning up breached passwords
+    if tries == 10:
+      print('Every password generated was in the breach index, try a longer one')
+      return
+
+    print('That password is in the breach index, generating another one')
+    password = pass_gen_func(*args)
+    tries += 1
+
+  pyperclip.copy(password)
   print('Password copied to clipboard')
 
 
-main()
+if __name__ == '__main__':
+  main()
@@ -1,6 +1,10 @@
+import argparse
+
 from rich import print as rich_print
 from rich.text import Text
 
+from storage import DEFAULT_DATA_DIR, TaskStore
+
 
 def prompt(query, type_=None, condn=None):
   if type_ is None:
@@ -26,48 +30,69 @@ def prompt(query, type_=None, condn=None):
 
 
 class ToDoList:
-  def __init__(self):
-    self.tasks = []
+  def __init__(self, store):
+    self.store = store
+
+  def __len__(self):
+    return len(self.store)
 
   def add_task(self, task):
-    self.tasks.append({"task": task, "completed": False})
+    self.store.add(task)
     rich_print(f"[green]Task added:[/] {task}")
 
   def complete_task(self, task_number):
-    if not (0 < task_number <= len(self.tasks)):
+    if not (0 < task_number <= len(self.store)):
     	rich_print('[red]Invalid task number[/]')
     	return
 
-    self.tasks[task_number - 1]['completed'] = True
+    self.store.complete(task_number - 1)
     rich_print(f"[yellow]Task {task_number} marked as complete[/]")
 
+  def remove_task(self, task_number):
+    if not (0 < task_number <= len(self.store)):
+      rich_print('[red]Invalid task number[/]')
+      return
+
+    self.store.remove(task_number - 1)
+    rich_print(f"[yellow]Task {task_number} removed[/]")
+
   def show_tasks(self):
-    if not self.tasks:
+    if not self.store.tasks:
       rich_print('[red]No tasks in the list.[/]')
       return
 
-    length_of_sno = len(str(len(self.tasks)))
+    length_of_sno = len(str(len(self.store)))
 
-    for i, task in enumerate(self.tasks, 1):
-      task_text = task['task']
-      if task['completed']:
+    for i, (task_text, completed) in enumerate(zip(self.store.tasks, self.store.completed), 1):
+      if completed:
         task_text = f"[strike]{task_text}[/]"
       rich_print(f"{i:>{length_of_sno}}. {task_text}")
 
 
 def main():
-  todo_list = ToDoList()
+  parser = argparse.ArgumentParser(description='A to-do list kept between runs.')
+  parser.add_argument(
+    '--data-dir', default=DEFAULT_DATA_DIR, help=f'Where the list is stored, {DEFAULT_DATA_DIR} by default.'
+  )
+  args = parser.parse_args()
+
+  # Closing the store writes out what is still buffered, however the app exits
+  with TaskStore(args.data_dir) as store:
+    run(ToDoList(store))
+
 
+def run(todo_list):
   while True:
     print("\nOptions:\n" \
           "1. Add Task\n" \
           "2. Complete a Task\n" \
-          "3. View Tasks\n" \
-          "4. Exit\n")
+          "3. Remove a Task\n" \
+          "4. View Tasks\n" \
+          "5. Exit\n")
 
     choice = prompt(
       "Choose an option: ", int,
-      lambda x: 0 < x <= 4
+      lambda x: 0 < x <= 5
     )
 
     if choice == 1:
@@ -77,17 +102,21 @@ def main():
         bool
       )
       todo_list.add_task(task)
-    elif choice == 2:
-      length = len(todo_list.tasks)
+    elif choice in (2, 3):
+      length = len(todo_list)
+      action = 'complete' if choice == 2 else 'remove'
       task_number = prompt(
-        f"Enter the task number to complete (1-{length}): ",
+        f"Enter the task number to {action} (1-{length}): ",
         int,
         lambda x: 0 < x <= length
       )
-      todo_list.complete_task(task_number)
-    elif choice == 3:
-      todo_list.show_tasks()
+      if choice == 2:
+        todo_list.complete_task(task_number)
+      else:
+        todo_list.remove_task(task_number)
     elif choice == 4:
+      todo_list.show_tasks()
+    elif choice == 5:
       print("Exiting the To-Do List app.")
       break
 
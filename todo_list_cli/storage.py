@@ -0,0 +1,221 @@
+import json
+import os
+import struct
+import time
+from pathlib import Path
+
+
+DEFAULT_DATA_DIR = Path.home() / '.todo_list_cli'
+SNAPSHOT_NAME = 'tasks.snapshot'
+JOURNAL_NAME = 'tasks.journal'
+# Magic, format version, generation, task count. The header is followed by
+# a completed flag byte per task, then the tasks, UTF-8 and NUL separated.
+SNAPSHOT_MAGIC = b'TODO'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<4sIQQ')
+# What each line of the journal starts with
+GENERATION = b'g'
+ADD = b'a'
+COMPLETE = b'c'
+REMOVE = b'r'
+# The journal is folded into a new snapshot after this many operations, so
+# opening the list never replays more than that
+COMPACT_AFTER = 50_000
+# The journal is flushed to the OS after every operation, and to the disk
+# after this many of them or this many seconds, whichever comes first
+SYNC_EVERY = 64
+SYNC_INTERVAL = 1.0
+
+
+def _fsync_directory(path: Path) -> None:
+  # Makes a rename in it durable. Windows has no way to, nor a need
+  if os.name == 'nt':
+    return
+
+  fd = os.open(path, os.O_RDONLY)
+  try:
+    os.fsync(fd)
+  finally:
+    os.close(fd)
+
+
+def _replace(path: Path, data: bytes) -> None:
+  partial = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+  with open(partial, 'wb') as file:
+    file.write(data)
+    file.flush()
+    os.fsync(file.fileno())
+
+  os.replace(partial, path)
+  _fsync_directory(path.parent)
+
+
+class TaskStore:
+  # The tasks as of the last snapshot, plus a journal of every operation
+  # since, one per line: a letter, then a task as a JSON string (for add) or
+  # an index (for complete and remove). Both files carry a generation: a
+  # journal older than the snapshot was already folded into it, by a
+  # compaction that stopped before replacing the journal.
+  def __init__(
+    self,
+    directory: str | Path = DEFAULT_DATA_DIR,
+    compact_after: int = COMPACT_AFTER,
+    sync_every: int = SYNC_EVERY,
+    sync_interval: float = SYNC_INTERVAL,
+  ):
+    self.directory = Path(directory)
+    self.directory.mkdir(parents=True, exist_ok=True)
+    self.compact_after = compact_after
+    self.sync_every = sync_every
+    self.sync_interval = sync_interval
+
+    self.tasks: list[str] = []
+    self.completed = bytearray()
+    self.generation = 0
+    self._journal = None
+    self._operations = 0
+    self._unsynced = 0
+    self._synced_at = time.monotonic()
+
+    self._load_snapshot()
+    self._replay_journal()
+    if self._operations >= self.compact_after:
+      self.compact()
+
+  def __len__(self):
+    return len(self.tasks)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  @property
+  def _snapshot_path(self) -> Path:
+    return self.directory / SNAPSHOT_NAME
+
+  @property
+  def _journal_path(self) -> Path:
+    return self.directory / JOURNAL_NAME
+
+  def _load_snapshot(self) -> None:
+    try:
+      data = self._snapshot_path.read_bytes()
+    except FileNotFoundError:
+      return
+
+    magic, version, self.generation, count = SNAPSHOT_HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+      raise ValueError(f'{self._snapshot_path} is not a task snapshot.')
+
+    flags_end = SNAPSHOT_HEADER.size + count
+    self.completed = bytearray(data[SNAPSHOT_HEADER.size:flags_end])
+    self.tasks = str(memoryview(data)[flags_end:], 'utf-8').split('\0') if count else []
+
+  def _replay_journal(self) -> None:
+    try:
+      data = self._journal_path.read_bytes()
+    except FileNotFoundError:
+      data = b''
+
+    # A line cut short by a crash never made it, it's dropped
+    complete_end = data.rfind(b'\n') + 1
+    lines = data[:complete_end].splitlines()
+
+    if not lines or lines[0] != self._record(GENERATION, self.generation).rstrip():
+      # Missing, or folded into the snapshot already
+      self._start_journal()
+      return
+
+    # add(), complete() and remove() without the logging, inlined for the
+    # tens of thousands of lines a journal can have
+    tasks, completed = self.tasks, self.completed
+    for line in lines[1:]:
+      operation = line[:1]
+      if operation == ADD:
+        tasks.append(json.loads(line[1:]))
+        completed.append(0)
+      elif operation == COMPLETE:
+        completed[int(line[1:])] = 1
+      elif operation == REMOVE:
+        index = int(line[1:])
+        del tasks[index]
+        del completed[index]
+      else:
+        raise ValueError(f'Unknown operation {line!r} in {self._journal_path}.')
+    self._operations = len(lines) - 1
+
+    self._journal = open(self._journal_path, 'r+b')
+    self._journal.truncate(complete_end)
+    self._journal.seek(complete_end)
+
+  def _start_journal(self) -> None:
+    if self._journal is not None:
+      self._journal.close()
+
+    _replace(self._journal_path, self._record(GENERATION, self.generation))
+    self._journal = open(self._journal_path, 'ab')
+    self._operations = 0
+
+  @staticmethod
+  def _record(operation: bytes, arg: str | int) -> bytes:
+    if operation == ADD:
+      return ADD + json.dumps(arg, ensure_ascii=False).encode('utf-8') + b'\n'
+    return b'%s%d\n' % (operation, arg)
+
+  def _log(self, operation: bytes, arg: str | int) -> None:
+    self._journal.write(self._record(operation, arg))
+    self._journal.flush()
+    self._operations += 1
+    self._unsynced += 1
+
+    if self._operations >= self.compact_after:
+      self.compact()
+    elif self._unsynced >= self.sync_every or time.monotonic() - self._synced_at >= self.sync_interval:
+      self.sync()
+
+  def add(self, task: str) -> None:
+    if '\0' in task:
+      raise ValueError('A task cannot contain NUL characters.')
+    self.tasks.append(task)
+    self.completed.append(0)
+    self._log(ADD, task)
+
+  def complete(self, index: int) -> None:
+    # index counts from 0
+    if not 0 <= index < len(self.tasks):
+      raise IndexError(index)
+    self.completed[index] = 1
+    self._log(COMPLETE, index)
+
+  def remove(self, index: int) -> None:
+    if not 0 <= index < len(self.tasks):
+      raise IndexError(index)
+    del self.tasks[index]
+    del self.completed[index]
+    self._log(REMOVE, index)
+
+  def sync(self) -> None:
+    if self._unsynced:
+      self._journal.flush()
+      os.fsync(self._journal.fileno())
+      self._unsynced = 0
+    self._synced_at = time.monotonic()
+
+  def compact(self) -> None:
+    # The snapshot of the next generation goes first. Until the journal is
+    # restarted under that generation, a crash leaves the old journal, which
+    # opening the list then ignores.
+    self.generation += 1
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.generation, len(self.tasks))
+    _replace(self._snapshot_path, header + bytes(self.completed) + '\0'.join(self.tasks).encode('utf-8'))
+
+    self._start_journal()
+    self._unsynced = 0
+
+  def close(self) -> None:
+    if self._journal is not None:
+      self.sync()
+      self._journal.close()
+      self._journal = None